@@ -8,7 +8,8 @@ from backend.db import Base
 import os
 
 from backend.auth.models import User
-from backend.movies.models import Movie, Playlist, PlaylistMovie
+from backend.movies.models import ImportJobState, Movie, Playlist, PlaylistMovie
+from backend.omdb.models import OmdbResponse
 
 # Import and load environment variables
 from dotenv import load_dotenv
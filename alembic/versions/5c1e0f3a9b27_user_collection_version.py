@@ -0,0 +1,28 @@
+"""user collection version
+
+Revision ID: 5c1e0f3a9b27
+Revises: 071d977b51bd
+Create Date: 2026-10-19 10:12:31.512044
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c1e0f3a9b27'
+down_revision: Union[str, None] = '071d977b51bd'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('user', sa.Column('collection_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('user', 'collection_version')
@@ -0,0 +1,31 @@
+"""movie unique per owner
+
+Revision ID: 9d4b7e2c6a13
+Revises: 5c1e0f3a9b27
+Create Date: 2026-10-19 14:03:52.118407
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d4b7e2c6a13'
+down_revision: Union[str, None] = '5c1e0f3a9b27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Several users may own the same title; imports upsert on (owner_id, imdbID)
+    op.drop_constraint('movie_imdbID_key', 'movie', type_='unique')
+    op.create_unique_constraint('uq_movie_owner_id_imdbID', 'movie', ['owner_id', 'imdbID'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('uq_movie_owner_id_imdbID', 'movie', type_='unique')
+    op.create_unique_constraint('movie_imdbID_key', 'movie', ['imdbID'])
@@ -0,0 +1,35 @@
+"""omdb response cache
+
+Revision ID: b3f18d5e2a40
+Revises: 9d4b7e2c6a13
+Create Date: 2026-10-19 16:21:07.503912
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3f18d5e2a40'
+down_revision: Union[str, None] = '9d4b7e2c6a13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('omdb_response',
+    sa.Column('key', sa.String(length=255), nullable=False),
+    sa.Column('body', sa.Text(), nullable=False),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('key')
+    )
+    op.create_index(op.f('ix_omdb_response_expires_at'), 'omdb_response', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_omdb_response_expires_at'), table_name='omdb_response')
+    op.drop_table('omdb_response')
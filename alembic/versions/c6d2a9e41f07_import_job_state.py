@@ -0,0 +1,37 @@
+"""import job state
+
+Revision ID: c6d2a9e41f07
+Revises: b3f18d5e2a40
+Create Date: 2026-10-19 18:02:41.117305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c6d2a9e41f07'
+down_revision: Union[str, None] = 'b3f18d5e2a40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('import_job',
+    sa.Column('id', sa.String(length=32), nullable=False),
+    sa.Column('owner_id', sa.Integer(), nullable=False),
+    sa.Column('state', sa.Text(), nullable=False),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['owner_id'], ['user.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_import_job_expires_at'), 'import_job', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_import_job_expires_at'), table_name='import_job')
+    op.drop_table('import_job')
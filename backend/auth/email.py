@@ -1,14 +1,24 @@
 # services/email.py or inside your existing services module
 import os
-import resend
 import logging
 
 logger = logging.getLogger(__name__)
 
-# Initialize your API Key (ensure RESEND_API_KEY is in your environment/.env)
-resend.api_key = os.getenv("RESEND_API_KEY")
 SENDER_EMAIL = os.getenv("SENDER_EMAIL", "onboarding@resend.dev")
 
+_resend = None
+
+
+def get_resend():
+    """Imports and configures the resend SDK on first use, keeping it off API startup."""
+    global _resend
+    if _resend is None:
+        import resend
+        # Initialize your API Key (ensure RESEND_API_KEY is in your environment/.env)
+        resend.api_key = os.getenv("RESEND_API_KEY")
+        _resend = resend
+    return _resend
+
 
 def send_login_notification_email(recipient_email: str, username: str, login_time: str):
     """Worker function executed as a background task."""
@@ -22,7 +32,8 @@ def send_login_notification_email(recipient_email: str, username: str, login_tim
         </div>
         """
         
-        params: resend.Emails.SendParams = {
+        resend = get_resend()
+        params = {
             "from": SENDER_EMAIL,
             "to": [recipient_email],
             "subject": "Security Alert: New Login to Your Account",
@@ -1,6 +1,7 @@
 from datetime import datetime, timedelta
 
 from . import schema
+from backend.timing import stage
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
@@ -42,4 +43,5 @@ def get_current_user(data: str = Depends(oauth2_scheme)):
         detail="Could not validate credentials",
         headers={"Authorization": "Bearer"}
     )
-    return verify_token(data, credentials_exception)
+    with stage("user_lookup"):
+        return verify_token(data, credentials_exception)
@@ -13,6 +13,8 @@ class User(Base):
     email = Column(String(255), unique=True)
     role = Column(String(50), nullable=True, default='user')
     password = Column(String(255))
+    # Bumped by every write to the user's movies or playlists, see backend/etag.py
+    collection_version = Column(Integer, nullable=False, default=0, server_default="0")
 
     movies = relationship("Movie", back_populates="owner")
 
@@ -13,6 +13,7 @@ from . import hashing
 from . models import User
 from ..kafkaConnection import send_kafka_message
 from backend.auth.email import send_login_notification_email
+from backend.timing import stage
 
 router = APIRouter(tags=['Auth'], prefix='/api/auth')
 
@@ -21,7 +22,8 @@ router = APIRouter(tags=['Auth'], prefix='/api/auth')
 async def create_user_registration(request: schema.User,
                                    database: Session = Depends(db.get_db)):
 
-    user = await validator.verify_email_exist(request.email, database)
+    with stage("duplicate_check"):
+        user = await validator.verify_email_exist(request.email, database)
 
     if user:
         raise HTTPException(
@@ -29,7 +31,8 @@ async def create_user_registration(request: schema.User,
             detail="This user with this email already exists in the system."
         )
 
-    new_user = await services.new_user_register(request, database)
+    with stage("register"):
+        new_user = await services.new_user_register(request, database)
     return new_user
 
 
@@ -41,18 +44,22 @@ async def get_all_users(database: Session = Depends(db.get_db)):
 @router.post('/login')
 async def login(request: schema.Login,
           database: Session = Depends(db.get_db)):    
-    user = database.query(User).filter(User.email == request.email).first()
+    with stage("user_lookup"):
+        user = database.query(User).filter(User.email == request.email).first()
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
 
-    if not hashing.verify_password(request.password, user.password):
+    with stage("password_verify"):
+        valid_password = hashing.verify_password(request.password, user.password)
+    if not valid_password:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid Password")
 
     # Generate a JWT Token
-    user_display = schema.DisplayAccount.from_orm(user)
-    access_token = create_access_token(data={"sub": user_display.email, "id": user_display.id})
+    with stage("token"):
+        user_display = schema.DisplayAccount.from_orm(user)
+        access_token = create_access_token(data={"sub": user_display.email, "id": user_display.id})
     
     # Publish user login event to Kafka
     kafka_message = {
@@ -63,15 +70,17 @@ async def login(request: schema.Login,
         "login_time": datetime.now().isoformat(),
         "timestamp": datetime.now().isoformat(),
     }
-    await send_kafka_message("user-events", kafka_message, str(user.id))
+    with stage("kafka_ack"):
+        await send_kafka_message("user-events", kafka_message, str(user.id))
 
     # Send login notification email
     try:
-        send_login_notification_email(
-            recipient_email='aspper20@gmail.com',
-            username=user.username,
-            login_time=datetime.now().isoformat()
-        )
+        with stage("email"):
+            send_login_notification_email(
+                recipient_email='aspper20@gmail.com',
+                username=user.username,
+                login_time=datetime.now().isoformat()
+            )
     except Exception as e:
         # Log the error but do not prevent login
         import logging
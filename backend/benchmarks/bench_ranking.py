@@ -0,0 +1,86 @@
+"""
+Benchmark of recommendation ranking over the full movies.csv catalog.
+
+Compares the original `sorted(list(enumerate(row)))` ranking with the
+vectorized top-K path, one query at a time and as a batched 2-D operation.
+
+Run from the repository root:
+
+    python backend/benchmarks/bench_ranking.py --top-n 10 --batch-size 256
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics.pairwise import cosine_similarity
+
+# Make the `backend` package importable when run as a script
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from backend.ml.ranking import top_k, recommend_by_index
+
+
+def build_similarity_matrix(csv_path):
+    df = pd.read_csv(csv_path)
+    text_columns = ['original_title', 'genres', 'keywords', 'overview', 'tagline']
+    combined = df[text_columns].fillna('').astype(str).agg(' '.join, axis=1)
+    tfidf_matrix = TfidfVectorizer(stop_words='english').fit_transform(combined)
+    return cosine_similarity(tfidf_matrix, tfidf_matrix)
+
+
+def sorted_enumerate(cosine_sim, idx, top_n):
+    """The ranking previously used by get_recommendations."""
+    sim_scores = sorted(list(enumerate(cosine_sim[idx])), key=lambda x: x[1], reverse=True)
+    return [i[0] for i in sim_scores[1:top_n + 1]]
+
+
+def timed(label, n_queries, func):
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed * 1000:10.1f} ms total "
+          f"{elapsed / n_queries * 1e6:10.1f} us/query "
+          f"{n_queries / elapsed:12.0f} queries/s")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Top-K ranking benchmark")
+    parser.add_argument("--csv", default="backend/ml/movies.csv")
+    parser.add_argument("--top-n", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=1000,
+                        help="Number of query movies (capped at the catalog size)")
+    args = parser.parse_args()
+
+    cosine_sim = build_similarity_matrix(args.csv)
+    n_movies = cosine_sim.shape[0]
+    queries = np.random.default_rng(42).permutation(n_movies)[:args.queries]
+    print(f"Catalog: {n_movies} movies, {len(queries)} queries, top_n={args.top_n}\n")
+
+    # Sanity check: the fast path returns the same top set as the old ranking
+    for idx in queries[:20]:
+        expected = set(cosine_sim[idx][sorted_enumerate(cosine_sim, idx, args.top_n)])
+        got = set(top_k(cosine_sim[idx], args.top_n, exclude=idx)[1])
+        assert np.allclose(sorted(expected), sorted(got))
+
+    baseline = timed("sorted(enumerate) per query", len(queries),
+                     lambda: [sorted_enumerate(cosine_sim, i, args.top_n) for i in queries])
+    per_query = timed("top_k per query", len(queries),
+                      lambda: [top_k(cosine_sim[i], args.top_n, exclude=i) for i in queries])
+
+    def batched():
+        for start in range(0, len(queries), args.batch_size):
+            recommend_by_index(cosine_sim, queries[start:start + args.batch_size], args.top_n)
+
+    batch = timed(f"top_k batched ({args.batch_size})", len(queries), batched)
+
+    print(f"\nSpeed-up per query: {baseline / per_query:.1f}x, batched: {baseline / batch:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
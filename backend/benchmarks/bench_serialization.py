@@ -0,0 +1,110 @@
+"""
+Benchmark of the movie listing response path for a large collection.
+
+Compares the previous path (ORM rows, `response_model` validation, stdlib
+JSONResponse) with orjson alone and with the lean path the listing now uses
+(column query straight to dicts, rendered by orjson without validation).
+Rows come from an in-memory SQLite database so the query cost is included.
+
+Run from the repository root:
+
+    python backend/benchmarks/bench_serialization.py --movies 10000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime
+from typing import List
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+# Make the `backend` package importable when run as a script
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from backend.db import Base
+from backend.auth.models import User
+from backend.movies import models, schema, services
+from backend.serialization import trusted_response
+
+
+def build_database(n_movies):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    database = sessionmaker(bind=engine)()
+    user = User(username="bench", email="bench@example.com", role="user", password="x")
+    database.add(user)
+    database.flush()
+    database.bulk_insert_mappings(models.Movie, [
+        {
+            "title": f"Movie {i}",
+            "imdbID": f"tt{i:07d}",
+            "year": str(1950 + i % 70),
+            "type": "movie",
+            "poster": f"https://m.media-amazon.com/images/M/poster{i}.jpg",
+            "owner_id": user.id,
+            "createdDate": datetime(2024, 1, 1, 12, 0, i % 60),
+        }
+        for i in range(n_movies)
+    ])
+    database.commit()
+    return database, user.id
+
+
+def timed(label, repeat, func):
+    func()  # warm up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        body = func()
+    elapsed = (time.perf_counter() - start) / repeat
+    print(f"{label:<44} {elapsed * 1000:9.1f} ms/request {len(body) / 1024:9.0f} KiB")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Listing serialization benchmark")
+    parser.add_argument("--movies", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    database, owner_id = build_database(args.movies)
+    field = create_model_field("Response", List[schema.MovieList], mode="serialization")
+    loop = asyncio.new_event_loop()
+
+    def orm_rows():
+        # A fresh session state per request, as each request has its own session
+        database.expire_all()
+        return database.query(models.Movie).filter(models.Movie.owner_id == owner_id).all()
+
+    def validated(response_class):
+        content = loop.run_until_complete(
+            serialize_response(field=field, response_content=orm_rows())
+        )
+        return response_class(content).body
+
+    def lean():
+        rows = loop.run_until_complete(services.get_movie_listing(database, owner_id))
+        return trusted_response(rows).body
+
+    print(f"Listing of {args.movies} movies, mean of {args.repeat} requests\n")
+    # Sanity check: the lean path renders the same JSON documents
+    assert ORJSONResponse(None).render(
+        loop.run_until_complete(serialize_response(field=field, response_content=orm_rows()))
+    ) == lean()
+
+    baseline = timed("ORM + response_model + JSONResponse", args.repeat,
+                     lambda: validated(JSONResponse))
+    orjson_only = timed("ORM + response_model + ORJSONResponse", args.repeat,
+                        lambda: validated(ORJSONResponse))
+    lean_path = timed("columns + trusted_response (orjson)", args.repeat, lean)
+
+    print(f"\nSpeed-up: orjson alone {baseline / orjson_only:.1f}x, lean path {baseline / lean_path:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Benchmark of the local event spool.
+
+Measures append throughput and latency for a range of group-commit windows
+(SPOOL_FSYNC_INTERVAL) and numbers of concurrent senders (a single sender
+with no window pays one fsync per record), then the rate at which a drainer
+replays the spooled records through a no-op publisher. Point --directory at
+the disk the spool will use in production: fsync cost depends on it.
+
+Run from the repository root:
+
+    python backend/benchmarks/bench_spool.py --records 5000 --directory /var/lib/event-spool
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+# Make the `backend` package importable when run as a script
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from backend.breaker import CircuitBreaker
+from backend.spool import Spool, SpoolDrainer
+
+
+async def append_records(spool, records, concurrency, payload):
+    latencies = []
+
+    async def sender(count):
+        for _ in range(count):
+            started = time.perf_counter()
+            await spool.append(payload)
+            latencies.append(time.perf_counter() - started)
+
+    share, extra = divmod(records, concurrency)
+    started = time.perf_counter()
+    await asyncio.gather(*(sender(share + (n < extra)) for n in range(concurrency)))
+    return time.perf_counter() - started, sorted(latencies)
+
+
+async def drain_records(spool):
+    async def publish(payload):
+        pass
+
+    started = time.perf_counter()
+    await SpoolDrainer(spool, CircuitBreaker("bench"), publish).drain()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Event spool benchmark")
+    parser.add_argument("--records", type=int, default=5000)
+    parser.add_argument("--payload-bytes", type=int, default=512)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16, 128])
+    parser.add_argument("--fsync-interval", type=float, nargs="+", default=[0, 0.001, 0.002, 0.005],
+                        help="group-commit windows in seconds; 0 still batches appends made in one loop turn")
+    parser.add_argument("--directory", default=None, help="defaults to a temporary directory")
+    args = parser.parse_args()
+
+    payload = os.urandom(args.payload_bytes)
+    print(f"{args.records} records of {args.payload_bytes} bytes\n")
+    print(f"{'fsync interval':>14} {'senders':>8} {'records/s':>11} {'p50 ms':>8} {'p99 ms':>8} {'drain records/s':>16}")
+
+    with tempfile.TemporaryDirectory(dir=args.directory) as directory:
+        for fsync_interval in args.fsync_interval:
+            for concurrency in args.concurrency:
+                spool = Spool(f"bench-{fsync_interval}-{concurrency}", directory=directory,
+                              fsync_interval=fsync_interval)
+                elapsed, latencies = asyncio.run(append_records(spool, args.records, concurrency, payload))
+                drained = asyncio.run(drain_records(spool))
+                p50 = latencies[len(latencies) // 2]
+                p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+                print(f"{fsync_interval * 1000:>11.1f} ms {concurrency:>8} {args.records / elapsed:>11.0f} "
+                      f"{p50 * 1000:>8.2f} {p99 * 1000:>8.2f} {args.records / drained:>16.0f}")
+                asyncio.run(spool.close())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Circuit breakers for the external clients, and backlogs of the work they skip.
+
+A breaker opens after BREAKER_FAILURE_THRESHOLD consecutive failures. While
+open, callers are told to skip the dependency without waiting on it, so a
+broker that is down costs a request microseconds instead of a connect
+timeout. After BREAKER_RESET_TIMEOUT seconds the breaker turns half-open and
+lets a single call through as a probe: success closes it, failure opens it
+for another period.
+
+What a caller skips or fails to send goes to a Backlog, a bounded in-memory
+queue replayed in order in the background after the next successful call.
+The oldest entries are dropped once it is full. The brokers use the disk
+spool of backend/spool.py instead.
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+
+from backend.deadline import detached
+from backend.metrics import BACKLOG_DROPPED, BREAKER_REJECTED_CALLS, BREAKER_STATE
+
+logger = logging.getLogger(__name__)
+
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", 5))
+# Seconds an open breaker waits before letting a probe through
+BREAKER_RESET_TIMEOUT = float(os.getenv("BREAKER_RESET_TIMEOUT", 10))
+BACKLOG_MAX_ITEMS = int(os.getenv("BACKLOG_MAX_ITEMS", 10_000))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Values of the breaker state gauge
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitBreaker:
+    """
+    Tracks the health of one dependency from the outcome of its calls.
+
+    Callers ask `allow()` before calling and report the outcome with
+    `record_success()` or `record_failure()`.
+    """
+
+    def __init__(self, name, failure_threshold=None, reset_timeout=None):
+        self.name = name
+        self.failure_threshold = BREAKER_FAILURE_THRESHOLD if failure_threshold is None else failure_threshold
+        self.reset_timeout = BREAKER_RESET_TIMEOUT if reset_timeout is None else reset_timeout
+        self.failures = 0
+        self._state = CLOSED
+        self._opened_at = None
+        self._probe_started = None
+        BREAKER_STATE.labels(name).set(STATE_VALUES[CLOSED])
+
+    @property
+    def state(self):
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._set_state(HALF_OPEN)
+        return self._state
+
+    def _set_state(self, state):
+        if state != self._state:
+            logger.info(f"Circuit breaker for {self.name} is now {state}")
+        self._state = state
+        BREAKER_STATE.labels(self.name).set(STATE_VALUES[state])
+
+    def allow(self):
+        """Whether to call the dependency now; in half-open state, one probe at a time."""
+        state = self.state
+        if state == CLOSED:
+            return True
+        now = time.monotonic()
+        # A probe that never reported back (cancelled caller) does not block the next one
+        if state == HALF_OPEN and (
+            self._probe_started is None or now - self._probe_started >= self.reset_timeout
+        ):
+            self._probe_started = now
+            return True
+        BREAKER_REJECTED_CALLS.labels(self.name).inc()
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self._probe_started = None
+        self._set_state(CLOSED)
+
+    def record_failure(self):
+        self.failures += 1
+        self._probe_started = None
+        if self._state == HALF_OPEN or self.failures >= self.failure_threshold:
+            self._opened_at = time.monotonic()
+            self._set_state(OPEN)
+
+    def to_dict(self):
+        return {"state": self.state, "failures": self.failures}
+
+
+class Backlog:
+    """
+    Work skipped while a dependency was failing, replayed through its breaker.
+
+    `replay` is an async callable sending one item and raising on failure;
+    replay stops at the first failure and keeps that item at the front.
+    """
+
+    def __init__(self, name, breaker, replay, max_items=BACKLOG_MAX_ITEMS):
+        self.name = name
+        self.breaker = breaker
+        self.replay = replay
+        self._items = deque()
+        self.max_items = max_items
+        self._task = None
+
+    def add(self, item):
+        if len(self._items) >= self.max_items:
+            self._items.popleft()
+            BACKLOG_DROPPED.labels(self.name).inc()
+            logger.warning(f"{self.name} backlog is full, dropped its oldest entry")
+        self._items.append(item)
+
+    def schedule(self):
+        """Starts replaying in the background unless a replay is running or nothing is pending."""
+        if self._items and (self._task is None or self._task.done()):
+            # Detached: the replay outlives the request that triggered it and must not inherit its deadline
+            self._task = asyncio.create_task(detached(self.replay_all()))
+
+    async def replay_all(self):
+        replayed = 0
+        while self._items and self.breaker.allow():
+            item = self._items.popleft()
+            try:
+                await self.replay(item)
+            except Exception as e:
+                self._items.appendleft(item)
+                self.breaker.record_failure()
+                logger.warning(f"Replaying the {self.name} backlog failed, {len(self._items)} left: {e}")
+                break
+            self.breaker.record_success()
+            replayed += 1
+        if replayed:
+            logger.info(f"Replayed {replayed} entries of the {self.name} backlog")
+
+    def __len__(self):
+        return len(self._items)
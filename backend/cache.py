@@ -0,0 +1,215 @@
+"""
+Two-tier read-through cache for hot single-row lookups.
+
+The first tier is an in-process LRU with a short TTL. The optional second
+tier is shared by every worker: any client with the Redis `mget`/`set(ex=)`/
+`delete` coroutines, such as `redis.asyncio.Redis` for CACHE_REDIS_URL (needs
+the `redis` package) or `InMemorySharedCache` in tests.
+
+`SingleFlight` coalesces identical lookups in flight, so a burst of misses
+for one key costs a single load.
+
+Values must be JSON serializable. Invalidation clears the local tier of the
+calling worker and the shared tier, so other workers can serve a stale entry
+for at most CACHE_LOCAL_TTL seconds. It also gives the key a new generation
+in the shared tier. Shared entries record the generation they were loaded
+under and only count as hits while it is current, so a load that raced with
+an invalidation cannot put its stale value back for every worker.
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from backend.metrics import CACHE_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+CACHE_LOCAL_MAX_ENTRIES = int(os.getenv("CACHE_LOCAL_MAX_ENTRIES", 4096))
+CACHE_LOCAL_TTL = float(os.getenv("CACHE_LOCAL_TTL", 10))
+CACHE_SHARED_TTL = int(os.getenv("CACHE_SHARED_TTL", 300))
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL")
+
+
+class LocalCache:
+    """Bounded LRU whose entries expire `ttl` seconds after they were set."""
+
+    def __init__(self, max_entries=CACHE_LOCAL_MAX_ENTRIES, ttl=CACHE_LOCAL_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class InMemorySharedCache:
+    """Stand-in for a Redis client, implementing the subset the cache uses."""
+
+    def __init__(self):
+        self._entries = {}
+
+    async def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        return value
+
+    async def mget(self, *keys):
+        return [await self.get(key) for key in keys]
+
+    async def set(self, key, value, ex=None):
+        self._entries[key] = (None if ex is None else time.monotonic() + ex, value)
+        return True
+
+    async def delete(self, *keys):
+        return sum(self._entries.pop(key, None) is not None for key in keys)
+
+
+class SingleFlight:
+    """Runs one load per key at a time; concurrent callers await the same result."""
+
+    def __init__(self):
+        self._in_flight = {}
+
+    async def do(self, key, loader):
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(loader())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        # A caller that gives up must not cancel the load for the others
+        return await asyncio.shield(task)
+
+    def __len__(self):
+        return len(self._in_flight)
+
+
+def redis_client(url=CACHE_REDIS_URL):
+    """A Redis client for `url`, or None when no shared tier is configured."""
+    if not url:
+        return None
+    try:
+        import redis.asyncio
+    except ImportError:
+        logger.warning("CACHE_REDIS_URL is set but the redis package is not installed")
+        return None
+    return redis.asyncio.from_url(url)
+
+
+class ReadThroughCache:
+    """
+    Looks keys up in the local tier, then the shared tier, then the loader.
+
+    A shared tier that fails is logged and skipped, so a cache outage only
+    costs the database round trips it was saving.
+    """
+
+    def __init__(self, name, local=None, shared=None, shared_ttl=CACHE_SHARED_TTL):
+        self.name = name
+        self.local = LocalCache() if local is None else local
+        self.shared = shared
+        self.shared_ttl = shared_ttl
+        self._invalidations = 0
+
+    def _key(self, key):
+        return f"{self.name}:{key}"
+
+    @staticmethod
+    def _generation_key(key):
+        return f"{key}:generation"
+
+    async def get_or_load(self, key, loader):
+        """The cached value for `key`, calling the async `loader` on a miss."""
+        key = self._key(key)
+        value = self.local.get(key)
+        if value is not None:
+            CACHE_REQUESTS.labels(self.name, "local_hit").inc()
+            return value
+
+        invalidations = self._invalidations
+        generation = None
+        shared_ok = self.shared is not None
+        if shared_ok:
+            try:
+                cached, generation = await self.shared.mget(key, self._generation_key(key))
+            except Exception as e:
+                logger.warning(f"Shared cache get failed for {key}: {e}")
+                cached, shared_ok = None, False
+            if isinstance(generation, bytes):
+                generation = generation.decode()
+            if cached is not None:
+                entry = json.loads(cached)
+                # Values are never lists; a bare one predates generations
+                entry_generation, value = entry if isinstance(entry, list) else (None, entry)
+                if entry_generation == generation:
+                    CACHE_REQUESTS.labels(self.name, "shared_hit").inc()
+                    self.local.set(key, value)
+                    return value
+
+        CACHE_REQUESTS.labels(self.name, "miss").inc()
+        value = await loader()
+        # An invalidation made by this worker during the load makes `value` stale
+        if invalidations == self._invalidations:
+            self.local.set(key, value)
+        # One made elsewhere gave the key a new generation, which this entry does not carry
+        if shared_ok:
+            try:
+                await self.shared.set(key, json.dumps([generation, value]), ex=self.shared_ttl)
+            except Exception as e:
+                logger.warning(f"Shared cache set failed for {key}: {e}")
+        return value
+
+    async def invalidate(self, *keys):
+        keys = [self._key(key) for key in keys]
+        if not keys:
+            return
+        self._invalidations += 1
+        self.local.delete(*keys)
+        if self.shared is not None:
+            try:
+                # Outlives any entry written under the previous generation
+                await asyncio.gather(*(
+                    self.shared.set(self._generation_key(key), uuid.uuid4().hex, ex=2 * self.shared_ttl)
+                    for key in keys
+                ))
+                await self.shared.delete(*keys)
+            except Exception as e:
+                logger.warning(f"Shared cache delete failed for {keys}: {e}")
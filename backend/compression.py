@@ -0,0 +1,200 @@
+"""
+Response compression negotiated with Accept-Encoding.
+
+zstd, brotli and gzip are supported, preferred in that order when the client
+accepts several with the same weight; zstd and brotli need the `zstandard`
+and `Brotli` packages and are simply not offered without them. Complete
+bodies under COMPRESSION_MIN_SIZE bytes are sent as is. Streamed bodies are
+compressed chunk by chunk and flushed after each chunk, so clients keep
+receiving rows as they are produced.
+
+The compressor CPU time and the bytes in and out are recorded per encoding
+(`compression_cpu_seconds_total`, `compression_input_bytes_total`,
+`compression_output_bytes_total`) to tune the levels against bytes saved.
+"""
+import os
+import time
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from backend.metrics import COMPRESSION_CPU_SECONDS, COMPRESSION_INPUT_BYTES, COMPRESSION_OUTPUT_BYTES
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", 1024))
+GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", 6))
+BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", 4))
+ZSTD_LEVEL = int(os.getenv("COMPRESSION_ZSTD_LEVEL", 3))
+
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/xml",
+)
+
+
+class GzipEncoder:
+    def __init__(self, level=GZIP_LEVEL):
+        # wbits=31 writes the gzip header and trailer
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+class BrotliEncoder:
+    def __init__(self, quality=BROTLI_QUALITY):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+class ZstdEncoder:
+    def __init__(self, level=ZSTD_LEVEL):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+def available_encoders():
+    """Encoders usable in this environment, in order of preference."""
+    encoders = {}
+    if zstandard is not None:
+        encoders["zstd"] = ZstdEncoder
+    if brotli is not None:
+        encoders["br"] = BrotliEncoder
+    encoders["gzip"] = GzipEncoder
+    return encoders
+
+
+def negotiate(accept_encoding, encodings):
+    """The preferred encoding of `encodings` accepted by the client, or None."""
+    weights = {}
+    for part in accept_encoding.split(","):
+        name, *params = [item.strip() for item in part.split(";")]
+        weight = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        if name:
+            weights[name.lower()] = weight
+
+    best, best_weight = None, 0.0
+    for encoding in encodings:
+        weight = weights.get(encoding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing compressible responses the client accepts."""
+
+    def __init__(self, app, minimum_size=COMPRESSION_MIN_SIZE, encoders=None):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.encoders = available_encoders() if encoders is None else encoders
+
+    def _compressible(self, headers):
+        content_type = headers.get("content-type", "")
+        return (
+            "content-encoding" not in headers
+            and "no-transform" not in headers.get("cache-control", "")
+            and (content_type.startswith(COMPRESSIBLE_TYPES) or content_type.endswith("+json"))
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""), self.encoders)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        encoder = None
+        passthrough = False
+
+        def encode(data, more_body):
+            started = time.thread_time()
+            compressed = encoder.compress(data) + (encoder.flush() if more_body else encoder.finish())
+            COMPRESSION_CPU_SECONDS.labels(encoding).inc(time.thread_time() - started)
+            COMPRESSION_INPUT_BYTES.labels(encoding).inc(len(data))
+            COMPRESSION_OUTPUT_BYTES.labels(encoding).inc(len(compressed))
+            return compressed
+
+        async def send_wrapper(message):
+            nonlocal start_message, encoder, passthrough
+            if message["type"] == "http.response.start":
+                # Held back until the first body chunk shows whether to compress
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if encoder is None:
+                headers = MutableHeaders(raw=list(start_message["headers"]))
+                if not self._compressible(headers) or (not more_body and len(body) < self.minimum_size):
+                    passthrough = True
+                    await send(start_message)
+                    await send(message)
+                    return
+
+                encoder = self.encoders[encoding]()
+                body = encode(body, more_body)
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                etag = headers.get("etag")
+                if etag is not None and not etag.startswith("W/"):
+                    # The compressed bytes differ from the identity representation
+                    headers["ETag"] = f"W/{etag}"
+                if more_body:
+                    del headers["Content-Length"]
+                else:
+                    headers["Content-Length"] = str(len(body))
+                await send({**start_message, "headers": headers.raw})
+                await send({"type": "http.response.body", "body": body, "more_body": more_body})
+                return
+
+            await send({"type": "http.response.body", "body": encode(body, more_body), "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
@@ -1,11 +1,18 @@
-from sqlalchemy import create_engine, MetaData
+from sqlalchemy import create_engine, event, MetaData, text
+from sqlalchemy.pool import QueuePool
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
+import time
 
 from dotenv import load_dotenv
 load_dotenv()
 
+from backend.deadline import remaining
+from backend.metrics import DB_POOL_WAIT, DB_QUERY_DURATION
+from backend.shedding import pool_wait
+from backend.tracing import start_sql_span, end_sql_span
+
 DATABASE_USERNAME = os.getenv("DATABASE_USER")
 DATABASE_PASSWORD = os.getenv("DATABASE_PASSWORD")
 DATABASE_HOST = os.getenv("DATABASE_HOST")
@@ -13,7 +20,79 @@ DATABASE_NAME = os.getenv("DATABASE_NAME")
 
 SQLALCHEMY_DATABASE_URL = f"postgresql://{DATABASE_USERNAME}:{DATABASE_PASSWORD}@{DATABASE_HOST}/{DATABASE_NAME}"
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+
+class TimedQueuePool(QueuePool):
+    """QueuePool recording how long each checkout waits, for metrics and load shedding."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            waited = time.perf_counter() - started
+            DB_POOL_WAIT.observe(waited)
+            pool_wait.observe(waited)
+
+
+engine = create_engine(SQLALCHEMY_DATABASE_URL, poolclass=TimedQueuePool)
+
+
+def _operation(statement):
+    # The statement type (SELECT, INSERT, ...) keeps the label cardinality bounded
+    return statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "UNKNOWN"
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def _apply_request_deadline(conn, cursor, statement, parameters, context, executemany):
+    # Caps the transaction's statements at what is left of the request's
+    # budget when it starts. Set once per transaction to spare a round trip
+    # per statement; SET LOCAL lasts until the transaction ends, so pooled
+    # connections come back clean
+    if conn.info.get("statement_timeout_set"):
+        return
+    left = remaining()
+    if left is None or conn.dialect.name != "postgresql":
+        return
+    # 0 would mean no timeout at all
+    cursor.execute(f"SET LOCAL statement_timeout = {max(1, int(left * 1000))}")
+    conn.info["statement_timeout_set"] = True
+
+
+@event.listens_for(engine, "commit")
+@event.listens_for(engine, "rollback")
+def _transaction_ended(conn):
+    conn.info.pop("statement_timeout_set", None)
+
+
+@event.listens_for(engine, "checkin")
+def _connection_returned(dbapi_connection, connection_record):
+    # A connection returned without an explicit end of transaction is rolled back by the pool
+    connection_record.info.pop("statement_timeout_set", None)
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+    start_sql_span(conn, _operation(statement), statement)
+
+
+@event.listens_for(engine, "after_cursor_execute")
+def _record_query_duration(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+    DB_QUERY_DURATION.labels(_operation(statement)).observe(elapsed)
+    end_sql_span(conn)
+
+
+@event.listens_for(engine, "handle_error")
+def _record_query_error(exception_context):
+    conn = exception_context.connection
+    if conn is None or not conn.info.get("query_start_time"):
+        return
+    conn.info["query_start_time"].pop()
+    end_sql_span(conn, exception_context.original_exception)
+
+# A forked worker opens its own connections rather than sharing the parent's sockets
+os.register_at_fork(after_in_child=lambda: engine.dispose(close=False))
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -26,3 +105,10 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def ping_database():
+    """Checks a connection out of the pool and runs `SELECT 1`."""
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+    return True
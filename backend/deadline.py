@@ -0,0 +1,161 @@
+"""
+Per-request deadlines, propagated to every dependency the request waits on.
+
+Each request gets a budget: REQUEST_DEADLINE seconds, the budget of its
+route in ROUTE_DEADLINES, or what the client asks for in `X-Request-Timeout`
+(capped by REQUEST_DEADLINE_MAX). Code about to wait on a dependency asks
+for its timeout with `timeout_for()`:
+
+    await asyncio.wait_for(producer.send_and_wait(...), timeout_for(KAFKA_SEND_TIMEOUT))
+
+which is the dependency's own timeout, shortened to what is left of the
+request's budget. SQL statements get the same cap as a Postgres
+`statement_timeout` (backend/db.py), which also bounds queries running on
+the event loop where no asyncio timeout can interrupt them.
+
+A request still running at its deadline is cancelled and answered with 504.
+Routes streaming large bodies (export, import) have no deadline.
+"""
+import asyncio
+import logging
+import os
+import time
+from contextvars import ContextVar
+
+from fastapi import status
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers
+
+from backend.metrics import DEADLINE_EXCEEDED
+
+logger = logging.getLogger(__name__)
+
+REQUEST_DEADLINE = float(os.getenv("REQUEST_DEADLINE", 10))
+# Longest budget a client may ask for with the header
+REQUEST_DEADLINE_MAX = float(os.getenv("REQUEST_DEADLINE_MAX", 60))
+DEADLINE_HEADER = os.getenv("REQUEST_DEADLINE_HEADER", "X-Request-Timeout")
+
+EXEMPT_PATHS = ("/healthz", "/readyz", "/metrics")
+
+_deadline = ContextVar("request_deadline", default=None)
+
+
+class RouteDeadline:
+    """A budget of `seconds` for matching requests; None means no deadline."""
+
+    def __init__(self, name, seconds, method=None, path=None, prefix=False):
+        self.name = name
+        self.seconds = seconds
+        self.method = method
+        self.path = path.rstrip("/") if path else path
+        self.prefix = prefix
+
+    def matches(self, method, path):
+        if self.method is not None and method != self.method:
+            return False
+        if self.prefix:
+            return path.startswith(self.path)
+        return path.rstrip("/") == self.path
+
+
+ROUTE_DEADLINES = [
+    # Response and request bodies of any size are streamed
+    RouteDeadline("movie_export", None, "GET", "/api/movies/export"),
+    RouteDeadline("movie_import", None, "POST", "/api/movies/import"),
+    # A first request downloads the poster and renders its variants
+    RouteDeadline("posters", 30, "GET", "/api/posters/", prefix=True),
+]
+DEFAULT_DEADLINE = RouteDeadline("default", REQUEST_DEADLINE)
+
+
+def remaining():
+    """Seconds left before the current request's deadline, or None without one."""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.monotonic())
+
+
+def timeout_for(default):
+    """`default`, shortened to the current request's remaining budget."""
+    left = remaining()
+    if left is None:
+        return default
+    return left if default is None else min(default, left)
+
+
+async def detached(coroutine):
+    """Runs `coroutine` without the deadline of the request that started it."""
+    # A task runs in a copy of its creator's context, so this does not touch the request
+    _deadline.set(None)
+    return await coroutine
+
+
+def route_deadline(method, path, routes=ROUTE_DEADLINES, default=DEFAULT_DEADLINE):
+    for route in routes:
+        if route.matches(method, path):
+            return route
+    return default
+
+
+def requested_budget(headers, route):
+    """The budget asked for in the header, or the route's own."""
+    value = headers.get(DEADLINE_HEADER)
+    if value is None or route.seconds is None:
+        return route.seconds
+    try:
+        seconds = float(value)
+    except ValueError:
+        return route.seconds
+    if not seconds > 0:
+        return route.seconds
+    return min(seconds, REQUEST_DEADLINE_MAX)
+
+
+class DeadlineMiddleware:
+    """ASGI middleware giving each request a deadline, answering 504 once it passes."""
+
+    def __init__(self, app, routes=None, default=None):
+        self.app = app
+        self.routes = ROUTE_DEADLINES if routes is None else routes
+        self.default = DEFAULT_DEADLINE if default is None else default
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        route = route_deadline(scope["method"], scope["path"], self.routes, self.default)
+        budget = requested_budget(Headers(scope=scope), route)
+        if budget is None:
+            await self.app(scope, receive, send)
+            return
+
+        response_started = False
+
+        async def send_wrapper(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        token = _deadline.set(time.monotonic() + budget)
+        timeout = asyncio.timeout(budget)
+        try:
+            async with timeout:
+                await self.app(scope, receive, send_wrapper)
+        except TimeoutError:
+            if not timeout.expired():
+                raise
+            DEADLINE_EXCEEDED.labels(route.name).inc()
+            logger.warning(f"{scope['method']} {scope['path']} exceeded its {budget:g}s deadline")
+            if response_started:
+                # Too late for a status; the server closes the unfinished response
+                return
+            response = JSONResponse(
+                {"detail": "The request did not complete in time."},
+                status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            )
+            await response(scope, receive, send)
+        finally:
+            _deadline.reset(token)
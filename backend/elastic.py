@@ -1,26 +1,39 @@
+import os
+from contextlib import contextmanager
+
 from elasticsearch import AsyncElasticsearch
 from elasticsearch import ConnectionError
 
+from backend.breaker import Backlog, CircuitBreaker
+from backend.deadline import timeout_for
+from backend.metrics import ES_REQUEST_DURATION
+from backend.tracing import SpanKind, start_span
+
 es_client = None
 ES_URL = "http://localhost:9200" # Define Elasticsearch URL
+# Seconds an index request may take; shortened to the request's deadline
+ES_REQUEST_TIMEOUT = float(os.getenv("ES_REQUEST_TIMEOUT", 5))
 
 async def connect_elasticsearch():
-    """Initializes and tests the async Elasticsearch connection."""
+    """Initializes and tests the async Elasticsearch connection; returns True on success."""
     global es_client
     print(f"Connecting to Elasticsearch at {ES_URL}...")
     
     try:
-        es_client = AsyncElasticsearch(
-            hosts=[ES_URL],
-        )
+        if es_client is None:
+            es_client = AsyncElasticsearch(
+                hosts=[ES_URL],
+            )
         # Test connection by getting cluster info
         info = await es_client.info()
         print(f"✅ Elasticsearch connection successful. Cluster name: {info['cluster_name']}")
+        return True
     except ConnectionError as e:
         print(f"❌ Failed to connect to Elasticsearch: {e}")
     except Exception as e:
         # Catches version mismatch or other unexpected errors
         print(f"❌ An unexpected error occurred during ES connection: {e}")
+    return False
         
 async def close_elasticsearch():
     """Closes the Elasticsearch connection gracefully."""
@@ -28,4 +41,119 @@ async def close_elasticsearch():
     if es_client:
         await es_client.close() # Close the connection pool
         es_client = None
-        print("❌ Elasticsearch client connection closed.")
\ No newline at end of file
+        print("❌ Elasticsearch client connection closed.")
+
+
+class _ConnectedClient:
+    """
+    The client connected by this worker, looked up on each use.
+
+    Modules importing `es_client` by name would keep the None it holds at
+    import time; they import `connected_client` instead. It is falsy while
+    Elasticsearch is not connected.
+    """
+
+    def __bool__(self):
+        return es_client is not None
+
+    def __getattr__(self, name):
+        return getattr(es_client, name)
+
+
+connected_client = _ConnectedClient()
+
+
+def _forget_client_after_fork():
+    # The parent's connection pool must not be shared; the worker's lifespan connects again
+    global es_client
+    es_client = None
+
+
+os.register_at_fork(after_in_child=_forget_client_after_fork)
+
+
+@contextmanager
+def es_request(operation, index):
+    """Times an Elasticsearch call and traces it as a client span."""
+    attributes = {"db.system": "elasticsearch", "db.operation": operation,
+                  "elasticsearch.index": index}
+    with ES_REQUEST_DURATION.labels(operation).time(), \
+            start_span(f"elasticsearch {operation} {index}", SpanKind.CLIENT, attributes):
+        yield
+
+
+async def _index(client, index, id, document):
+    with es_request("index", index):
+        await client.options(request_timeout=timeout_for(ES_REQUEST_TIMEOUT)).index(
+            index=index, id=id, document=document
+        )
+
+
+# Documents are indexed by id, so replaying one indexed before is harmless
+es_breaker = CircuitBreaker("elasticsearch")
+es_backlog = Backlog("elasticsearch", es_breaker, lambda item: _index(connected_client, *item))
+
+
+async def index_document(client, index, id, document):
+    """
+    Indexes `document`; returns False when it was kept in the backlog instead.
+
+    While Elasticsearch is failing, documents are not sent but replayed once
+    an indexing call succeeds again, so a write never fails on the index.
+    """
+    if not es_breaker.allow():
+        es_backlog.add((index, id, document))
+        return False
+    try:
+        await _index(client, index, id, document)
+    except Exception as e:
+        es_breaker.record_failure()
+        es_backlog.add((index, id, document))
+        print(f"❌ Failed to index {index}/{id}: {e}")
+        return False
+    es_breaker.record_success()
+    es_backlog.schedule()
+    return True
+
+
+async def _bulk_index(client, index, documents):
+    """Indexes `documents` (id -> document) in one request; returns the ids it refused, as strings."""
+    operations = []
+    for id, document in documents.items():
+        operations += [{"index": {"_index": index, "_id": id}}, document]
+    with es_request("bulk", index):
+        response = await client.options(request_timeout=timeout_for(ES_REQUEST_TIMEOUT)).bulk(
+            operations=operations
+        )
+    if not response.get("errors"):
+        return set()
+    return {item["index"]["_id"] for item in response["items"] if item["index"].get("error")}
+
+
+async def index_documents(client, index, documents):
+    """
+    Indexes `documents` (id -> document) with one bulk request, as
+    `index_document` does one by one; returns False when any was kept in the
+    backlog instead.
+    """
+    if not documents:
+        return True
+    if not es_breaker.allow():
+        for id, document in documents.items():
+            es_backlog.add((index, id, document))
+        return False
+    try:
+        refused = await _bulk_index(client, index, documents)
+    except Exception as e:
+        es_breaker.record_failure()
+        for id, document in documents.items():
+            es_backlog.add((index, id, document))
+        print(f"❌ Failed to bulk index {len(documents)} documents into {index}: {e}")
+        return False
+    es_breaker.record_success()
+    # Refused items are retried one by one with the backlog
+    for id, document in documents.items():
+        if str(id) in refused:
+            es_backlog.add((index, id, document))
+    es_backlog.schedule()
+    return not refused
@@ -0,0 +1,34 @@
+"""
+Strong ETags and `If-None-Match` handling for conditional GETs.
+
+Listings are tagged with a version that every write to them bumps, so an
+unchanged listing is answered with `304 Not Modified` before it is queried
+or serialized.
+"""
+from fastapi import Response, status
+
+# Clients must revalidate, but may keep the body and send If-None-Match
+CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(*parts):
+    return '"' + "-".join(str(part) for part in parts) + '"'
+
+
+def etag_matches(if_none_match, etag):
+    """Whether an If-None-Match header value matches `etag` (weak comparison)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(
+        candidate.strip().removeprefix("W/") == etag
+        for candidate in if_none_match.split(",")
+    )
+
+
+def not_modified(etag, cache_control=CACHE_CONTROL):
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        headers={"ETag": etag, "Cache-Control": cache_control},
+    )
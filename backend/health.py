@@ -0,0 +1,148 @@
+import asyncio
+import os
+import time
+
+from fastapi import APIRouter, status
+from fastapi.responses import JSONResponse
+
+from backend import elastic, kafkaConnection
+from backend.db import ping_database
+from backend.elastic import connect_elasticsearch, close_elasticsearch
+from backend.kafkaConnection import connect_kafka, close_kafka
+from backend.lifecycle import Dependency, DependencyManager, UP
+from backend.rabbitMQ import rabbitmq_manager
+
+# Probe results are reused for this long, so frequent probes from several
+# load balancers do not turn into load on the dependencies
+HEALTH_CACHE_TTL = float(os.getenv("HEALTH_CACHE_TTL", 2))
+HEALTH_PROBE_TIMEOUT = float(os.getenv("HEALTH_PROBE_TIMEOUT", 2))
+# A required dependency slower than this makes the instance not ready
+HEALTH_SLOW_THRESHOLD_MS = float(os.getenv("HEALTH_SLOW_THRESHOLD_MS", 1000))
+
+router = APIRouter(tags=["Health"])
+
+# Connected concurrently at startup; only Postgres gates readiness, the others
+# degrade their features while they reconnect in the background
+dependency_manager = DependencyManager([
+    Dependency("postgres", lambda: asyncio.to_thread(ping_database), required=True),
+    Dependency("elasticsearch", connect_elasticsearch, close_elasticsearch),
+    Dependency("rabbitmq", rabbitmq_manager.connect, rabbitmq_manager.disconnect),
+    Dependency("kafka", connect_kafka, close_kafka),
+])
+
+
+async def probe_postgres():
+    # Pool checkout + SELECT 1, in a thread as the engine is synchronous
+    await asyncio.to_thread(ping_database)
+
+
+async def probe_elasticsearch():
+    if elastic.es_client is None or not await elastic.es_client.ping():
+        raise ConnectionError("cluster not reachable")
+
+
+async def probe_kafka():
+    connection = kafkaConnection.kafka_connection
+    if connection is None or not connection._producer_started:
+        raise ConnectionError("producer not started")
+    # A metadata round trip proves the producer can reach a broker
+    await connection.producer.client.fetch_all_metadata()
+
+
+async def probe_rabbitmq():
+    channel = rabbitmq_manager.channel
+    if channel is None or channel.is_closed:
+        raise ConnectionError("channel closed")
+
+
+class HealthChecker:
+    """
+    Probes dependencies concurrently and caches the results for `ttl` seconds.
+
+    Concurrent callers share one in-flight round of probes. A failed probe of
+    a dependency the manager believes is up hands it back to the manager for
+    background reconnection.
+    """
+
+    def __init__(self, probes, manager, ttl=HEALTH_CACHE_TTL, timeout=HEALTH_PROBE_TIMEOUT,
+                 slow_threshold_ms=HEALTH_SLOW_THRESHOLD_MS):
+        self.probes = probes
+        self.manager = manager
+        self.ttl = ttl
+        self.timeout = timeout
+        self.slow_threshold_ms = slow_threshold_ms
+        self._results = None
+        self._checked_at = 0.0
+        self._in_flight = None
+
+    async def _probe(self, name, probe):
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(probe(), self.timeout)
+            result = {"status": "up"}
+        except asyncio.TimeoutError:
+            result = {"status": "down", "error": f"timed out after {self.timeout}s"}
+        except Exception as e:
+            result = {"status": "down", "error": str(e) or type(e).__name__}
+        result["latency_ms"] = round((time.perf_counter() - started) * 1000, 2)
+
+        dependency = self.manager.dependencies.get(name)
+        if dependency is not None:
+            result["required"] = dependency.required
+            if result["status"] == "down" and dependency.state == UP:
+                self.manager.mark_down(name, result["error"])
+        return name, result
+
+    async def _check(self):
+        results = await asyncio.gather(
+            *(self._probe(name, probe) for name, probe in self.probes.items())
+        )
+        self._results = dict(results)
+        self._checked_at = time.monotonic()
+        return self._results
+
+    async def check(self):
+        if self._results is not None and time.monotonic() - self._checked_at < self.ttl:
+            return self._results
+        if self._in_flight is None:
+            self._in_flight = asyncio.ensure_future(self._check())
+            self._in_flight.add_done_callback(lambda _: setattr(self, "_in_flight", None))
+        # Shielded so a disconnecting caller does not cancel the others' round
+        return await asyncio.shield(self._in_flight)
+
+    def is_ready(self, results):
+        return all(
+            result["status"] == "up" and result["latency_ms"] <= self.slow_threshold_ms
+            for result in results.values()
+            if result.get("required")
+        )
+
+
+health_checker = HealthChecker(
+    {
+        "postgres": probe_postgres,
+        "elasticsearch": probe_elasticsearch,
+        "kafka": probe_kafka,
+        "rabbitmq": probe_rabbitmq,
+    },
+    dependency_manager,
+)
+
+
+@router.get("/healthz")
+async def healthz():
+    """Liveness: 200 while the process serves requests, with per-dependency probes."""
+    results = await health_checker.check()
+    degraded = any(result["status"] != "up" for result in results.values())
+    return {"status": "degraded" if degraded else "ok", "dependencies": results}
+
+
+@router.get("/readyz")
+async def readyz():
+    """Readiness: Postgres answers within the slow threshold; others may be degraded."""
+    results = await health_checker.check()
+    ready = health_checker.is_ready(results)
+    return JSONResponse(
+        status_code=status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"status": "ready" if ready else "not ready", "dependencies": results},
+    )
@@ -1,13 +1,26 @@
-from aiokafka import AIOKafkaProducer, AIOKafkaConsumer
+from aiokafka import AIOKafkaProducer, AIOKafkaConsumer, TopicPartition
 import json
 import logging
+import os
 import asyncio
+import time
 from typing import Optional, Dict, Any
 
+from backend.breaker import CircuitBreaker
+from backend.deadline import timeout_for
+from backend.metrics import KAFKA_SEND_DURATION, KAFKA_SEND_FAILURES, KAFKA_CONSUMER_LAG
+from backend.spool import SPOOL_FAST_ACK, Spool, SpoolDrainer
+from backend.tracing import SpanKind, kafka_headers, start_span
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Seconds a request may wait for the producer to connect and for a send to be
+# acknowledged; both are shortened to the request's deadline
+KAFKA_CONNECT_TIMEOUT = float(os.getenv("KAFKA_CONNECT_TIMEOUT", 5))
+KAFKA_SEND_TIMEOUT = float(os.getenv("KAFKA_SEND_TIMEOUT", 5))
+
 class KafkaConnection:
     def __init__(self, bootstrap_servers='localhost:9092'):
         self.bootstrap_servers = bootstrap_servers
@@ -15,6 +28,11 @@ class KafkaConnection:
         self.consumer = None
         self._producer_started = False
         self._consumer_started = False
+        # While Kafka fails, sends are skipped instead of reconnecting on every
+        # request, and spooled to disk until the drainer can publish them
+        self.breaker = CircuitBreaker("kafka")
+        self.spool = Spool("kafka")
+        self.drainer = SpoolDrainer(self.spool, self.breaker, self._publish_spooled)
     
     async def create_producer(self):
         """Create and start async Kafka producer"""
@@ -32,11 +50,17 @@ class KafkaConnection:
                 logger.info("Kafka producer created and started successfully")
             
             return self.producer
+        except asyncio.CancelledError:
+            # Interrupted by a connect timeout, the next attempt starts a fresh producer
+            self.producer = None
+            raise
         except Exception as e:
             logger.error(f"Failed to create producer: {e}")
+            # A producer whose start failed cannot be restarted
+            self.producer = None
             return None
     
-    async def create_consumer(self, topic, group_id='default-group'):
+    async def create_consumer(self, topic, group_id='default-group', auto_offset_reset='earliest'):
         """Create and start async Kafka consumer"""
         try:
             if not self.consumer:
@@ -45,7 +69,7 @@ class KafkaConnection:
                     bootstrap_servers=self.bootstrap_servers,
                     group_id=group_id,
                     value_deserializer=lambda m: json.loads(m.decode('utf-8')) if m else None,
-                    auto_offset_reset='earliest'
+                    auto_offset_reset=auto_offset_reset
                 )
             
             if not self._consumer_started:
@@ -59,18 +83,123 @@ class KafkaConnection:
             return None
     
     async def send_message(self, topic, message, key=None):
-        """Send message to Kafka topic"""
-        if not self.producer or not self._producer_started:
-            await self.create_producer()
-        
+        """
+        Send message to Kafka topic.
+
+        Returns True once Kafka acknowledged it, or once it is spooled in
+        fast-ack mode; False when it was spooled because Kafka is failing.
+        """
+        if SPOOL_FAST_ACK:
+            return await self._spool(topic, message, key)
+        # Behind spooled messages, a message waits its turn so the order is kept
+        if self.spool.has_pending() or not self.breaker.allow():
+            await self._spool(topic, message, key)
+            return False
         try:
-            await self.producer.send_and_wait(topic, value=message, key=key)
-            logger.info(f"Message sent to topic {topic}")
-            return True
+            await self._publish(topic, message, key)
         except Exception as e:
+            self.breaker.record_failure()
             logger.error(f"Failed to send message: {e}")
+            await self._spool(topic, message, key)
+            return False
+        self.breaker.record_success()
+        logger.info(f"Message sent to topic {topic}")
+        return True
+
+    async def send_messages(self, topic, messages):
+        """
+        Sends (message, key) pairs without waiting for each acknowledgement.
+
+        Every message is handed to the producer first, then the batch waits
+        once for all of them; the producer keeps the order within a
+        partition. Returns True once all were acknowledged (or spooled in
+        fast-ack mode); False when some were spooled because Kafka failed.
+        """
+        if not messages:
+            return True
+        if SPOOL_FAST_ACK:
+            return all(await asyncio.gather(*(self._spool(topic, message, key) for message, key in messages)))
+        if self.spool.has_pending() or not self.breaker.allow():
+            await asyncio.gather(*(self._spool(topic, message, key) for message, key in messages))
             return False
+        try:
+            failed = await self._publish_batch(topic, messages)
+        except Exception as e:
+            logger.error(f"Failed to send messages: {e}")
+            failed = messages
+        if failed:
+            self.breaker.record_failure()
+            await asyncio.gather(*(self._spool(topic, message, key) for message, key in failed))
+            return False
+        self.breaker.record_success()
+        logger.info(f"{len(messages)} messages sent to topic {topic}")
+        return True
+
+    async def _spool(self, topic, message, key):
+        payload = json.dumps({"topic": topic, "value": message, "key": key}).encode('utf-8')
+        try:
+            await self.spool.append(payload)
+        except OSError as e:
+            logger.error(f"Failed to spool message for topic {topic}, it is lost: {e}")
+            return False
+        return True
+
+    async def _publish_spooled(self, payload):
+        record = json.loads(payload)
+        await self._publish(record["topic"], record["value"], record["key"])
+
+    async def _publish(self, topic, message, key=None):
+        """Sends one message and waits for its acknowledgement; raises on failure."""
+        started = time.perf_counter()
+        with start_span(f"{topic} publish", SpanKind.PRODUCER,
+                        {"messaging.system": "kafka", "messaging.destination.name": topic}) as span:
+            try:
+                if not self.producer or not self._producer_started:
+                    await asyncio.wait_for(self.create_producer(), timeout_for(KAFKA_CONNECT_TIMEOUT))
+                    if not self._producer_started:
+                        raise ConnectionError("producer not started")
+                # Consumers continue the trace from these headers
+                headers = kafka_headers()
+                if headers:
+                    send = self.producer.send_and_wait(topic, value=message, key=key, headers=headers)
+                else:
+                    send = self.producer.send_and_wait(topic, value=message, key=key)
+                await asyncio.wait_for(send, timeout_for(KAFKA_SEND_TIMEOUT))
+            except Exception as e:
+                KAFKA_SEND_FAILURES.labels(topic).inc()
+                span.record_exception(e)
+                raise
+        KAFKA_SEND_DURATION.labels(topic).observe(time.perf_counter() - started)
     
+    async def _publish_batch(self, topic, messages):
+        """Sends the messages and waits for their acknowledgements; returns those that failed."""
+        started = time.perf_counter()
+        with start_span(f"{topic} publish", SpanKind.PRODUCER,
+                        {"messaging.system": "kafka", "messaging.destination.name": topic,
+                         "messaging.batch.message_count": len(messages)}):
+            if not self.producer or not self._producer_started:
+                await asyncio.wait_for(self.create_producer(), timeout_for(KAFKA_CONNECT_TIMEOUT))
+                if not self._producer_started:
+                    raise ConnectionError("producer not started")
+            headers = kafka_headers()
+            extra = {"headers": headers} if headers else {}
+            # send() only queues the message and returns its delivery future
+            deliveries = [
+                await self.producer.send(topic, value=message, key=key, **extra)
+                for message, key in messages
+            ]
+            await asyncio.wait(deliveries, timeout=timeout_for(KAFKA_SEND_TIMEOUT))
+        failed = [
+            pair for pair, delivery in zip(messages, deliveries)
+            if not delivery.done() or delivery.cancelled() or delivery.exception() is not None
+        ]
+        if failed:
+            KAFKA_SEND_FAILURES.labels(topic).inc(len(failed))
+        elapsed = time.perf_counter() - started
+        for _ in range(len(messages) - len(failed)):
+            KAFKA_SEND_DURATION.labels(topic).observe(elapsed)
+        return failed
+
     async def close_connections(self):
         """Close producer and consumer connections"""
         try:
@@ -88,9 +217,29 @@ class KafkaConnection:
         except Exception as e:
             logger.error(f"Error closing Kafka connections: {e}")
 
+def record_consumer_lag(consumer, message, group_id):
+    """Updates the consumer lag gauge of the message's partition after consuming it."""
+    try:
+        highwater = consumer.highwater(TopicPartition(message.topic, message.partition))
+        if highwater is not None:
+            KAFKA_CONSUMER_LAG.labels(message.topic, str(message.partition), str(group_id)).set(
+                max(highwater - message.offset - 1, 0)
+            )
+    except Exception as e:
+        logger.debug(f"Could not record consumer lag: {e}")
+
 # Global Kafka connection instance
 kafka_connection = None
 
+
+def _forget_connection_after_fork():
+    # The parent's producer belongs to its event loop; the worker's lifespan connects again
+    global kafka_connection
+    kafka_connection = None
+
+
+os.register_at_fork(after_in_child=_forget_connection_after_fork)
+
 async def get_kafka_connection():
     """Get or create global Kafka connection"""
     global kafka_connection
@@ -99,6 +248,21 @@ async def get_kafka_connection():
         await kafka_connection.create_producer()
     return kafka_connection
 
+async def connect_kafka():
+    """Starts the global producer; returns True once it is connected."""
+    kafka_conn = await get_kafka_connection()
+    # Publishes what earlier processes spooled, and what this one spools while Kafka is down
+    kafka_conn.drainer.start()
+    if not kafka_conn._producer_started:
+        await kafka_conn.create_producer()
+    return kafka_conn._producer_started
+
+async def close_kafka():
+    if kafka_connection:
+        await kafka_connection.drainer.stop()
+        await kafka_connection.close_connections()
+        await kafka_connection.spool.close()
+
 async def send_kafka_message(topic: str, message: Dict[str, Any], key: Optional[str] = None):
     """Utility function to send Kafka message"""
     try:
@@ -108,6 +272,15 @@ async def send_kafka_message(topic: str, message: Dict[str, Any], key: Optional[
         logger.error(f"Error sending Kafka message: {e}")
         return False
 
+async def send_kafka_messages(topic: str, messages):
+    """Utility function to send a batch of (message, key) pairs"""
+    try:
+        kafka_conn = await get_kafka_connection()
+        return await kafka_conn.send_messages(topic, messages)
+    except Exception as e:
+        logger.error(f"Error sending Kafka messages: {e}")
+        return False
+
 # Example usage
 if __name__ == "__main__":
     kafka_conn = KafkaConnection()
@@ -1,6 +1,13 @@
 import asyncio
 import logging
-from kafkaConnection import KafkaConnection
+import os
+import sys
+
+# Make the `backend` package importable when run as a script
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.kafkaConnection import KafkaConnection, record_consumer_lag
+from backend.tracing import SpanKind, extract_kafka_context, setup_tracing, shutdown_tracing, start_span
 
 # Configure logging
 logging.basicConfig(
@@ -112,6 +119,10 @@ class KafkaEventConsumer:
             'playlist-events': self.event_processor.process_playlist_event,
         }
     
+    @staticmethod
+    def group_id(topic):
+        return f'fast-movies-{topic}-consumer'
+
     async def start_consuming(self):
         """Start consuming messages from all topics."""
         logger.info("Starting Kafka event consumer...")
@@ -122,7 +133,7 @@ class KafkaEventConsumer:
             for topic, handler in self.topics.items():
                 consumer = await self.kafka_connection.create_consumer(
                     topic, 
-                    group_id=f'fast-movies-{topic}-consumer'
+                    group_id=self.group_id(topic)
                 )
                 if consumer:
                     consumers.append((consumer, handler, topic))
@@ -159,7 +170,14 @@ class KafkaEventConsumer:
                 try:
                     logger.debug(f"Received message from {topic}: {message.value}")
                     print(f"Received message from {topic}: {message.value}")
-                    await handler(message.value)
+                    # Continues the trace of the request that produced the event
+                    with start_span(
+                        f"{topic} process", SpanKind.CONSUMER,
+                        {"messaging.system": "kafka", "messaging.destination.name": topic},
+                        parent=extract_kafka_context(message.headers),
+                    ):
+                        await handler(message.value)
+                    record_consumer_lag(consumer, message, self.group_id(topic))
                 except Exception as e:
                     logger.error(f"Error processing message from {topic}: {e}")
                     
@@ -170,8 +188,12 @@ async def main():
     """Main function to start the Kafka consumer."""
     logger.info("🚀 Starting Fast React Movies Kafka Consumer")
     
+    setup_tracing()
     consumer = KafkaEventConsumer()
-    await consumer.start_consuming()
+    try:
+        await consumer.start_consuming()
+    finally:
+        shutdown_tracing()
 
 if __name__ == "__main__":
     # Run the consumer
@@ -0,0 +1,149 @@
+import asyncio
+import logging
+import os
+import random
+import time
+
+logger = logging.getLogger(__name__)
+
+# Seconds each dependency gets to connect before the app starts without it
+CONNECT_TIMEOUT = float(os.getenv("DEPENDENCY_CONNECT_TIMEOUT", 5))
+# Backoff between background reconnection attempts
+RECONNECT_INITIAL_DELAY = float(os.getenv("DEPENDENCY_RECONNECT_INITIAL_DELAY", 1))
+RECONNECT_MAX_DELAY = float(os.getenv("DEPENDENCY_RECONNECT_MAX_DELAY", 30))
+
+STARTING = "starting"
+UP = "up"
+DOWN = "down"
+
+
+class Dependency:
+    """
+    An external service the app connects to at startup.
+
+    `connect` is an async callable returning a truthy value on success (a
+    falsy return or an exception counts as a failure); `close` is optional.
+    Required dependencies gate readiness, the others only degrade features.
+    """
+
+    def __init__(self, name, connect, close=None, required=False, timeout=None):
+        self.name = name
+        self.connect = connect
+        self.close = close
+        self.required = required
+        self.timeout = CONNECT_TIMEOUT if timeout is None else timeout
+        self.state = STARTING
+        self.error = None
+        self.attempts = 0
+        self.since = time.time()
+
+    def _set_state(self, state, error=None):
+        if state != self.state:
+            self.since = time.time()
+        self.state = state
+        self.error = error
+
+    def to_dict(self):
+        return {
+            "state": self.state,
+            "required": self.required,
+            "attempts": self.attempts,
+            "since": self.since,
+            "error": self.error,
+        }
+
+
+class DependencyManager:
+    """
+    Starts dependencies concurrently and keeps reconnecting the ones that fail.
+
+    Each connect attempt is bounded by the dependency's timeout, so a cold
+    start takes as long as the slowest dependency's timeout rather than the
+    sum of them. Failed dependencies are retried in the background with
+    exponential backoff while the app serves requests in degraded mode.
+    """
+
+    def __init__(self, dependencies, initial_delay=RECONNECT_INITIAL_DELAY,
+                 max_delay=RECONNECT_MAX_DELAY):
+        self.dependencies = {dependency.name: dependency for dependency in dependencies}
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self._reconnect_tasks = {}
+
+    async def _attempt(self, dependency):
+        dependency.attempts += 1
+        try:
+            connected = await asyncio.wait_for(dependency.connect(), dependency.timeout)
+            if not connected:
+                raise ConnectionError("connect reported failure")
+        except asyncio.TimeoutError:
+            dependency._set_state(DOWN, f"timed out after {dependency.timeout}s")
+        except Exception as e:
+            dependency._set_state(DOWN, str(e) or type(e).__name__)
+        else:
+            dependency._set_state(UP)
+            return True
+        return False
+
+    async def _reconnect(self, dependency):
+        delay = self.initial_delay
+        try:
+            while not await self._attempt(dependency):
+                # Jitter keeps the workers of a restarted fleet from retrying in lockstep
+                await asyncio.sleep(delay * random.uniform(0.5, 1.5))
+                delay = min(delay * 2, self.max_delay)
+            logger.info(f"Reconnected to {dependency.name} after {dependency.attempts} attempts")
+        finally:
+            self._reconnect_tasks.pop(dependency.name, None)
+
+    def _schedule_reconnect(self, dependency):
+        if dependency.name not in self._reconnect_tasks:
+            self._reconnect_tasks[dependency.name] = asyncio.create_task(
+                self._reconnect(dependency)
+            )
+
+    async def start(self):
+        """Connects every dependency concurrently; never raises."""
+        started = time.perf_counter()
+        dependencies = list(self.dependencies.values())
+        results = await asyncio.gather(*(self._attempt(d) for d in dependencies))
+        for dependency, connected in zip(dependencies, results):
+            if connected:
+                logger.info(f"Connected to {dependency.name}")
+            else:
+                logger.warning(
+                    f"{dependency.name} unavailable at startup ({dependency.error}), "
+                    "reconnecting in the background"
+                )
+                self._schedule_reconnect(dependency)
+        logger.info(f"Dependencies started in {time.perf_counter() - started:.2f}s")
+
+    def mark_down(self, name, error=None):
+        """Records a dependency lost after startup and starts reconnecting it."""
+        dependency = self.dependencies[name]
+        dependency._set_state(DOWN, error)
+        self._schedule_reconnect(dependency)
+
+    async def stop(self):
+        tasks = list(self._reconnect_tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._reconnect_tasks.clear()
+
+        async def close(dependency):
+            try:
+                await asyncio.wait_for(dependency.close(), dependency.timeout)
+            except Exception as e:
+                logger.warning(f"Error closing {dependency.name}: {e}")
+
+        await asyncio.gather(*(
+            close(d) for d in self.dependencies.values() if d.close is not None
+        ))
+
+    def is_ready(self):
+        """Ready once every required dependency is up (the others may be degraded)."""
+        return all(d.state == UP for d in self.dependencies.values() if d.required)
+
+    def status(self):
+        return {name: dependency.to_dict() for name, dependency in self.dependencies.items()}
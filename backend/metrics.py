@@ -0,0 +1,217 @@
+"""
+Prometheus metrics for the HTTP, database and broker hot paths.
+
+With several workers, set PROMETHEUS_MULTIPROC_DIR to an empty, writable
+directory before the workers start: every process then writes its samples to
+memory-mapped files there and `/metrics` aggregates them, whichever worker
+answers the scrape.
+"""
+import os
+import time
+
+from fastapi import APIRouter, Response
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client import multiprocess
+
+MULTIPROCESS_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+# Buckets for in-process calls (queries, broker round trips), in seconds
+FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "HTTP requests currently being served",
+    ["method"],
+    multiprocess_mode="livesum",
+)
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds",
+    "SQL statement execution time by statement type",
+    ["operation"],
+    buckets=FAST_BUCKETS,
+)
+DB_POOL_WAIT = Histogram(
+    "db_pool_wait_seconds",
+    "Time to check a connection out of the pool",
+    buckets=FAST_BUCKETS,
+)
+KAFKA_SEND_DURATION = Histogram(
+    "kafka_send_duration_seconds",
+    "Time to send a message and wait for the broker acknowledgement",
+    ["topic"],
+    buckets=FAST_BUCKETS,
+)
+KAFKA_SEND_FAILURES = Counter(
+    "kafka_send_failures_total",
+    "Kafka messages that could not be sent",
+    ["topic"],
+)
+KAFKA_CONSUMER_LAG = Gauge(
+    "kafka_consumer_lag",
+    "Messages between a consumer's position and the partition high watermark",
+    ["topic", "partition", "group"],
+    multiprocess_mode="max",
+)
+RABBITMQ_PUBLISH_DURATION = Histogram(
+    "rabbitmq_publish_duration_seconds",
+    "Time to publish a message to RabbitMQ",
+    ["routing_key"],
+    buckets=FAST_BUCKETS,
+)
+RABBITMQ_PUBLISH_FAILURES = Counter(
+    "rabbitmq_publish_failures_total",
+    "RabbitMQ messages that could not be published",
+    ["routing_key"],
+)
+SPOOL_RECORDS = Counter(
+    "spool_records_total",
+    "Broker events in the local spool by outcome (appended, replayed, corrupt)",
+    ["spool", "outcome"],
+)
+SPOOL_FSYNC_DURATION = Histogram(
+    "spool_fsync_duration_seconds",
+    "Time of one batched fsync of the local spool",
+    ["spool"],
+    buckets=FAST_BUCKETS,
+)
+ES_REQUEST_DURATION = Histogram(
+    "elasticsearch_request_duration_seconds",
+    "Elasticsearch call latency by operation",
+    ["operation"],
+    buckets=FAST_BUCKETS,
+)
+OMDB_REQUEST_DURATION = Histogram(
+    "omdb_request_duration_seconds",
+    "OMDb API call latency by endpoint and outcome",
+    ["endpoint", "outcome"],
+)
+CACHE_REQUESTS = Counter(
+    "cache_requests_total",
+    "Read-through cache lookups by the tier that answered (local_hit, shared_hit, miss)",
+    ["cache", "result"],
+)
+RATE_LIMITED_REQUESTS = Counter(
+    "rate_limited_requests_total",
+    "Requests refused with 429 by route budget",
+    ["limit"],
+)
+SHED_REQUESTS = Counter(
+    "shed_requests_total",
+    "Requests refused with 503 while overloaded, by overload signal",
+    ["reason"],
+)
+DEADLINE_EXCEEDED = Counter(
+    "request_deadline_exceeded_total",
+    "Requests cancelled at their deadline, by route budget",
+    ["route"],
+)
+BREAKER_STATE = Gauge(
+    "circuit_breaker_state",
+    "Circuit breaker state by dependency: 0 closed, 1 half-open, 2 open",
+    ["dependency"],
+    multiprocess_mode="max",
+)
+BREAKER_REJECTED_CALLS = Counter(
+    "circuit_breaker_rejected_calls_total",
+    "Calls skipped because the dependency's circuit breaker was open",
+    ["dependency"],
+)
+BACKLOG_DROPPED = Counter(
+    "backlog_dropped_total",
+    "Entries dropped from a full backlog of skipped calls, by dependency",
+    ["dependency"],
+)
+EVENT_LOOP_LAG = Gauge(
+    "event_loop_lag_seconds",
+    "How late the event loop ran its last scheduled wake-up",
+    multiprocess_mode="max",
+)
+COMPRESSION_CPU_SECONDS = Counter(
+    "compression_cpu_seconds_total",
+    "CPU time spent compressing response bodies",
+    ["encoding"],
+)
+COMPRESSION_INPUT_BYTES = Counter(
+    "compression_input_bytes_total",
+    "Response bytes before compression",
+    ["encoding"],
+)
+COMPRESSION_OUTPUT_BYTES = Counter(
+    "compression_output_bytes_total",
+    "Response bytes after compression",
+    ["encoding"],
+)
+
+
+class PrometheusMiddleware:
+    """
+    ASGI middleware recording request latency and in-flight requests.
+
+    Requests are labelled with the matched route template (`/api/movies/{movie_id}`)
+    rather than the raw path, which keeps the label cardinality bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+        in_progress = HTTP_REQUESTS_IN_PROGRESS.labels(method)
+        in_progress.inc()
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            in_progress.dec()
+            route = scope.get("route")
+            HTTP_REQUEST_DURATION.labels(
+                method, route.path if route is not None else "unmatched", str(status_code)
+            ).observe(time.perf_counter() - started)
+
+
+def metrics_registry():
+    if not MULTIPROCESS_DIR:
+        return REGISTRY
+    # Collected per scrape: aggregates the files written by every worker
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def mark_process_dead(pid):
+    """Drops a dead worker's live gauges (call from the process manager)."""
+    if MULTIPROCESS_DIR:
+        multiprocess.mark_process_dead(pid)
+
+
+router = APIRouter(tags=["Metrics"])
+
+
+@router.get("/metrics", include_in_schema=False)
+def metrics():
+    return Response(generate_latest(metrics_registry()), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,321 @@
+import json
+import os
+
+import joblib
+import numpy as np
+from sklearn.decomposition import TruncatedSVD
+from sklearn.preprocessing import normalize
+
+from backend.ml.ranking import top_k
+
+try:
+    import hnswlib
+except ImportError:  # hnswlib is optional, the NumPy IVF index is always available
+    hnswlib = None
+
+ANN_DIR = 'ann_index'
+SVD_FILE = 'svd.pkl'
+INDEX_FILE = 'index.npz'
+HNSW_FILE = 'index.hnsw'
+META_FILE = 'meta.json'
+
+
+class IVFIndex:
+    """
+    Inverted-file index over L2-normalized embeddings, implemented with NumPy.
+
+    Vectors are clustered with spherical k-means; a query only scans the
+    vectors of the `n_probe` clusters whose centroids are closest to it, so
+    query cost grows with n_probe * N / n_lists instead of N.
+    """
+
+    def __init__(self, n_lists=None, n_probe=8, n_iter=10, seed=42):
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.n_iter = n_iter
+        self.seed = seed
+        self.centroids = None
+        self.vectors = None
+        self.lists = []
+
+    def __len__(self):
+        return 0 if self.vectors is None else self.vectors.shape[0]
+
+    def build(self, vectors, sample_size=100_000):
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        n_vectors = vectors.shape[0]
+        rng = np.random.default_rng(self.seed)
+        if self.n_lists is None:
+            self.n_lists = max(1, int(4 * np.sqrt(n_vectors)))
+        self.n_lists = min(self.n_lists, n_vectors)
+
+        # Train the centroids on a sample, the full catalog is only assigned
+        sample = vectors[rng.choice(n_vectors, min(sample_size, n_vectors), replace=False)]
+        centroids = sample[rng.choice(sample.shape[0], self.n_lists, replace=False)].copy()
+        for _ in range(self.n_iter):
+            assignments = self._nearest_centroid(sample, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, sample)
+            empty = ~sums.any(axis=1)
+            # Re-seed empty clusters with random sample points
+            sums[empty] = sample[rng.choice(sample.shape[0], int(empty.sum()))]
+            centroids = normalize(sums)
+        self.centroids = centroids.astype(np.float32)
+
+        self.vectors = vectors
+        assignments = self._nearest_centroid(vectors, self.centroids)
+        order = np.argsort(assignments, kind="stable")
+        bounds = np.searchsorted(assignments[order], np.arange(self.n_lists + 1))
+        self.lists = [order[bounds[i]:bounds[i + 1]] for i in range(self.n_lists)]
+        return self
+
+    def add(self, vectors):
+        """Appends vectors to the index and returns their ids."""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        start = len(self)
+        self.vectors = np.vstack([self.vectors, vectors])
+        ids = np.arange(start, start + vectors.shape[0])
+        for list_no, vector_id in zip(self._nearest_centroid(vectors, self.centroids), ids):
+            self.lists[list_no] = np.append(self.lists[list_no], vector_id)
+        return ids
+
+    def search(self, queries, k, n_probe=None, exclude=None):
+        """
+        Returns (ids, scores) arrays of shape (n_queries, k) for a batch of
+        normalized query vectors. `exclude` optionally holds one collection of
+        ids per query that must not be returned. Missing results are -1.
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        n_probe = min(n_probe or self.n_probe, self.n_lists)
+        coarse_ids, _ = top_k(queries @ self.centroids.T, n_probe)
+
+        ids = np.full((queries.shape[0], k), -1, dtype=np.int64)
+        scores = np.full((queries.shape[0], k), -np.inf, dtype=np.float32)
+        for row, query in enumerate(queries):
+            candidates = np.concatenate([self.lists[i] for i in coarse_ids[row]])
+            if exclude is not None and len(exclude[row]):
+                candidates = candidates[~np.isin(candidates, list(exclude[row]))]
+            if candidates.size == 0:
+                continue
+            found, found_scores = top_k(self.vectors[candidates] @ query, k)
+            ids[row, :found.size] = candidates[found]
+            scores[row, :found.size] = found_scores
+        return ids, scores
+
+    def save(self, path):
+        offsets = np.cumsum([0] + [len(ids) for ids in self.lists])
+        np.savez(
+            path,
+            centroids=self.centroids,
+            vectors=self.vectors,
+            list_ids=np.concatenate(self.lists) if self.lists else np.empty(0, np.int64),
+            list_offsets=offsets,
+            params=np.array([self.n_lists, self.n_probe, self.n_iter, self.seed]),
+        )
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        n_lists, n_probe, n_iter, seed = (int(v) for v in data["params"])
+        index = cls(n_lists=n_lists, n_probe=n_probe, n_iter=n_iter, seed=seed)
+        index.centroids = data["centroids"]
+        index.vectors = data["vectors"]
+        offsets = data["list_offsets"]
+        list_ids = data["list_ids"]
+        index.lists = [list_ids[offsets[i]:offsets[i + 1]] for i in range(n_lists)]
+        return index
+
+    @staticmethod
+    def _nearest_centroid(vectors, centroids, block_size=65536):
+        assignments = np.empty(vectors.shape[0], dtype=np.intp)
+        for start in range(0, vectors.shape[0], block_size):
+            block = vectors[start:start + block_size]
+            assignments[start:start + block_size] = np.argmax(block @ centroids.T, axis=1)
+        return assignments
+
+
+class HNSWIndex:
+    """HNSW graph index backed by hnswlib (optional dependency)."""
+
+    def __init__(self, m=16, ef_construction=200, ef_search=64, seed=42):
+        if hnswlib is None:
+            raise ImportError("The 'hnsw' backend requires the hnswlib package.")
+        self.m = m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.seed = seed
+        self.index = None
+
+    def __len__(self):
+        return 0 if self.index is None else self.index.get_current_count()
+
+    def build(self, vectors):
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        self.index = hnswlib.Index(space="ip", dim=vectors.shape[1])
+        self.index.init_index(
+            max_elements=vectors.shape[0], ef_construction=self.ef_construction,
+            M=self.m, random_seed=self.seed,
+        )
+        self.index.add_items(vectors, np.arange(vectors.shape[0]))
+        self.index.set_ef(self.ef_search)
+        return self
+
+    def add(self, vectors):
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        start = len(self)
+        ids = np.arange(start, start + vectors.shape[0])
+        self.index.resize_index(start + vectors.shape[0])
+        self.index.add_items(vectors, ids)
+        return ids
+
+    def search(self, queries, k, n_probe=None, exclude=None):
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        extra = max((len(e) for e in exclude), default=0) if exclude is not None else 0
+        n_results = min(k + extra, len(self))
+        self.index.set_ef(max(self.ef_search, n_results))
+        labels, distances = self.index.knn_query(queries, k=n_results)
+
+        ids = np.full((queries.shape[0], k), -1, dtype=np.int64)
+        scores = np.full((queries.shape[0], k), -np.inf, dtype=np.float32)
+        for row in range(queries.shape[0]):
+            # hnswlib's "ip" distance is 1 - inner product
+            found = [
+                (label, 1.0 - distance)
+                for label, distance in zip(labels[row], distances[row])
+                if exclude is None or label not in exclude[row]
+            ][:k]
+            for col, (label, score) in enumerate(found):
+                ids[row, col] = label
+                scores[row, col] = score
+        return ids, scores
+
+    def save(self, path):
+        self.index.save_index(path)
+
+    @classmethod
+    def load(cls, path, dim, **params):
+        instance = cls(**params)
+        instance.index = hnswlib.Index(space="ip", dim=dim)
+        instance.index.load_index(path)
+        instance.index.set_ef(instance.ef_search)
+        return instance
+
+
+class ANNIndex:
+    """
+    Approximate nearest-neighbor search over the TF-IDF catalog.
+
+    TF-IDF rows are projected onto truncated-SVD embeddings (LSA) and indexed
+    with an IVF or HNSW index, so memory is O(N * n_components) instead of the
+    O(N^2) dense cosine matrix.
+    """
+
+    def __init__(self, svd, index, backend="ivf"):
+        self.svd = svd
+        self.index = index
+        self.backend = backend
+
+    def __len__(self):
+        return len(self.index)
+
+    @classmethod
+    def build(cls, tfidf_matrix, n_components=128, backend="ivf", seed=42, **index_params):
+        n_components = min(n_components, tfidf_matrix.shape[1] - 1)
+        svd = TruncatedSVD(n_components=n_components, random_state=seed)
+        embeddings = normalize(svd.fit_transform(tfidf_matrix)).astype(np.float32)
+        if backend == "ivf":
+            index = IVFIndex(seed=seed, **index_params).build(embeddings)
+        elif backend == "hnsw":
+            index = HNSWIndex(seed=seed, **index_params).build(embeddings)
+        else:
+            raise ValueError(f"Unknown ANN backend: {backend}")
+        return cls(svd, index, backend)
+
+    def embed(self, tfidf_rows):
+        return normalize(self.svd.transform(tfidf_rows)).astype(np.float32)
+
+    def add(self, tfidf_rows):
+        return self.index.add(self.embed(tfidf_rows))
+
+    def query(self, tfidf_rows, k=10, exclude=None, n_probe=None):
+        """Nearest catalog rows for a batch of TF-IDF rows (one per query)."""
+        return self.index.search(self.embed(tfidf_rows), k, n_probe=n_probe, exclude=exclude)
+
+    def save(self, model_dir):
+        path = os.path.join(model_dir, ANN_DIR)
+        os.makedirs(path, exist_ok=True)
+        joblib.dump(self.svd, os.path.join(path, SVD_FILE))
+        meta = {"backend": self.backend, "dim": int(self.svd.n_components)}
+        if self.backend == "ivf":
+            self.index.save(os.path.join(path, INDEX_FILE))
+        else:
+            self.index.save(os.path.join(path, HNSW_FILE))
+            meta.update(m=self.index.m, ef_construction=self.index.ef_construction,
+                        ef_search=self.index.ef_search)
+        with open(os.path.join(path, META_FILE), "w") as f:
+            json.dump(meta, f)
+
+    @classmethod
+    def load(cls, model_dir):
+        path = os.path.join(model_dir, ANN_DIR)
+        with open(os.path.join(path, META_FILE)) as f:
+            meta = json.load(f)
+        svd = joblib.load(os.path.join(path, SVD_FILE))
+        if meta["backend"] == "ivf":
+            index = IVFIndex.load(os.path.join(path, INDEX_FILE))
+        else:
+            index = HNSWIndex.load(
+                os.path.join(path, HNSW_FILE), meta["dim"], m=meta["m"],
+                ef_construction=meta["ef_construction"], ef_search=meta["ef_search"],
+            )
+        return cls(svd, index, meta["backend"])
+
+    @staticmethod
+    def exists(model_dir):
+        return os.path.exists(os.path.join(model_dir, ANN_DIR, META_FILE))
+
+
+def rerank(tfidf_matrix, tfidf_rows, candidate_ids, k=10):
+    """
+    Re-scores ANN candidates with the exact TF-IDF cosine and keeps the best k.
+
+    Over-fetching candidates from the index and re-ranking them recovers most
+    of the recall lost to the SVD projection, at the cost of one small sparse
+    product per query. Both matrices must be L2-normalized.
+    """
+    ids = np.full((candidate_ids.shape[0], k), -1, dtype=np.int64)
+    scores = np.full((candidate_ids.shape[0], k), -np.inf, dtype=np.float32)
+    for row, candidates in enumerate(candidate_ids):
+        candidates = candidates[candidates >= 0]
+        if candidates.size == 0:
+            continue
+        exact = (tfidf_matrix[candidates] @ tfidf_rows[row].T).toarray().ravel()
+        found, found_scores = top_k(exact, k)
+        ids[row, :found.size] = candidates[found]
+        scores[row, :found.size] = found_scores
+    return ids, scores
+
+
+def exact_neighbors(tfidf_matrix, query_rows, k=10, block_size=1024):
+    """
+    Exact cosine top-k neighbors of `query_rows` (excluding themselves),
+    computed block by block with sparse products so the full N x N matrix is
+    never materialized.
+    """
+    matrix = normalize(tfidf_matrix.tocsr())
+    query_rows = np.asarray(query_rows, dtype=np.intp)
+    ids = np.empty((query_rows.size, k), dtype=np.int64)
+    for start in range(0, query_rows.size, block_size):
+        rows = query_rows[start:start + block_size]
+        scores = (matrix[rows] @ matrix.T).toarray()
+        ids[start:start + rows.size] = top_k(scores, k, exclude=rows)[0]
+    return ids
+
+
+def recall_at_k(approx_ids, exact_ids):
+    """Fraction of the exact top-k neighbors found by the approximate search."""
+    hits = sum(
+        len(set(approx[approx >= 0]) & set(exact))
+        for approx, exact in zip(approx_ids, exact_ids)
+    )
+    return hits / exact_ids.size
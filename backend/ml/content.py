@@ -0,0 +1,167 @@
+"""
+The content-based recommender model.
+
+Imports numpy, scipy, scikit-learn and joblib, so it is only imported when a
+model is first loaded (see `backend.ml.recommender`), not at API startup.
+"""
+import os
+
+import joblib
+import numpy as np
+from scipy.sparse import csr_matrix, vstack
+from sklearn.preprocessing import normalize
+
+from backend.ml.ann import ANNIndex, rerank
+from backend.ml.ranking import top_k
+from backend.ml.recommender import (
+    MODEL_DIR,
+    TFIDF_MATRIX_FILE,
+    MOVIE_TITLES_FILE,
+    NEIGHBORS_FILE,
+    ANN_OVERFETCH,
+    normalize_title,
+)
+
+
+class CatalogState:
+    """
+    One immutable version of the catalog: the matrix, its titles and the
+    precomputed neighbors. Appending builds a new state instead of changing
+    this one, so a query holding it always sees rows that agree.
+    """
+
+    def __init__(self, tfidf_matrix, titles, title_index, neighbors=None):
+        self.tfidf_matrix = tfidf_matrix
+        self.titles = titles
+        self.title_index = title_index
+        self.neighbors = neighbors
+
+
+class ContentRecommender:
+    """
+    Content-based recommender backed by the TF-IDF matrix of the catalog.
+
+    A playlist is turned into a profile vector (the sum of its movies' TF-IDF
+    rows) and every catalog movie is scored with a single sparse mat-vec.
+    Rows are L2-normalized, so the scores are cosine similarities.
+
+    When the model directory contains an ANN index the profile is searched in
+    the index instead, which keeps query cost sublinear for large catalogs.
+
+    `neighbors`, the (ids, scores) arrays of every movie's top neighbors
+    precomputed by the training pipeline, answers a single-title query with a
+    row lookup. They only describe the trained catalog and are dropped once
+    movies are appended.
+
+    Queries and appends run on different threads. Every query reads one
+    `CatalogState` and an append publishes its replacement with a single
+    assignment.
+    """
+
+    def __init__(self, tfidf_matrix, titles, ann_index=None, neighbors=None):
+        titles = list(titles)
+        title_index = {}
+        for row, title in enumerate(titles):
+            title_index.setdefault(normalize_title(title), row)
+        self.ann_index = ann_index
+        self.state = CatalogState(
+            normalize(tfidf_matrix.tocsr().astype(np.float32)), titles, title_index, neighbors
+        )
+
+    @property
+    def tfidf_matrix(self):
+        return self.state.tfidf_matrix
+
+    @property
+    def titles(self):
+        return self.state.titles
+
+    @property
+    def title_index(self):
+        return self.state.title_index
+
+    @property
+    def neighbors(self):
+        return self.state.neighbors
+
+    @classmethod
+    def load(cls, model_dir=MODEL_DIR):
+        tfidf_matrix = joblib.load(os.path.join(model_dir, TFIDF_MATRIX_FILE))
+        titles = joblib.load(os.path.join(model_dir, MOVIE_TITLES_FILE))
+        ann_index = ANNIndex.load(model_dir) if ANNIndex.exists(model_dir) else None
+        neighbors = None
+        neighbors_path = os.path.join(model_dir, NEIGHBORS_FILE)
+        if os.path.exists(neighbors_path):
+            with np.load(neighbors_path) as data:
+                neighbors = (data["ids"], data["scores"])
+        return cls(tfidf_matrix, titles, ann_index, neighbors)
+
+    def rows_for_titles(self, titles, state=None):
+        title_index = (state or self.state).title_index
+        rows = {title_index.get(normalize_title(title)) for title in titles}
+        rows.discard(None)
+        return sorted(rows)
+
+    def append(self, tfidf_rows, titles):
+        """
+        Appends new movies to the catalog and returns their row ids.
+
+        The ANN index is extended before the new state is published, and a
+        query drops ANN candidates past the end of the matrix it holds.
+        """
+        state = self.state
+        start = len(state.titles)
+        rows = normalize(tfidf_rows.tocsr().astype(np.float32))
+        tfidf_matrix = vstack([state.tfidf_matrix, rows], format="csr")
+        title_index = dict(state.title_index)
+        for row, title in enumerate(titles, start=start):
+            title_index.setdefault(normalize_title(title), row)
+        if self.ann_index is not None:
+            self.ann_index.add(rows)
+        # The precomputed lists cannot include the new movies
+        self.state = CatalogState(tfidf_matrix, state.titles + list(titles), title_index)
+        return list(range(start, start + rows.shape[0]))
+
+    def recommend(self, titles, top_n=10):
+        """Returns (title, score) pairs for movies similar to `titles`."""
+        state = self.state
+        rows = self.rows_for_titles(titles, state)
+        if not rows:
+            return []
+
+        neighbors = state.neighbors
+        if len(rows) == 1 and neighbors is not None and top_n <= neighbors[0].shape[1]:
+            ids, scores = neighbors[0][rows[0], :top_n], neighbors[1][rows[0], :top_n]
+            return [(state.titles[i], float(score)) for i, score in zip(ids, scores) if i >= 0]
+
+        tfidf_matrix = state.tfidf_matrix
+        if self.ann_index is not None:
+            profile = normalize(np.asarray(tfidf_matrix[rows].sum(axis=0)))
+            candidates, _ = self.ann_index.query(
+                profile, top_n * ANN_OVERFETCH, exclude=[set(rows)]
+            )
+            # Movies appended since `state` was read are not in its matrix
+            candidates[candidates >= tfidf_matrix.shape[0]] = -1
+            indices, top_scores = rerank(
+                tfidf_matrix, csr_matrix(profile), candidates, top_n
+            )
+            return [
+                (state.titles[i], float(score))
+                for i, score in zip(indices[0], top_scores[0])
+                if i >= 0
+            ]
+
+        profile = np.asarray(tfidf_matrix[rows].sum(axis=0)).ravel()
+        norm = np.linalg.norm(profile)
+        if norm == 0:
+            return []
+        scores = tfidf_matrix @ (profile / norm)
+
+        # Never recommend a movie that is already in the playlist
+        scores[rows] = -np.inf
+        indices, top_scores = top_k(scores, top_n)
+        return [
+            (state.titles[i], float(score))
+            for i, score in zip(indices, top_scores)
+            if np.isfinite(score)
+        ]
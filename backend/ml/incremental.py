@@ -0,0 +1,141 @@
+import logging
+import os
+import threading
+import time
+
+import joblib
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.preprocessing import normalize
+
+from backend.ml import recommender as recommender_store
+from backend.ml.ann import ANNIndex
+from backend.ml.content import ContentRecommender
+from backend.ml.recommender import (
+    MODEL_DIR,
+    VECTORIZER_FILE,
+    DOCUMENTS_FILE,
+    normalize_title,
+)
+
+logger = logging.getLogger(__name__)
+
+REBUILD_INTERVAL_SECONDS = float(os.getenv("RECOMMENDER_REBUILD_INTERVAL", 24 * 60 * 60))
+# Share of new-document tokens missing from the fitted vocabulary that triggers a rebuild
+MAX_OOV_RATIO = float(os.getenv("RECOMMENDER_MAX_OOV_RATIO", 0.3))
+# Catalog growth since the last fit (as a fraction) that triggers a rebuild
+MAX_APPENDED_FRACTION = float(os.getenv("RECOMMENDER_MAX_APPENDED_FRACTION", 0.1))
+
+
+def movie_document(event):
+    """
+    Text used to vectorize a movie_created event.
+
+    Training documents (backend/ml/pipeline.py) combine the title, genres,
+    keywords, overview and tagline; a movie added through the API only has
+    its title, type and year. Only the title is used: type and year are not
+    part of any training document, so their tokens would always be out of
+    vocabulary and push the drift ratio towards a rebuild on their own.
+    """
+    return str(event.get("title") or "")
+
+
+class IncrementalUpdater:
+    """
+    Appends newly created movies to a loaded ContentRecommender.
+
+    New documents are transformed with the already-fitted vectorizer (the IDF
+    weights stay fixed) and the rows are appended to the matrix and ANN index,
+    where queries score them like any other movie.
+    Terms unseen at fit time are dropped by the vectorizer, so the updater
+    tracks that vocabulary drift and asks for a full rebuild once it, the
+    catalog growth or the rebuild interval exceeds its threshold.
+    """
+
+    def __init__(self, vectorizer, documents,
+                 rebuild_interval=REBUILD_INTERVAL_SECONDS, max_oov_ratio=MAX_OOV_RATIO,
+                 max_appended_fraction=MAX_APPENDED_FRACTION):
+        self.vectorizer = vectorizer
+        self.documents = list(documents)
+        self.rebuild_interval = rebuild_interval
+        self.max_oov_ratio = max_oov_ratio
+        self.max_appended_fraction = max_appended_fraction
+        self._reset_drift()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, model_dir=MODEL_DIR, **kwargs):
+        vectorizer = joblib.load(os.path.join(model_dir, VECTORIZER_FILE))
+        documents = joblib.load(os.path.join(model_dir, DOCUMENTS_FILE))
+        return cls(vectorizer, documents, **kwargs)
+
+    def _reset_drift(self):
+        self._analyzer = self.vectorizer.build_analyzer()
+        self.fitted_size = len(self.documents)
+        self.appended = 0
+        self.total_tokens = 0
+        self.oov_tokens = 0
+        self.last_rebuild = time.monotonic()
+
+    @property
+    def oov_ratio(self):
+        return self.oov_tokens / self.total_tokens if self.total_tokens else 0.0
+
+    def apply(self, recommender, events):
+        """Appends the movies of `events` not yet in the catalog; returns their rows."""
+        with self._lock:
+            new_titles, new_documents = [], []
+            seen = set()
+            for event in events:
+                title = event.get("title")
+                key = normalize_title(title) if title else None
+                if not key or key in seen or key in recommender.title_index:
+                    continue
+                seen.add(key)
+                new_titles.append(title)
+                new_documents.append(movie_document(event))
+            if not new_titles:
+                return []
+
+            vocabulary = self.vectorizer.vocabulary_
+            for document in new_documents:
+                tokens = self._analyzer(document)
+                self.total_tokens += len(tokens)
+                self.oov_tokens += sum(1 for token in tokens if token not in vocabulary)
+
+            tfidf_rows = normalize(self.vectorizer.transform(new_documents).astype(np.float32))
+            rows = recommender.append(tfidf_rows, new_titles)
+            self.documents.extend(new_documents)
+            self.appended += len(rows)
+            recommender_store.recommendation_cache.clear()
+            logger.info(f"Appended {len(rows)} movies to the recommender without a retrain")
+            return rows
+
+    def needs_rebuild(self):
+        if not self.appended:
+            return False
+        return (
+            time.monotonic() - self.last_rebuild >= self.rebuild_interval
+            or self.oov_ratio > self.max_oov_ratio
+            or self.appended > self.max_appended_fraction * self.fitted_size
+        )
+
+    def rebuild(self, recommender):
+        """Refits the vocabulary and IDF on the whole corpus and returns a new model."""
+        with self._lock:
+            started = time.perf_counter()
+            # A fixed vocabulary (e.g. from backend/ml/pipeline.py) is refitted too
+            vectorizer = TfidfVectorizer(**{**self.vectorizer.get_params(), "vocabulary": None})
+            tfidf_matrix = vectorizer.fit_transform(self.documents)
+            ann_index = None
+            if recommender.ann_index is not None:
+                ann_index = ANNIndex.build(tfidf_matrix, backend=recommender.ann_index.backend)
+            rebuilt = ContentRecommender(tfidf_matrix, recommender.titles, ann_index)
+
+            self.vectorizer = vectorizer
+            self._reset_drift()
+            logger.info(
+                f"Rebuilt recommender over {len(self.documents)} movies "
+                f"in {time.perf_counter() - started:.1f}s"
+            )
+            return rebuilt
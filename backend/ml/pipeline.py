@@ -0,0 +1,266 @@
+"""
+Reproducible, memory-bounded training pipeline for the content recommender.
+
+Streams the CSV in chunks, fits the TF-IDF vocabulary from streamed document
+frequencies, builds a float32 sparse matrix, computes each movie's nearest
+neighbors in row blocks across a process pool (instead of the dense N x N
+cosine matrix) and saves the components loaded by backend/ml/recommender.py.
+The neighbors answer single-title recommendations without scoring the
+catalog.
+Wall time and peak memory are reported for every stage.
+
+Run from the repository root:
+
+    python -m backend.ml.pipeline --csv backend/ml/movies.csv --workers 4
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+import joblib
+import numpy as np
+import pandas as pd
+import scipy
+import scipy.sparse as sp
+import sklearn
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.preprocessing import normalize
+
+# Make the `backend` package importable when run as a script
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from backend.ml.ann import ANNIndex
+from backend.ml.ranking import top_k
+from backend.ml.recommender import (
+    MODEL_DIR,
+    TFIDF_MATRIX_FILE,
+    MOVIE_TITLES_FILE,
+    NEIGHBORS_FILE,
+    VECTORIZER_FILE,
+    DOCUMENTS_FILE,
+    REGISTRY_DIR,
+)
+from backend.ml.registry import ModelRegistry, file_sha256
+
+REPORT_FILE = 'training_report.json'
+
+# Textual features combined into one document per movie, with their null fill
+TEXT_COLUMNS = {
+    'original_title': '',
+    'genres': '',
+    'keywords': '',
+    'overview': 'no overview',
+    'tagline': 'no tagline',
+}
+
+
+class StageReport:
+    """Records wall time and peak memory of each pipeline stage."""
+
+    def __init__(self, trace_memory=True):
+        self.trace_memory = trace_memory
+        self.stages = []
+        if trace_memory:
+            tracemalloc.start()
+
+    @contextmanager
+    def stage(self, name):
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        started = time.perf_counter()
+        yield
+        elapsed = time.perf_counter() - started
+        stats = {"stage": name, "seconds": round(elapsed, 3), "max_rss_mb": round(max_rss_mb(), 1)}
+        if self.trace_memory:
+            stats["traced_peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 2**20, 1)
+        self.stages.append(stats)
+        print(
+            f"[{name:<10}] {elapsed:8.2f}s  max RSS {stats['max_rss_mb']:8.1f} MiB"
+            + (f"  traced peak {stats['traced_peak_mb']:8.1f} MiB" if self.trace_memory else "")
+        )
+
+
+def max_rss_mb():
+    """High-water resident set size of this process and its finished workers."""
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    scale = 2**20 if platform.system() == "Darwin" else 2**10
+    return max(own, children) / scale
+
+
+def iter_documents(csv_path, chunk_size):
+    """Yields (titles, documents) lists for each chunk of the CSV."""
+    columns = ['title', *TEXT_COLUMNS]
+    for chunk in pd.read_csv(csv_path, usecols=columns, chunksize=chunk_size, dtype=str):
+        text = chunk[list(TEXT_COLUMNS)].fillna(TEXT_COLUMNS)
+        documents = text['original_title']
+        for column in list(TEXT_COLUMNS)[1:]:
+            documents = documents + ' ' + text[column]
+        yield chunk['title'].fillna('').tolist(), documents.tolist()
+
+
+def fit_vocabulary(csv_path, chunk_size, min_df, max_features):
+    """
+    Fits a TfidfVectorizer from document frequencies counted chunk by chunk,
+    so the corpus never has to be held in memory at once.
+    """
+    analyzer = TfidfVectorizer(stop_words='english').build_analyzer()
+    document_frequency = Counter()
+    n_documents = 0
+    for _, documents in iter_documents(csv_path, chunk_size):
+        for document in documents:
+            document_frequency.update(set(analyzer(document)))
+        n_documents += len(documents)
+
+    terms = [term for term, count in document_frequency.items() if count >= min_df]
+    # Most frequent terms first when capped, alphabetical for a stable layout
+    if max_features:
+        terms = sorted(terms, key=lambda t: (-document_frequency[t], t))[:max_features]
+    terms = sorted(terms)
+
+    vectorizer = TfidfVectorizer(
+        stop_words='english', vocabulary={term: i for i, term in enumerate(terms)},
+        dtype=np.float32,
+    )
+    vectorizer.fit([''])
+    counts = np.array([document_frequency[term] for term in terms], dtype=np.float64)
+    # Same smoothed IDF as TfidfVectorizer(smooth_idf=True)
+    vectorizer.idf_ = np.log((1 + n_documents) / (1 + counts)) + 1
+    return vectorizer, n_documents
+
+
+def transform_corpus(csv_path, chunk_size, vectorizer):
+    titles, documents, blocks = [], [], []
+    for chunk_titles, chunk_documents in iter_documents(csv_path, chunk_size):
+        blocks.append(vectorizer.transform(chunk_documents).astype(np.float32))
+        titles.extend(chunk_titles)
+        documents.extend(chunk_documents)
+    return sp.vstack(blocks, format='csr'), titles, documents
+
+
+_worker_matrix = None
+
+
+def _init_worker(matrix):
+    global _worker_matrix
+    _worker_matrix = matrix
+
+
+def _neighbors_block(bounds):
+    start, end, k = bounds
+    scores = (_worker_matrix[start:end] @ _worker_matrix.T).toarray()
+    return start, top_k(scores, k, exclude=np.arange(start, end))
+
+
+def compute_neighbors(matrix, k, workers, block_size):
+    """
+    Top-k cosine neighbors of every row, one dense (block_size x N) score
+    block at a time per worker, so memory is bounded by block_size rather
+    than by N^2.
+    """
+    matrix = normalize(matrix).astype(np.float32)
+    n_rows = matrix.shape[0]
+    ids = np.empty((n_rows, k), dtype=np.int32)
+    scores = np.empty((n_rows, k), dtype=np.float32)
+    blocks = [(start, min(start + block_size, n_rows), k) for start in range(0, n_rows, block_size)]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(matrix,)) as pool:
+        for start, (block_ids, block_scores) in pool.map(_neighbors_block, blocks):
+            ids[start:start + block_ids.shape[0]] = block_ids
+            scores[start:start + block_ids.shape[0]] = block_scores
+    return ids, scores
+
+
+def train(args):
+    report = StageReport(trace_memory=not args.no_trace_memory)
+    np.random.seed(args.seed)
+    os.makedirs(args.model_dir, exist_ok=True)
+    block_size = args.block_size
+
+    with report.stage("vocabulary"):
+        vectorizer, n_documents = fit_vocabulary(args.csv, args.chunk_size, args.min_df, args.max_features)
+    print(f"             {n_documents} movies, {len(vectorizer.vocabulary_)} terms")
+
+    with report.stage("transform"):
+        tfidf_matrix, titles, documents = transform_corpus(args.csv, args.chunk_size, vectorizer)
+
+    with report.stage("neighbors"):
+        if not block_size:
+            # Keep each worker's dense score block within --block-memory-mb
+            block_size = max(1, int(args.block_memory_mb * 2**20 / (4 * tfidf_matrix.shape[0])))
+        k = min(args.top_n, tfidf_matrix.shape[0] - 1)
+        neighbor_ids, neighbor_scores = compute_neighbors(tfidf_matrix, k, args.workers, block_size)
+
+    if args.ann:
+        with report.stage("ann"):
+            ANNIndex.build(tfidf_matrix, n_components=args.ann_components, seed=args.seed).save(args.model_dir)
+
+    with report.stage("save"):
+        joblib.dump(tfidf_matrix, os.path.join(args.model_dir, TFIDF_MATRIX_FILE))
+        joblib.dump(titles, os.path.join(args.model_dir, MOVIE_TITLES_FILE))
+        joblib.dump(vectorizer, os.path.join(args.model_dir, VECTORIZER_FILE))
+        joblib.dump(documents, os.path.join(args.model_dir, DOCUMENTS_FILE))
+        np.savez(os.path.join(args.model_dir, NEIGHBORS_FILE), ids=neighbor_ids, scores=neighbor_scores)
+
+    training_report = {
+        "csv": args.csv,
+        "csv_sha256": file_sha256(args.csv),
+        "parameters": vars(args),
+        "block_size": block_size,
+        "n_movies": tfidf_matrix.shape[0],
+        "n_terms": tfidf_matrix.shape[1],
+        "nnz": int(tfidf_matrix.nnz),
+        "versions": {"numpy": np.__version__, "scipy": scipy.__version__,
+                     "sklearn": sklearn.__version__, "pandas": pd.__version__},
+        "stages": report.stages,
+    }
+    with open(os.path.join(args.model_dir, REPORT_FILE), 'w') as f:
+        json.dump(training_report, f, indent=2)
+    print(f"\nModel components and {REPORT_FILE} saved to: {args.model_dir}")
+
+    if args.publish:
+        version = ModelRegistry(args.registry_dir).publish(
+            args.model_dir, metadata={"csv_sha256": training_report["csv_sha256"],
+                                      "n_movies": training_report["n_movies"]},
+        )
+        training_report["version"] = version
+        print(f"Published model version {version} to: {args.registry_dir}")
+    return training_report
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Train the content-based movie recommender")
+    parser.add_argument("--csv", default="backend/ml/movies.csv")
+    parser.add_argument("--model-dir", default=MODEL_DIR)
+    parser.add_argument("--chunk-size", type=int, default=10_000,
+                        help="CSV rows parsed per chunk")
+    parser.add_argument("--min-df", type=int, default=1,
+                        help="Minimum document frequency for a term to enter the vocabulary")
+    parser.add_argument("--max-features", type=int, default=None)
+    parser.add_argument("--top-n", type=int, default=20,
+                        help="Neighbors stored per movie")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--block-size", type=int, default=None,
+                        help="Rows per neighbor block (derived from --block-memory-mb by default)")
+    parser.add_argument("--block-memory-mb", type=float, default=256)
+    parser.add_argument("--ann", action="store_true", help="Also build the ANN index")
+    parser.add_argument("--ann-components", type=int, default=128)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--publish", action="store_true",
+                        help="Publish the model as a new registry version (hot-swapped by the API)")
+    parser.add_argument("--registry-dir", default=REGISTRY_DIR)
+    parser.add_argument("--no-trace-memory", action="store_true",
+                        help="Skip tracemalloc (faster, reports max RSS only)")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    train(parse_args())
@@ -0,0 +1,66 @@
+import numpy as np
+
+
+def top_k(scores, k, exclude=None):
+    """
+    Returns the indices and scores of the k highest values in `scores`.
+
+    `scores` may be a 1-D array (one query) or a 2-D array with one row per
+    query. `np.argpartition` selects the best candidates in linear time and
+    only those candidates are sorted, instead of sorting every movie in the
+    catalog.
+
+    `exclude` holds the column index to drop for each query (usually the query
+    movie itself): an int for a 1-D input, or a sequence with one entry per row
+    for a 2-D input.
+    """
+    scores = np.asarray(scores)
+    single_query = scores.ndim == 1
+    if single_query:
+        scores = scores[np.newaxis, :]
+
+    n_rows, n_cols = scores.shape
+    k = max(0, min(k, n_cols - (1 if exclude is not None else 0)))
+    # One spare candidate per row makes room for the excluded column
+    n_candidates = min(n_cols, k + (1 if exclude is not None else 0))
+
+    if n_candidates == 0:
+        indices = np.empty((n_rows, 0), dtype=np.intp)
+        top_scores = np.empty((n_rows, 0), dtype=scores.dtype)
+        return (indices[0], top_scores[0]) if single_query else (indices, top_scores)
+
+    if n_candidates < n_cols:
+        kth = n_cols - n_candidates
+        candidates = np.argpartition(scores, kth, axis=1)[:, kth:]
+    else:
+        candidates = np.broadcast_to(np.arange(n_cols), (n_rows, n_cols))
+    candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+
+    # Only the selected candidates are sorted (descending by score)
+    order = np.argsort(-candidate_scores, axis=1, kind="stable")
+    candidates = np.take_along_axis(candidates, order, axis=1)
+    candidate_scores = np.take_along_axis(candidate_scores, order, axis=1)
+
+    if exclude is not None:
+        exclude = np.atleast_1d(np.asarray(exclude, dtype=np.intp))
+        keep = candidates != exclude[:, np.newaxis]
+        # Rows whose excluded column was not selected drop their spare candidate
+        keep[keep.all(axis=1), -1] = False
+        candidates = candidates[keep].reshape(n_rows, k)
+        candidate_scores = candidate_scores[keep].reshape(n_rows, k)
+
+    if single_query:
+        return candidates[0], candidate_scores[0]
+    return candidates, candidate_scores
+
+
+def recommend_by_index(cosine_sim, query_indices, top_n=10):
+    """
+    Batched recommendation lookup over a dense similarity matrix.
+
+    Gathers the similarity rows of every query movie as one 2-D block and
+    ranks them together, excluding each query movie from its own results.
+    """
+    query_indices = np.atleast_1d(np.asarray(query_indices, dtype=np.intp))
+    rows = np.asarray(cosine_sim)[query_indices]
+    return top_k(rows, top_n, exclude=query_indices)
@@ -0,0 +1,119 @@
+"""
+Process-wide access to the recommender.
+
+This module is imported by the API at startup, so it must stay free of the
+ML stack: the model class (`backend.ml.content`) and with it numpy, scipy,
+scikit-learn and joblib are imported when the model is first loaded.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+from backend.ml.registry import HotSwapModel, ModelRegistry
+
+# Define file paths. These must match the paths used in the model creation script.
+MODEL_DIR = os.getenv("RECOMMENDER_MODEL_DIR", "recommender_model")
+TFIDF_MATRIX_FILE = 'tfidf_matrix.pkl'
+MOVIE_TITLES_FILE = 'movie_titles.pkl'
+# Top neighbors of every movie, precomputed by backend/ml/pipeline.py (optional)
+NEIGHBORS_FILE = 'neighbors.npz'
+# Needed by the incremental updater (backend/ml/incremental.py)
+VECTORIZER_FILE = 'tfidf_vectorizer.pkl'
+DOCUMENTS_FILE = 'movie_documents.pkl'
+# Versioned artifacts published by `python -m backend.ml.pipeline --publish`
+REGISTRY_DIR = os.getenv("RECOMMENDER_REGISTRY_DIR", "recommender_registry")
+REGISTRY_POLL_INTERVAL = float(os.getenv("RECOMMENDER_REGISTRY_POLL_INTERVAL", 30))
+# ANN candidates fetched per recommendation before exact re-ranking
+ANN_OVERFETCH = 10
+
+
+def normalize_title(title):
+    """Key used to match OMDb titles stored in Postgres with catalog titles."""
+    return " ".join(str(title).casefold().split())
+
+
+class PlaylistRecommendationCache:
+    """
+    Bounded LRU cache of recommendations per playlist.
+
+    Entries are keyed by the playlist's current set of titles as well as its
+    id, so a worker that missed an invalidation never serves stale results.
+    """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, playlist_id, titles, top_n):
+        key = (frozenset(normalize_title(t) for t in titles), top_n)
+        with self._lock:
+            entry = self._entries.get(int(playlist_id))
+            if entry is None or entry[0] != key:
+                return None
+            self._entries.move_to_end(int(playlist_id))
+            return entry[1]
+
+    def set(self, playlist_id, titles, top_n, recommendations):
+        key = (frozenset(normalize_title(t) for t in titles), top_n)
+        with self._lock:
+            self._entries[int(playlist_id)] = (key, recommendations)
+            self._entries.move_to_end(int(playlist_id))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, *playlist_ids):
+        with self._lock:
+            for playlist_id in playlist_ids:
+                self._entries.pop(int(playlist_id), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def load_recommender(model_dir=MODEL_DIR):
+    from backend.ml.content import ContentRecommender
+    return ContentRecommender.load(model_dir)
+
+
+def _warmup(recommender):
+    """Runs one query so the first request after a swap pays no first-use cost."""
+    if recommender.titles:
+        recommender.recommend(recommender.titles[:1], top_n=1)
+
+
+recommendation_cache = PlaylistRecommendationCache()
+model_holder = HotSwapModel(
+    load_recommender,
+    ModelRegistry(REGISTRY_DIR),
+    fallback_dir=MODEL_DIR,
+    warmup=_warmup,
+    # Cached recommendations were computed by the previous version
+    on_swap=recommendation_cache.clear,
+    poll_interval=REGISTRY_POLL_INTERVAL,
+)
+
+
+def get_recommender():
+    """Loads the model on first use and returns the process-wide instance."""
+    return model_holder.get()
+
+
+def peek_recommender():
+    """Returns the loaded instance, or None if nothing has loaded it yet."""
+    return model_holder.peek()
+
+
+def set_recommender(recommender, version=None):
+    """Replaces the process-wide instance, e.g. after a full rebuild."""
+    model_holder.replace(recommender, version or model_holder.version)
+
+
+def recommend_titles(titles, top_n=10):
+    """
+    Recommends with the active model version, holding a lease on it so a
+    concurrent hot swap does not release it mid-request.
+    """
+    with model_holder.lease() as recommender:
+        return recommender.recommend(titles, top_n)
@@ -0,0 +1,248 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = 'manifest.json'
+CURRENT_FILE = 'CURRENT'
+VERSIONS_DIR = 'versions'
+
+
+class ModelIntegrityError(Exception):
+    """A model version is incomplete or its files do not match the manifest."""
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ModelRegistry:
+    """
+    Directory of immutable, versioned model artifacts.
+
+        <root>/versions/<version>/...        model files
+        <root>/versions/<version>/manifest.json
+        <root>/CURRENT                       name of the active version
+
+    A version directory only appears once all its files and manifest are
+    written (it is renamed into place), and CURRENT is replaced atomically,
+    so readers never observe a half-published model.
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    def version_dir(self, version):
+        return os.path.join(self.root, VERSIONS_DIR, version)
+
+    def versions(self):
+        path = os.path.join(self.root, VERSIONS_DIR)
+        if not os.path.isdir(path):
+            return []
+        return sorted(name for name in os.listdir(path) if not name.startswith('.'))
+
+    def current_version(self):
+        try:
+            with open(os.path.join(self.root, CURRENT_FILE)) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def manifest(self, version):
+        with open(os.path.join(self.version_dir(version), MANIFEST_FILE)) as f:
+            return json.load(f)
+
+    def publish(self, source_dir, version=None, metadata=None, activate=True):
+        """Copies the files of `source_dir` into a new version and returns its name."""
+        files = {}
+        for dirpath, _, filenames in os.walk(source_dir):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                relative = os.path.relpath(path, source_dir)
+                files[relative] = {"sha256": file_sha256(path), "size": os.path.getsize(path)}
+        if not files:
+            raise ModelIntegrityError(f"No model files found in {source_dir}")
+
+        if version is None:
+            fingerprint = hashlib.sha256(json.dumps(files, sort_keys=True).encode()).hexdigest()
+            version = f"{datetime.now(timezone.utc):%Y%m%dT%H%M%S}-{fingerprint[:8]}"
+        target = self.version_dir(version)
+        if os.path.exists(target):
+            raise ModelIntegrityError(f"Model version {version} already exists")
+
+        staging = os.path.join(self.root, VERSIONS_DIR, f".tmp-{version}")
+        shutil.rmtree(staging, ignore_errors=True)
+        shutil.copytree(source_dir, staging)
+        manifest = {
+            "version": version,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "files": files,
+            "metadata": metadata or {},
+        }
+        with open(os.path.join(staging, MANIFEST_FILE), 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.rename(staging, target)
+
+        if activate:
+            self.activate(version)
+        return version
+
+    def activate(self, version):
+        """Points CURRENT at `version` (also used to roll back)."""
+        self.verify(version)
+        temporary = os.path.join(self.root, f".{CURRENT_FILE}.{os.getpid()}")
+        with open(temporary, 'w') as f:
+            f.write(version)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, os.path.join(self.root, CURRENT_FILE))
+
+    def verify(self, version):
+        """Raises ModelIntegrityError unless every file matches its checksum."""
+        try:
+            manifest = self.manifest(version)
+        except FileNotFoundError:
+            raise ModelIntegrityError(f"Model version {version} has no manifest")
+        for relative, expected in manifest["files"].items():
+            path = os.path.join(self.version_dir(version), relative)
+            if not os.path.exists(path) or file_sha256(path) != expected["sha256"]:
+                raise ModelIntegrityError(f"Checksum mismatch for {relative} in version {version}")
+        return manifest
+
+
+class _ModelHandle:
+    """A loaded model version and the number of requests currently using it."""
+
+    def __init__(self, model, version, source_dir):
+        self.model = model
+        self.version = version
+        self.source_dir = source_dir
+        self.leases = 0
+        self.retired = False
+
+    def release_if_idle(self):
+        if self.retired and self.leases == 0 and self.model is not None:
+            self.model = None
+            logger.info(f"Released recommender model version {self.version}")
+
+
+class HotSwapModel:
+    """
+    Holds the active model and swaps in new registry versions without downtime.
+
+    Requests use `lease()`; a new version is loaded, checksum-verified and
+    warmed up in the background, then swapped in with a single reference
+    assignment. The previous version is released once its last lease ends.
+    Without a published registry version the model is loaded from
+    `fallback_dir` (the unversioned layout written by the training scripts).
+    """
+
+    def __init__(self, loader, registry, fallback_dir, warmup=None, on_swap=None,
+                 poll_interval=30.0):
+        self.loader = loader
+        self.registry = registry
+        self.fallback_dir = fallback_dir
+        self.warmup = warmup
+        self.on_swap = on_swap
+        self.poll_interval = poll_interval
+        self._handle = None
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+
+    @property
+    def version(self):
+        handle = self._handle
+        return handle.version if handle else None
+
+    @property
+    def source_dir(self):
+        handle = self._handle
+        return handle.source_dir if handle else None
+
+    def peek(self):
+        handle = self._handle
+        return handle.model if handle else None
+
+    def get(self):
+        """Returns the active model, loading it synchronously on first use."""
+        if self._handle is None:
+            with self._load_lock:
+                if self._handle is None:
+                    self._install(*self._load(self.registry.current_version()))
+        return self._handle.model
+
+    @contextmanager
+    def lease(self):
+        self.get()
+        with self._lock:
+            handle = self._handle
+            handle.leases += 1
+        try:
+            yield handle.model
+        finally:
+            with self._lock:
+                handle.leases -= 1
+                handle.release_if_idle()
+
+    def replace(self, model, version, source_dir=None):
+        """Swaps in an already-built model (e.g. after an in-process rebuild)."""
+        self._install(model, version, source_dir or self.source_dir)
+
+    def check_for_update(self):
+        """Loads and swaps in the registry's current version if it changed."""
+        version = self.registry.current_version()
+        if version is None or version == self.version:
+            return False
+        with self._load_lock:
+            if version == self.version:
+                return False
+            started = time.perf_counter()
+            self._install(*self._load(version))
+        logger.info(
+            f"Swapped in recommender model version {version} "
+            f"(loaded in {time.perf_counter() - started:.1f}s)"
+        )
+        return True
+
+    async def watch(self):
+        """Polls the registry and hot-swaps new versions until cancelled."""
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await asyncio.to_thread(self.check_for_update)
+            except Exception as e:
+                # Keep serving the current version if the new one is broken
+                logger.error(f"Failed to load new recommender model version: {e}")
+
+    def _load(self, version):
+        if version is None:
+            source_dir = self.fallback_dir
+        else:
+            self.registry.verify(version)
+            source_dir = self.registry.version_dir(version)
+        model = self.loader(source_dir)
+        if self.warmup is not None:
+            self.warmup(model)
+        return model, version, source_dir
+
+    def _install(self, model, version, source_dir):
+        with self._lock:
+            previous = self._handle
+            self._handle = _ModelHandle(model, version, source_dir)
+            if previous is not None:
+                previous.retired = True
+                previous.release_if_idle()
+        if previous is not None and self.on_swap is not None:
+            self.on_swap()
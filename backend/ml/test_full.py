@@ -3,11 +3,23 @@ from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 import joblib
 import os
+import sys
+
+# Make the `backend` package importable when run as a script
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from backend.ml.ranking import top_k
+from backend.ml.ann import ANNIndex
 
 # Define file paths for the model components
 MODEL_DIR = 'recommender_model'
 SIMILARITY_MATRIX_PATH = os.path.join(MODEL_DIR, 'cosine_similarity_matrix.pkl')
 MOVIE_TITLE_MAPPING_PATH = os.path.join(MODEL_DIR, 'movie_title_mapping.pkl')
+# Components loaded by the API recommender (backend/ml/recommender.py)
+TFIDF_MATRIX_PATH = os.path.join(MODEL_DIR, 'tfidf_matrix.pkl')
+MOVIE_TITLES_PATH = os.path.join(MODEL_DIR, 'movie_titles.pkl')
+TFIDF_VECTORIZER_PATH = os.path.join(MODEL_DIR, 'tfidf_vectorizer.pkl')
+MOVIE_DOCUMENTS_PATH = os.path.join(MODEL_DIR, 'movie_documents.pkl')
 
 def create_and_save_model(df):
     """
@@ -18,10 +30,10 @@ def create_and_save_model(df):
 
     # 1. Feature Engineering and Imputation (as correctly done in your original script)
     # Filling nulls in textual features to prevent errors in TfidfVectorizer
-    df['tagline'].fillna('no tagline', inplace=True)
-    df['overview'].fillna('no overview', inplace=True)
-    df['genres'].fillna('', inplace=True)
-    df['keywords'].fillna('', inplace=True)
+    df['tagline'] = df['tagline'].fillna('no tagline')
+    df['overview'] = df['overview'].fillna('no overview')
+    df['genres'] = df['genres'].fillna('')
+    df['keywords'] = df['keywords'].fillna('')
 
     # Combine descriptive textual features into a single string
     # We include original_title, genres, keywords, overview, and tagline.
@@ -60,10 +72,20 @@ def create_and_save_model(df):
     os.makedirs(MODEL_DIR, exist_ok=True)
     joblib.dump(cosine_sim, SIMILARITY_MATRIX_PATH)
     joblib.dump(indices, MOVIE_TITLE_MAPPING_PATH)
+    joblib.dump(tfidf_matrix, TFIDF_MATRIX_PATH)
+    joblib.dump(df['title'].tolist(), MOVIE_TITLES_PATH)
+    # The fitted vectorizer and corpus let new movies be appended without a retrain
+    joblib.dump(tfidf, TFIDF_VECTORIZER_PATH)
+    joblib.dump(df['combined_features'].tolist(), MOVIE_DOCUMENTS_PATH)
+
+    # 7. Build the approximate nearest-neighbor index used at catalog scale,
+    # where the dense similarity matrix above no longer fits in memory
+    ANNIndex.build(tfidf_matrix).save(MODEL_DIR)
 
     print("\n--- Model Components Saved Successfully ---")
     print(f"Similarity Matrix saved to: {SIMILARITY_MATRIX_PATH}")
     print(f"Title Mapping saved to: {MOVIE_TITLE_MAPPING_PATH}")
+    print(f"TF-IDF Matrix saved to: {TFIDF_MATRIX_PATH}")
     return df, indices, cosine_sim
 
 
@@ -78,21 +100,9 @@ def get_recommendations(movie_title, df, indices, cosine_sim, top_n=10):
     # Get the index of the movie that matches the title
     idx = indices[movie_title]
 
-    # Get the similarity scores for all movies relative to this movie
-    sim_scores = list(enumerate(cosine_sim[idx]))
-
-    # Sort the movies based on the similarity score
-    # We sort by the score (element 1 in the tuple) in descending order
-    sim_scores = sorted(sim_scores, key=lambda x: x[1], reverse=True)
-
-    # Get the scores of the top 'top_n + 1' most similar movies (we exclude the first one, which is the movie itself)
-    sim_scores = sim_scores[1:top_n + 1]
-
-    # Get the movie indices
-    movie_indices = [i[0] for i in sim_scores]
-
-    # Get the similarity scores for printing
-    similarity_scores = [i[1] for i in sim_scores]
+    # Select the top N most similar movies (excluding the movie itself) with a
+    # vectorized top-K instead of sorting the whole similarity row in Python
+    movie_indices, similarity_scores = top_k(cosine_sim[idx], top_n, exclude=idx)
 
     # Return the top N most similar movie titles along with their scores
     recommendations = list(zip(df['title'].iloc[movie_indices], similarity_scores))
@@ -1,6 +1,12 @@
 import pandas as pd
 import joblib
 import os
+import sys
+
+# Make the `backend` package importable when run as a script
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from backend.ml.ranking import top_k
 from sklearn.metrics.pairwise import cosine_similarity # Imported for completeness, though not strictly needed if only loading artifacts
 
 # Define file paths. These must match the paths used in the model creation script.
@@ -17,10 +23,10 @@ def load_model_components():
         # Load the original DataFrame (needed to get movie titles and content)
         df = pd.read_csv(MOVIE_DATA_PATH)
         
-        df['tagline'].fillna('no tagline', inplace=True)
-        df['overview'].fillna('no overview', inplace=True)
-        df['genres'].fillna('', inplace=True)
-        df['keywords'].fillna('', inplace=True)
+        df['tagline'] = df['tagline'].fillna('no tagline')
+        df['overview'] = df['overview'].fillna('no overview')
+        df['genres'] = df['genres'].fillna('')
+        df['keywords'] = df['keywords'].fillna('')
         
         # Load the saved components
         cosine_sim = joblib.load(SIMILARITY_MATRIX_PATH)
@@ -49,21 +55,9 @@ def get_recommendations(movie_title, df, indices, cosine_sim, top_n=10):
     # Get the index of the movie that matches the title
     idx = indices[movie_title]
 
-    # Get the similarity scores for all movies relative to this movie
-    # Note: cosine_sim is a numpy array loaded from the pickle file
-    sim_scores = list(enumerate(cosine_sim[idx]))
-
-    # Sort the movies based on the similarity score
-    sim_scores = sorted(sim_scores, key=lambda x: x[1], reverse=True)
-
-    # Get the scores of the top 'top_n + 1' most similar movies (excluding the movie itself)
-    sim_scores = sim_scores[1:top_n + 1]
-
-    # Get the movie indices
-    movie_indices = [i[0] for i in sim_scores]
-
-    # Get the similarity scores for printing
-    similarity_scores = [i[1] for i in sim_scores]
+    # Select the top N most similar movies (excluding the movie itself) with a
+    # vectorized top-K instead of sorting the whole similarity row in Python
+    movie_indices, similarity_scores = top_k(cosine_sim[idx], top_n, exclude=idx)
 
     # Return the top N most similar movie titles along with their scores
     recommendations = list(zip(df['title'].iloc[movie_indices], similarity_scores))
@@ -22,8 +22,8 @@ def find_similar_movies():
     column_name = 'overview'
 
     # replace tagline null values with 'no tagline'
-    df['tagline'].fillna('no tagline', inplace=True)
-    df[column_name].fillna('no overview', inplace=True)
+    df['tagline'] = df['tagline'].fillna('no tagline')
+    df[column_name] = df[column_name].fillna('no overview')
 
      # Calculate the count of null (missing) values
     null_count = df[column_name].isnull().sum()
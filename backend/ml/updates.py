@@ -0,0 +1,88 @@
+"""
+Live recommender updates from Kafka `movie_created` events.
+
+Started by the API at startup, so the updater (and the ML stack it imports)
+is only loaded when the first event arrives.
+"""
+import asyncio
+import logging
+
+from backend.kafkaConnection import KafkaConnection, record_consumer_lag
+from backend.tracing import SpanKind, extract_kafka_context, link_from, start_span
+from backend.ml import recommender as recommender_store
+
+logger = logging.getLogger(__name__)
+
+
+class ModelUpdateConsumer:
+    """
+    Keeps this process's recommender current with `movie_created` events.
+
+    Every API worker consumes the topic without a consumer group, so each one
+    sees every event and updates its own in-memory model. The rebuild
+    schedule is checked between polls and runs off the event loop.
+    """
+
+    def __init__(self, topic="movie-events", batch_size=100, poll_timeout_ms=1000):
+        self.topic = topic
+        self.batch_size = batch_size
+        self.poll_timeout_ms = poll_timeout_ms
+        self.kafka_connection = KafkaConnection()
+        self.updater = None
+        self.updater_version = None
+
+    def _apply(self, events):
+        try:
+            recommender = recommender_store.get_recommender()
+            holder = recommender_store.model_holder
+            if self.updater is None or self.updater_version != holder.version:
+                # A new registry version was swapped in, start over from its documents
+                from backend.ml.incremental import IncrementalUpdater
+                self.updater = IncrementalUpdater.load(holder.source_dir)
+                self.updater_version = holder.version
+        except FileNotFoundError as e:
+            logger.warning(f"Skipping {len(events)} movie events, model not available: {e}")
+            return
+        self.updater.apply(recommender, events)
+
+    def _rebuild(self):
+        recommender = recommender_store.get_recommender()
+        recommender_store.set_recommender(self.updater.rebuild(recommender))
+
+    async def run(self):
+        consumer = await self.kafka_connection.create_consumer(
+            self.topic, group_id=None, auto_offset_reset='latest'
+        )
+        if not consumer:
+            logger.warning("Recommender live updates disabled, no Kafka consumer")
+            return
+        try:
+            while True:
+                batches = await consumer.getmany(
+                    timeout_ms=self.poll_timeout_ms, max_records=self.batch_size
+                )
+                for messages in batches.values():
+                    record_consumer_lag(consumer, messages[-1], "recommender-updates")
+                messages = [
+                    message
+                    for messages in batches.values()
+                    for message in messages
+                    if message.value and message.value.get("event") == "movie_created"
+                ]
+                if messages:
+                    # One span per batch, linked to the requests that created the movies
+                    links = [link_from(extract_kafka_context(message.headers)) for message in messages]
+                    with start_span(
+                        f"{self.topic} process", SpanKind.CONSUMER,
+                        {"messaging.system": "kafka", "messaging.batch.message_count": len(messages)},
+                        links=[link for link in links if link is not None],
+                    ):
+                        await asyncio.to_thread(self._apply, [message.value for message in messages])
+                if self.updater is not None and self.updater.needs_rebuild():
+                    await asyncio.to_thread(self._rebuild)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Recommender live updates stopped: {e}")
+        finally:
+            await self.kafka_connection.close_connections()
@@ -0,0 +1,348 @@
+"""
+Bulk library import from CSV or NDJSON uploads.
+
+The request body is streamed to a temporary file and imported by a background
+job. The job reads the file one line at a time, validates rows against
+`schema.MovieBase` in chunks of IMPORT_CHUNK_SIZE and upserts each chunk on
+(owner_id, imdbID) with a single statement, so memory is bounded by the chunk
+size whatever the size of the file. Files produced by the library export can
+be imported as they are.
+
+Each committed chunk is indexed in Elasticsearch with one bulk request, and
+the movies it created (not those it updated) are announced with
+`movie_created` on Kafka and RabbitMQ, as when a movie is added on its own.
+
+Job progress is kept in the `import_job` table, so the status endpoint
+answers from any worker, whichever one accepted the upload.
+"""
+import asyncio
+import csv
+import json
+import logging
+import os
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+from itertools import islice
+
+import orjson
+from fastapi import HTTPException, status
+from sqlalchemy.dialects import postgresql, sqlite
+
+from backend.db import SessionLocal
+from backend.deadline import detached
+from backend.elastic import connected_client as es_client, index_documents
+from . import models, schema
+from .services import (
+    announce_movies_created,
+    bump_collection_version,
+    invalidate_playlists,
+    movie_cache,
+    movie_search_document,
+)
+
+logger = logging.getLogger(__name__)
+
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", 1000))
+IMPORT_MAX_BYTES = int(os.getenv("IMPORT_MAX_BYTES", 100 * 1024 * 1024))
+IMPORT_WRITE_BLOCK_BYTES = 1024 * 1024
+# Invalid rows reported in a job's status; the rest are only counted
+IMPORT_MAX_ERRORS = 100
+# Finished jobs are reported for this long
+IMPORT_JOB_TTL = int(os.getenv("IMPORT_JOB_TTL", 3600))
+
+PENDING = "pending"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+UPSERT_COLUMNS = ("title", "year", "type", "poster")
+INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+class ImportJob:
+    """Progress of one import, as reported by the status endpoint."""
+
+    def __init__(self, owner_id, import_format):
+        self.id = uuid.uuid4().hex
+        self.owner_id = owner_id
+        self.format = import_format
+        self.status = PENDING
+        self.rows = 0
+        self.imported = 0
+        self.invalid = 0
+        self.errors = []
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+
+    def record_invalid(self, line, error):
+        self.invalid += 1
+        if len(self.errors) < IMPORT_MAX_ERRORS:
+            self.errors.append({"line": line, "error": str(error)})
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "owner_id": self.owner_id,
+            "format": self.format,
+            "status": self.status,
+            "rows": self.rows,
+            "imported": self.imported,
+            "invalid": self.invalid,
+            "errors": self.errors,
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "status_url": f"/api/movies/import/{self.id}",
+        }
+
+
+class ImportJobStore:
+    """
+    Jobs started by this worker and their tasks.
+
+    Progress is saved to the `import_job` table, so the status can be polled
+    through any worker; rows expire `ttl` seconds after their last update.
+    """
+
+    def __init__(self, session_factory=None, ttl=IMPORT_JOB_TTL):
+        self._session_factory = session_factory
+        self.ttl = ttl
+        self.jobs = {}
+        self.tasks = {}
+
+    def _session(self):
+        return (self._session_factory or SessionLocal)()
+
+    def _prune(self):
+        expired = time.time() - self.ttl
+        for job_id, job in list(self.jobs.items()):
+            if job.finished_at is not None and job.finished_at < expired:
+                del self.jobs[job_id]
+
+    def _save(self, job_id, owner_id, state, prune):
+        with self._session() as database:
+            if prune:
+                database.query(models.ImportJobState).filter(
+                    models.ImportJobState.expires_at < datetime.now()
+                ).delete(synchronize_session=False)
+            database.merge(models.ImportJobState(
+                id=job_id, owner_id=owner_id, state=state,
+                expires_at=datetime.now() + timedelta(seconds=self.ttl),
+            ))
+            database.commit()
+
+    def _load(self, job_id):
+        with self._session() as database:
+            row = database.get(models.ImportJobState, job_id)
+            if row is None or row.expires_at <= datetime.now():
+                return None
+            return row.state
+
+    def start(self, job, coroutine):
+        self._prune()
+        self.jobs[job.id] = job
+        # The job outlives the upload request and must not inherit its deadline
+        task = asyncio.create_task(detached(coroutine))
+        self.tasks[job.id] = task
+        task.add_done_callback(lambda _: self.tasks.pop(job.id, None))
+        return task
+
+    async def save(self, job, prune=False):
+        """Saves the job's progress; `prune` also deletes expired jobs."""
+        try:
+            await asyncio.to_thread(self._save, job.id, job.owner_id, json.dumps(job.to_dict()), prune)
+        except Exception as e:
+            logger.warning(f"Failed to save progress of import {job.id}: {e}")
+
+    async def get(self, job_id):
+        job = self.jobs.get(job_id)
+        if job is not None:
+            return job.to_dict()
+        try:
+            state = await asyncio.to_thread(self._load, job_id)
+        except Exception as e:
+            logger.warning(f"Failed to read progress of import {job_id}: {e}")
+            return None
+        return None if state is None else json.loads(state)
+
+
+job_store = ImportJobStore()
+
+
+def format_from_content_type(content_type):
+    return "csv" if (content_type or "").startswith("text/csv") else "ndjson"
+
+
+def _discard_upload(upload):
+    upload.close()
+    os.unlink(upload.name)
+
+
+async def spool_upload(chunks, max_bytes):
+    """Writes the streamed request body to a temporary file; returns its path."""
+    upload = await asyncio.to_thread(tempfile.NamedTemporaryFile, prefix="movie-import-", delete=False)
+    size = 0
+    block = bytearray()
+    try:
+        async for chunk in chunks:
+            size += len(chunk)
+            if size > max_bytes:
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail=f"Imports are limited to {max_bytes} bytes.",
+                )
+            block += chunk
+            # The body arrives in small chunks; the disk is written in large blocks, in a thread
+            if len(block) >= IMPORT_WRITE_BLOCK_BYTES:
+                await asyncio.to_thread(upload.write, bytes(block))
+                block.clear()
+        await asyncio.to_thread(upload.write, bytes(block))
+    except BaseException:
+        await asyncio.to_thread(_discard_upload, upload)
+        raise
+    await asyncio.to_thread(upload.close)
+    return upload.name
+
+
+def read_rows(path, import_format):
+    """Yields (line number, row) pairs, reading the file one line at a time."""
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        if import_format == "csv":
+            reader = csv.DictReader(f)
+            for row in reader:
+                # Empty cells are missing values, not empty strings
+                yield reader.line_num, {key: value for key, value in row.items() if value}
+        else:
+            for line_number, line in enumerate(f, 1):
+                if line.strip():
+                    yield line_number, line
+
+
+def validate_chunk(rows, job):
+    """The chunk's valid rows as upsert values; invalid rows are recorded on the job."""
+    movies = {}
+    for line_number, row in rows:
+        try:
+            if isinstance(row, str):
+                row = orjson.loads(row)
+            movie = schema.MovieBase.model_validate(row)
+        except ValueError as e:
+            job.record_invalid(line_number, e)
+            continue
+        # A title repeated within a chunk keeps its last values, as it would across chunks
+        movies[movie.imdbID] = {
+            "title": movie.title,
+            "imdbID": movie.imdbID,
+            "year": movie.year,
+            "type": movie.type,
+            "poster": str(movie.poster) if movie.poster else None,
+        }
+    return list(movies.values())
+
+
+def upsert_movies(database, owner_id, movies):
+    """
+    Inserts or updates a chunk of movies in one statement and commits it.
+
+    Returns the upserted movies (as detached `Movie` objects), the ids of
+    those that were created and the ids of the playlists holding them.
+    """
+    insert = INSERTS[database.get_bind().dialect.name]
+    movie_table = models.Movie.__table__
+    statement = insert(movie_table)
+    statement = statement.on_conflict_do_update(
+        index_elements=[movie_table.c.owner_id, movie_table.c.imdbID],
+        set_={column: statement.excluded[column] for column in UPSERT_COLUMNS},
+    ).returning(movie_table.c.id, movie_table.c.imdbID, movie_table.c.createdDate)
+    created = datetime.now()
+    by_imdb_id = {movie["imdbID"]: movie for movie in movies}
+    try:
+        existing = {
+            imdb_id
+            for (imdb_id,) in database.query(models.Movie.imdbID).filter(
+                models.Movie.owner_id == owner_id, models.Movie.imdbID.in_(by_imdb_id)
+            )
+        }
+        # Executed with a parameter list, the statement is compiled once and
+        # sent as multi-row VALUES batches ("insertmanyvalues")
+        saved = [
+            models.Movie(**by_imdb_id[imdb_id], id=movie_id, owner_id=owner_id, createdDate=created_date)
+            for movie_id, imdb_id, created_date in database.execute(statement, [
+                {**movie, "owner_id": owner_id, "createdDate": created} for movie in movies
+            ])
+        ]
+        movie_ids = [movie.id for movie in saved]
+        playlist_ids = [
+            playlist_id
+            for (playlist_id,) in database.query(models.PlaylistMovie.playlist_id)
+            .filter(models.PlaylistMovie.movie_id.in_(movie_ids))
+            .distinct()
+        ]
+        bump_collection_version(database, owner_id)
+        database.commit()
+    except Exception:
+        database.rollback()
+        raise
+    created_ids = {movie.id for movie in saved if movie.imdbID not in existing}
+    return saved, created_ids, playlist_ids
+
+
+def import_chunk(database, job, rows):
+    """Reads, validates and upserts the next chunk; returns None at the end of the file."""
+    chunk = list(islice(rows, IMPORT_CHUNK_SIZE))
+    if not chunk:
+        return None
+    job.rows += len(chunk)
+    movies = validate_chunk(chunk, job)
+    if not movies:
+        return [], set(), []
+    return upsert_movies(database, job.owner_id, movies)
+
+
+async def publish_chunk(movies, created_ids):
+    """Indexes a committed chunk and announces the movies it created."""
+    if es_client and movies:
+        await index_documents(es_client, "movies", {movie.id: movie_search_document(movie) for movie in movies})
+    created = [movie for movie in movies if movie.id in created_ids]
+    if created:
+        # One batch per chunk; each broker keeps the batch's order
+        await announce_movies_created(created)
+
+
+async def run_import(job, path):
+    database = SessionLocal()
+    rows = read_rows(path, job.format)
+    job.status = RUNNING
+    try:
+        # Parsing and the database are synchronous: each chunk runs in a thread
+        while (result := await asyncio.to_thread(import_chunk, database, job, rows)) is not None:
+            movies, created_ids, playlist_ids = result
+            job.imported += len(movies)
+            await movie_cache.invalidate(*(f"{job.owner_id}:{movie.id}" for movie in movies))
+            await invalidate_playlists(job.owner_id, *playlist_ids)
+            await publish_chunk(movies, created_ids)
+            await job_store.save(job)
+        job.status = COMPLETED
+    except Exception as e:
+        logger.exception(f"Import {job.id} failed")
+        job.status = FAILED
+        job.error = str(e)
+    finally:
+        job.finished_at = time.time()
+        rows.close()
+        database.close()
+        os.unlink(path)
+        await job_store.save(job)
+
+
+async def start_import(chunks, owner_id, import_format):
+    """Spools the upload and starts importing it in the background; returns the job."""
+    path = await spool_upload(chunks, IMPORT_MAX_BYTES)
+    job = ImportJob(owner_id, import_format)
+    # Saved before answering, so a poll through another worker finds the job at once
+    await job_store.save(job, prune=True)
+    job_store.start(job, run_import(job, path))
+    return job
@@ -1,18 +1,20 @@
 from datetime import datetime
 from sqlalchemy.orm import relationship
-from sqlalchemy import Column, String, ForeignKey, Text, DateTime, Integer
+from sqlalchemy import Column, String, ForeignKey, Text, DateTime, Integer, UniqueConstraint
 
 from backend.db import Base
 
 
 class Movie(Base):
     __tablename__ = "movie"
+    # Each user may add a title once; imports upsert on this key
+    __table_args__ = (UniqueConstraint("owner_id", "imdbID", name="uq_movie_owner_id_imdbID"),)
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     createdDate = Column(DateTime, default=datetime.now)
     year = Column(String(50))
     title = Column(String(50))
-    imdbID = Column(String(50), unique=True)
+    imdbID = Column(String(50))
     type = Column(String(50))
     poster = Column(Text)
     owner_id = Column(Integer, ForeignKey("user.id", ondelete="CASCADE"))
@@ -45,4 +47,14 @@ class PlaylistMovie(Base):
     id = Column(Integer, primary_key=True, autoincrement=True)
     createdDate = Column(DateTime, default=datetime.now)
     playlist_id = Column(Integer, ForeignKey("playlist.id", ondelete="CASCADE"))
-    movie_id = Column(Integer, ForeignKey("movie.id", ondelete="CASCADE"))
\ No newline at end of file
+    movie_id = Column(Integer, ForeignKey("movie.id", ondelete="CASCADE"))
+
+class ImportJobState(Base):
+    """Progress of an import job, readable by every worker until `expires_at`."""
+
+    __tablename__ = "import_job"
+
+    id = Column(String(32), primary_key=True)
+    owner_id = Column(Integer, ForeignKey("user.id", ondelete="CASCADE"), nullable=False)
+    state = Column(Text, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
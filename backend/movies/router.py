@@ -1,11 +1,15 @@
-from typing import List
-from fastapi import APIRouter, Depends, status, Response
+from typing import List, Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from backend.auth.jwt import get_current_user
 from backend.auth.models import User
 
 from backend import db
+from backend.etag import CACHE_CONTROL, etag_matches, make_etag, not_modified
+from backend.serialization import trusted_response
 
+from . import imports
 from . import schema
 from . import services
 
@@ -26,13 +30,77 @@ async def create_new_movie(
     return result
 
 
-@router.get("/", status_code=status.HTTP_200_OK, response_model=List[schema.MovieList])
+def listing_headers(kind, database, owner_id):
+    """ETag and Cache-Control headers of a user's listing."""
+    # Read before the listing itself: a write racing with the query can only
+    # leave the body newer than its ETag, which costs one extra 200 later
+    etag = make_etag(kind, owner_id, services.get_collection_version(database, owner_id))
+    return {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+
+
+NOT_MODIFIED = {status.HTTP_304_NOT_MODIFIED: {"description": "Listing unchanged since the given ETag"}}
+
+
+@router.get(
+    "/", status_code=status.HTTP_200_OK, response_model=List[schema.MovieList],
+    responses=NOT_MODIFIED,
+)
 async def movie_list(
+    request: Request,
     database: Session = Depends(db.get_db),
     current_user: User = Depends(get_current_user),
 ):
+    headers = listing_headers("movies", database, current_user.id)
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return not_modified(headers["ETag"])
     result = await services.get_movie_listing(database, current_user.id)
-    return result
+    return trusted_response(result, headers=headers)
+
+
+@router.get(
+    "/export",
+    response_class=StreamingResponse,
+    responses={status.HTTP_200_OK: {"content": {"application/x-ndjson": {}, "text/csv": {}}}},
+)
+async def export_movies(
+    export_format: Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
+    current_user: User = Depends(get_current_user),
+):
+    """Streams the user's whole library, with playlist membership, as NDJSON or CSV."""
+    media_type, filename = services.EXPORT_FORMATS[export_format]
+    return StreamingResponse(
+        services.export_movies(current_user.id, export_format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.post("/import", status_code=status.HTTP_202_ACCEPTED)
+async def import_movies(
+    request: Request,
+    import_format: Optional[Literal["ndjson", "csv"]] = Query(None, alias="format"),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Imports a CSV or NDJSON library sent as the request body.
+
+    The format defaults to CSV for a `text/csv` body and NDJSON otherwise.
+    Movies are upserted on their imdbID; poll the returned `status_url`.
+    """
+    import_format = import_format or imports.format_from_content_type(request.headers.get("content-type"))
+    job = await imports.start_import(request.stream(), current_user.id, import_format)
+    return job.to_dict()
+
+
+@router.get("/import/{job_id}", status_code=status.HTTP_200_OK)
+async def import_status(
+    job_id: str,
+    current_user: User = Depends(get_current_user),
+):
+    job = await imports.job_store.get(job_id)
+    if job is None or job["owner_id"] != current_user.id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Import Not Found!")
+    return job
 
 
 @router.get(
@@ -43,7 +111,7 @@ async def get_movie_by_id(
     database: Session = Depends(db.get_db),
     current_user: User = Depends(get_current_user),
 ):
-    return await services.get_movie_by_id(movie_id, current_user.id, database)
+    return trusted_response(await services.get_cached_movie(movie_id, current_user.id, database))
 
 
 @router.delete(
@@ -72,24 +140,35 @@ async def create_new_playlist(
 
 
 @playlist_router.get(
-    "/", status_code=status.HTTP_200_OK, response_model=List[schema.PlayList]
+    "/", status_code=status.HTTP_200_OK, response_model=List[schema.PlayList],
+    responses=NOT_MODIFIED,
 )
 async def playlist_list(
+    request: Request,
     database: Session = Depends(db.get_db),
     current_user: User = Depends(get_current_user),
 ):
+    headers = listing_headers("playlists", database, current_user.id)
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return not_modified(headers["ETag"])
     result = await services.get_playlist_listing(database, current_user.id)
-    return result
+    return trusted_response(result, headers=headers)
 
 
 @playlist_router.get(
-    "/recommendations", status_code=status.HTTP_200_OK, response_model=List[schema.PlayList]
+    "/recommendations",
+    status_code=status.HTTP_200_OK,
+    response_model=List[schema.MovieRecommendation],
 )
 async def get_playlist_recommendations(
+    playlist_id: int,
+    limit: int = Query(10, ge=1, le=50),
     database: Session = Depends(db.get_db),
     current_user: User = Depends(get_current_user),
 ):
-    result = await services.get_playlist_recommendations(database, current_user.id)
+    result = await services.get_playlist_recommendations(
+        playlist_id, current_user, database, limit
+    )
     return result
 
 
@@ -101,7 +180,7 @@ async def get_playlist_by_id(
     database: Session = Depends(db.get_db),
     current_user: User = Depends(get_current_user),
 ):
-    return await services.get_playlist_by_id(playlist_id, current_user.id, database)
+    return trusted_response(await services.get_cached_playlist(playlist_id, current_user.id, database))
 
 
 @playlist_router.put(
@@ -57,6 +57,11 @@ class MovieList(MovieBase):
     owner: "UserSchema"  # Forward reference to UserSchema
 
 
+class MovieRecommendation(BaseModel):
+    title: str
+    score: float
+
+
 class UserSchema(BaseModel):
     username: str
     email: EmailStr
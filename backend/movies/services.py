@@ -1,17 +1,99 @@
 from fastapi import HTTPException, status
 from typing import List
-from . import models
+from . import models, schema
+import csv
+import io
 import json
+import orjson
+from itertools import groupby, islice
+from operator import attrgetter
 from backend.auth.models import User
+from backend.cache import ReadThroughCache, redis_client
+from backend.db import SessionLocal
 from datetime import datetime
-from backend.elastic import es_client
-from backend.rabbitMQ import RabbitMQManager
-from backend.kafkaConnection import send_kafka_message
+from backend.elastic import connected_client as es_client, index_document, index_documents
+from backend.rabbitMQ import rabbitmq_manager
+from backend.kafkaConnection import send_kafka_message, send_kafka_messages
+from backend.timing import stage
+from backend.ml.recommender import recommend_titles, recommendation_cache
 
 from sqlalchemy.orm import Session
 from pydantic import HttpUrl
+from starlette.concurrency import run_in_threadpool
+
+# Serialized responses of the single movie and playlist endpoints, keyed by
+# "<owner_id>:<id>" and invalidated by every write that changes them
+shared_cache = redis_client()
+movie_cache = ReadThroughCache("movie", shared=shared_cache)
+playlist_cache = ReadThroughCache("playlist", shared=shared_cache)
+
+
+async def invalidate_playlists(owner_id, *playlist_ids):
+    await playlist_cache.invalidate(*(f"{owner_id}:{playlist_id}" for playlist_id in playlist_ids))
+
+
+def get_collection_version(database, owner_id) -> int:
+    return (
+        database.query(User.collection_version).filter(User.id == owner_id).scalar() or 0
+    )
+
+
+def bump_collection_version(database, owner_id):
+    """Changes the ETags of the owner's listings; call before the write commits."""
+    database.query(User).filter(User.id == owner_id).update(
+        {User.collection_version: User.collection_version + 1}, synchronize_session=False
+    )
+
+
+def movie_search_document(movie):
+    """The movie's document in the Elasticsearch `movies` index."""
+    return {
+        "title": movie.title,
+        "imdbID": movie.imdbID,
+        "poster": movie.poster,
+        "year": movie.year,
+        "type": movie.type,
+        "owner_id": movie.owner_id,
+        "createdDate": movie.createdDate.isoformat(),
+    }
+
+
+def movie_created_event(movie):
+    return {
+        "event": "movie_created",
+        "movie_id": movie.id,
+        "imdb_id": movie.imdbID,
+        "title": movie.title,
+        "year": movie.year,
+        "type": movie.type,
+        "owner_id": movie.owner_id,
+        "created_at": movie.createdDate.isoformat(),
+    }
+
+
+async def announce_movie_created(movie):
+    """Publishes the movie_created event to Kafka and RabbitMQ."""
+    event = movie_created_event(movie)
+    with stage("kafka_ack"):
+        await send_kafka_message(
+            "movie-events", {**event, "timestamp": datetime.now().isoformat()}, str(movie.id)
+        )
+    with stage("rabbitmq_publish"):
+        await rabbitmq_manager.publish_message(message=json.dumps(event))
+
+
+async def announce_movies_created(movies):
+    """Publishes the movie_created events of `movies` as one batch per broker."""
+    events = [movie_created_event(movie) for movie in movies]
+    timestamp = datetime.now().isoformat()
+    with stage("kafka_ack"):
+        await send_kafka_messages(
+            "movie-events",
+            [({**event, "timestamp": timestamp}, str(movie.id)) for event, movie in zip(events, movies)],
+        )
+    with stage("rabbitmq_publish"):
+        await rabbitmq_manager.publish_messages([json.dumps(event) for event in events])
 
-rabbitmq_manager = RabbitMQManager()
 
 async def create_new_movie(
     request, database: Session, current_user: User
@@ -25,14 +107,15 @@ async def create_new_movie(
         )
 
         # error if the same movie has been added by the same user
-        existing_movie = (
-            database.query(models.Movie)
-            .filter(
-                models.Movie.imdbID == request.imdbID,
-                models.Movie.owner_id == current_user.id,
+        with stage("duplicate_check"):
+            existing_movie = (
+                database.query(models.Movie)
+                .filter(
+                    models.Movie.imdbID == request.imdbID,
+                    models.Movie.owner_id == current_user.id,
+                )
+                .first()
             )
-            .first()
-        )
         if existing_movie:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -48,55 +131,20 @@ async def create_new_movie(
             owner_id=current_user.id,
             createdDate=datetime.now(),
         )
-        database.add(new_movie)
-        database.commit()
-        database.refresh(new_movie)
+        with stage("commit"):
+            database.add(new_movie)
+            bump_collection_version(database, current_user.id)
+            database.commit()
+            database.refresh(new_movie)
 
         # add entry to elasticsearch index
         if es_client:
-            await es_client.index(
-                index="movies",
-                id=new_movie.id,
-                document={
-                    "title": new_movie.title,
-                    "imdbID": new_movie.imdbID,
-                    "poster": new_movie.poster,
-                    "year": new_movie.year,
-                    "type": new_movie.type,
-                    "owner_id": new_movie.owner_id,
-                    "createdDate": new_movie.createdDate.isoformat(),
-                },
-            )
+            with stage("es_index"):
+                await index_document(es_client, "movies", new_movie.id, movie_search_document(new_movie))
         else:
             print("Elasticsearch client is not initialized.")
 
-        # Publish message to Kafka
-        kafka_message = {
-            "event": "movie_created",
-            "movie_id": new_movie.id,
-            "imdb_id": new_movie.imdbID,
-            "title": new_movie.title,
-            "year": new_movie.year,
-            "type": new_movie.type,
-            "owner_id": new_movie.owner_id,
-            "created_at": new_movie.createdDate.isoformat(),
-            "timestamp": datetime.now().isoformat(),
-        }
-        await send_kafka_message("movie-events", kafka_message, str(new_movie.id))
-
-        # publish message to RabbitMQ
-        message_payload = {
-            "event": "movie_created",
-            "movie_id": new_movie.id,
-            "imdb_id": new_movie.imdbID,
-            "title": new_movie.title,
-            "year": new_movie.year,
-            "type": new_movie.type,
-            "owner_id": new_movie.owner_id,
-            "created_at": new_movie.createdDate.isoformat(),
-        }
-
-        await rabbitmq_manager.publish_message(message=json.dumps(message_payload))
+        await announce_movie_created(new_movie)
         
         return new_movie
     except Exception as e:
@@ -109,14 +157,40 @@ async def create_new_movie(
         )
         
 
-async def get_movie_listing(database, current_user) -> List[models.Movie]:
+async def get_movie_listing(database, current_user) -> List[dict]:
+    """The user's movies as `schema.MovieList` dicts, selected as columns in one query."""
     try:
-        movies = (
-            database.query(models.Movie)
+        rows = (
+            database.query(
+                models.Movie.year,
+                models.Movie.title,
+                models.Movie.imdbID,
+                models.Movie.type,
+                models.Movie.poster,
+                models.Movie.id,
+                models.Movie.createdDate,
+                models.Movie.owner_id,
+                User.username,
+                User.email,
+            )
+            .join(User, models.Movie.owner_id == User.id)
             .filter(models.Movie.owner_id == current_user)
             .all()
         )
-        return movies
+        return [
+            {
+                "year": row.year,
+                "title": row.title,
+                "imdbID": row.imdbID,
+                "type": row.type,
+                "poster": row.poster,
+                "id": row.id,
+                "createdDate": row.createdDate,
+                "owner_id": row.owner_id,
+                "owner": {"username": row.username, "email": row.email},
+            }
+            for row in rows
+        ]
     except Exception as e:
         if isinstance(e, HTTPException) and e.status_code == status.HTTP_400_BAD_REQUEST:
             raise e
@@ -147,6 +221,15 @@ async def get_movie_by_id(movie_id, current_user, database):
         )
 
 
+async def get_cached_movie(movie_id, current_user, database) -> dict:
+    """`get_movie_by_id` through the movie cache, serialized as the response."""
+    async def load():
+        movie = await get_movie_by_id(movie_id, current_user, database)
+        return schema.MovieBase.model_validate(movie, from_attributes=True).model_dump(mode="json")
+
+    return await movie_cache.get_or_load(f"{current_user}:{movie_id}", load)
+
+
 async def delete_movie_by_id(movie_id, current_user: User, database: Session):
     try:
         # check if movie belongs to the user
@@ -159,8 +242,18 @@ async def delete_movie_by_id(movie_id, current_user: User, database: Session):
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="Movie Not Found!"
             )
+        # Playlists holding the movie lose it through the cascade
+        playlist_ids = [
+            playlist_id
+            for (playlist_id,) in database.query(models.PlaylistMovie.playlist_id)
+            .filter(models.PlaylistMovie.movie_id == movie.id)
+            .all()
+        ]
         database.query(models.Movie).filter(models.Movie.id == movie_id).delete()
+        bump_collection_version(database, current_user.id)
         database.commit()
+        await movie_cache.invalidate(f"{current_user.id}:{movie_id}")
+        await invalidate_playlists(current_user.id, *playlist_ids)
     except HTTPException:
         database.rollback()
         raise
@@ -178,11 +271,12 @@ async def create_new_playlist(
 ) -> models.Playlist:
     try:
         # More than 10 playlists for a user is not allowed
-        existing_playlists = (
-            database.query(models.Playlist)
-            .filter(models.Playlist.owner_id == current_user.id)
-            .count()
-        )
+        with stage("limit_check"):
+            existing_playlists = (
+                database.query(models.Playlist)
+                .filter(models.Playlist.owner_id == current_user.id)
+                .count()
+            )
         if existing_playlists >= 10:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -193,21 +287,20 @@ async def create_new_playlist(
             owner_id=current_user.id,
             createdDate=datetime.now(),
         )
-        database.add(new_playlist)
-        database.commit()
-        database.refresh(new_playlist)
+        with stage("commit"):
+            database.add(new_playlist)
+            bump_collection_version(database, current_user.id)
+            database.commit()
+            database.refresh(new_playlist)
 
         # add entry to elasticsearch index
         if es_client:
-            await es_client.index(
-                index="playlists",
-                id=new_playlist.id,
-                document={
+            with stage("es_index"):
+                await index_document(es_client, "playlists", new_playlist.id, {
                     "name": new_playlist.name,
                     "owner_id": new_playlist.owner_id,
                     "createdDate": new_playlist.createdDate.isoformat(),
-                },
-            )
+                })
         else:
             print("Elasticsearch client is not initialized.")
 
@@ -220,7 +313,8 @@ async def create_new_playlist(
             "created_at": new_playlist.createdDate.isoformat(),
             "timestamp": datetime.now().isoformat(),
         }
-        await send_kafka_message("playlist-events", kafka_message, str(new_playlist.id))
+        with stage("kafka_ack"):
+            await send_kafka_message("playlist-events", kafka_message, str(new_playlist.id))
 
         # publish message to RabbitMQ
         message_payload = {
@@ -231,7 +325,8 @@ async def create_new_playlist(
                 "created_at": new_playlist.createdDate.isoformat(),
             }
 
-        await rabbitmq_manager.publish_message(message=json.dumps(message_payload))
+        with stage("rabbitmq_publish"):
+            await rabbitmq_manager.publish_message(message=json.dumps(message_payload))
 
         return new_playlist
     except HTTPException:
@@ -246,14 +341,20 @@ async def create_new_playlist(
         )
 
 
-async def get_playlist_listing(database, current_user) -> List[models.Playlist]:
+async def get_playlist_listing(database, current_user) -> List[dict]:
+    """The user's playlists as `schema.PlayList` dicts."""
     try:
-        playlists = (
-            database.query(models.Playlist)
+        rows = (
+            database.query(
+                models.Playlist.name,
+                models.Playlist.id,
+                models.Playlist.createdDate,
+                models.Playlist.owner_id,
+            )
             .filter(models.Playlist.owner_id == current_user)
             .all()
         )
-        return playlists
+        return [row._asdict() for row in rows]
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -287,6 +388,15 @@ async def get_playlist_by_id(playlist_id, current_user, database):
         )
 
 
+async def get_cached_playlist(playlist_id, current_user, database) -> dict:
+    """`get_playlist_by_id` through the playlist cache, serialized as the response."""
+    async def load():
+        detail = await get_playlist_by_id(playlist_id, current_user, database)
+        return schema.PlaylistDetail.model_validate(detail, from_attributes=True).model_dump(mode="json")
+
+    return await playlist_cache.get_or_load(f"{current_user}:{playlist_id}", load)
+
+
 async def delete_playlist_by_id(playlist_id: int, current_user: User, database: Session):
     try:
         # check if playlist belongs to the user
@@ -302,7 +412,10 @@ async def delete_playlist_by_id(playlist_id: int, current_user: User, database:
         database.query(models.Playlist).filter(
             models.Playlist.id == playlist_id
         ).delete()
+        bump_collection_version(database, current_user.id)
         database.commit()
+        recommendation_cache.invalidate(playlist_id)
+        await invalidate_playlists(current_user.id, playlist_id)
     except Exception as e:
         database.rollback()
         raise HTTPException(
@@ -331,8 +444,10 @@ async def update_playlist(playlist_id: int, request, current_user: User, databas
                 status_code=status.HTTP_404_NOT_FOUND, detail="Playlist Not Found!"
             )
         playlist.name = request.name
+        bump_collection_version(database, current_user.id)
         database.commit()
         database.refresh(playlist)
+        await invalidate_playlists(current_user.id, playlist_id)
         return playlist
     except Exception as e:
         database.rollback()
@@ -391,9 +506,12 @@ async def add_movie_to_playlist(
                 database.add(new_entry)
                 created_entries.append(new_entry)
         
+        bump_collection_version(database, current_user.id)
         database.commit()
         for entry in created_entries:
             database.refresh(entry)
+        recommendation_cache.invalidate(*playlist_ids)
+        await invalidate_playlists(current_user.id, *playlist_ids)
         
         return created_entries[0] if created_entries else None
         
@@ -414,7 +532,10 @@ async def remove_movie_from_playlist(
             models.PlaylistMovie.movie_id == movie_id,
             models.PlaylistMovie.playlist_id == playlist_id,
         ).delete()
+        bump_collection_version(database, current_user.id)
         database.commit()
+        recommendation_cache.invalidate(playlist_id)
+        await invalidate_playlists(current_user.id, playlist_id)
     except Exception as e:
         database.rollback()
         raise HTTPException(
@@ -442,21 +563,141 @@ async def get_movies_in_playlist(
     
 
 async def get_playlist_recommendations(
-    playlist_id: int, database: Session
-) -> List[models.Movie]:
+    playlist_id: int, current_user: User, database: Session, top_n: int = 10
+) -> List[dict]:
     try:
-        # Get all movies in the playlist
-        movies_in_playlist = (
-            database.query(models.Movie)
+        playlist = (
+            database.query(models.Playlist)
+            .filter_by(id=playlist_id, owner_id=current_user.id)
+            .first()
+        )
+        if not playlist:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Playlist Not Found!"
+            )
+
+        titles = [
+            title
+            for (title,) in database.query(models.Movie.title)
             .join(models.PlaylistMovie)
-            .filter(models.PlaylistMovie.playlist_id == playlist_id)
+            .filter(models.PlaylistMovie.playlist_id == playlist.id)
             .all()
+        ]
+
+        recommendations = recommendation_cache.get(playlist.id, titles, top_n)
+        if recommendations is None:
+            # Model loading and scoring are CPU bound, keep them off the event loop
+            with stage("recommend"):
+                recommendations = await run_in_threadpool(recommend_titles, titles, top_n)
+            recommendation_cache.set(playlist.id, titles, top_n, recommendations)
+
+        return [
+            {"title": title, "score": score} for title, score in recommendations
+        ]
+    except HTTPException:
+        raise
+    except FileNotFoundError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Recommendation model is not available.",
         )
-        
-        # For simplicity, return movies in the playlist as recommendations
-        return movies_in_playlist
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"An error occurred while fetching recommendations: {str(e)}",
         )
+
+
+# Library export
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", "movies.ndjson"),
+    "csv": ("text/csv", "movies.csv"),
+}
+# Rows fetched per server-side cursor round trip, and movies per streamed chunk
+EXPORT_BATCH_SIZE = 500
+EXPORT_CSV_COLUMNS = [
+    "id", "title", "imdbID", "year", "type", "poster", "createdDate", "playlist_ids", "playlists",
+]
+
+
+def _exported_movies(database, owner_id):
+    """The owner's movies with their playlists, read through a server-side cursor."""
+    rows = (
+        database.query(
+            models.Movie.id,
+            models.Movie.title,
+            models.Movie.imdbID,
+            models.Movie.year,
+            models.Movie.type,
+            models.Movie.poster,
+            models.Movie.createdDate,
+            models.Playlist.id.label("playlist_id"),
+            models.Playlist.name.label("playlist_name"),
+        )
+        .outerjoin(models.PlaylistMovie, models.PlaylistMovie.movie_id == models.Movie.id)
+        .outerjoin(models.Playlist, models.Playlist.id == models.PlaylistMovie.playlist_id)
+        .filter(models.Movie.owner_id == owner_id)
+        # A movie's playlist rows are adjacent, so only one movie is held at a time
+        .order_by(models.Movie.id, models.Playlist.id)
+        .yield_per(EXPORT_BATCH_SIZE)
+    )
+    for _, group in groupby(rows, key=attrgetter("id")):
+        group = list(group)
+        movie = group[0]
+        yield {
+            "id": movie.id,
+            "title": movie.title,
+            "imdbID": movie.imdbID,
+            "year": movie.year,
+            "type": movie.type,
+            "poster": movie.poster,
+            "createdDate": movie.createdDate,
+            "playlists": [
+                {"id": row.playlist_id, "name": row.playlist_name}
+                for row in group
+                if row.playlist_id is not None
+            ],
+        }
+
+
+def _ndjson_lines(movies):
+    for movie in movies:
+        yield orjson.dumps(movie, option=orjson.OPT_APPEND_NEWLINE)
+
+
+def _csv_lines(movies):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_CSV_COLUMNS)
+    for movie in movies:
+        playlists = movie.pop("playlists")
+        created = movie["createdDate"]
+        movie["createdDate"] = created.isoformat() if created else ""
+        writer.writerow([
+            *movie.values(),
+            ";".join(str(playlist["id"]) for playlist in playlists),
+            ";".join(playlist["name"] for playlist in playlists),
+        ])
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+EXPORT_WRITERS = {"ndjson": _ndjson_lines, "csv": _csv_lines}
+
+
+def export_movies(owner_id, export_format):
+    """
+    Yields the owner's library as NDJSON or CSV, EXPORT_BATCH_SIZE movies per chunk.
+
+    Memory stays constant whatever the library size. The generator opens its
+    own session because the request's session is closed before a streamed
+    body is sent.
+    """
+    database = SessionLocal()
+    try:
+        lines = EXPORT_WRITERS[export_format](_exported_movies(database, owner_id))
+        while chunk := b"".join(islice(lines, EXPORT_BATCH_SIZE)):
+            yield chunk
+    finally:
+        database.close()
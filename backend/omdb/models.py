@@ -0,0 +1,13 @@
+from sqlalchemy import Column, DateTime, String, Text
+
+from backend.db import Base
+
+
+class OmdbResponse(Base):
+    """An OMDb answer kept for every worker until `expires_at`."""
+
+    __tablename__ = "omdb_response"
+
+    key = Column(String(255), primary_key=True)
+    body = Column(Text, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
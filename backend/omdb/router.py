@@ -0,0 +1,32 @@
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Path, Query
+
+from backend.serialization import trusted_response
+
+from . import services
+
+router = APIRouter(tags=["OMDb"], prefix="/api/omdb")
+
+# Answers change rarely; browsers may reuse them for an hour
+CACHE_CONTROL = "public, max-age=3600"
+
+
+@router.get("/search")
+async def search(
+    s: str = Query(..., min_length=1, max_length=100, description="Title to search for"),
+    page: int = Query(1, ge=1, le=100),
+    type: Optional[Literal["movie", "series", "episode"]] = None,
+    y: Optional[int] = Query(None, ge=1800, le=2100, description="Year of release"),
+):
+    result = await services.omdb_client.search(s, page=page, media_type=type, year=y)
+    return trusted_response(result, headers={"Cache-Control": CACHE_CONTROL})
+
+
+@router.get("/title/{imdbID}")
+async def title(
+    imdbID: str = Path(..., pattern=r"^tt\d{7,10}$"),
+    plot: Literal["short", "full"] = "short",
+):
+    result = await services.omdb_client.title(imdbID, plot=plot)
+    return trusted_response(result, headers={"Cache-Control": CACHE_CONTROL})
@@ -0,0 +1,201 @@
+"""
+Server-side access to the OMDb API.
+
+The browser asks the backend, which keeps the API key and answers from a
+two-tier cache: an in-process LRU (OMDB_LOCAL_TTL seconds), then the
+`omdb_response` table, shared by every worker and kept across restarts
+(OMDB_CACHE_TTL seconds). Identical lookups in flight are coalesced, so a
+burst of searches for one title costs a single call upstream. Calls go
+through one pooled HTTP client per worker.
+
+OMDb answers unknown titles with `"Response": "False"`; those answers are
+cached like the others. Failed calls (network errors, timeouts, non-200
+statuses such as an invalid key) are not.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+
+import httpx
+from fastapi import HTTPException, status
+
+from backend.cache import LocalCache, ReadThroughCache, SingleFlight
+from backend.db import SessionLocal
+from backend.metrics import OMDB_REQUEST_DURATION
+from backend.tracing import SpanKind, start_span
+from .models import OmdbResponse
+
+logger = logging.getLogger(__name__)
+
+OMDB_URL = os.getenv("OMDB_URL", "https://www.omdbapi.com/")
+OMDB_API_KEY = os.getenv("OMDB_API_KEY")
+OMDB_TIMEOUT = float(os.getenv("OMDB_TIMEOUT", 5))
+OMDB_MAX_CONNECTIONS = int(os.getenv("OMDB_MAX_CONNECTIONS", 20))
+# Titles rarely change once published
+OMDB_CACHE_TTL = int(os.getenv("OMDB_CACHE_TTL", 7 * 24 * 3600))
+OMDB_LOCAL_TTL = float(os.getenv("OMDB_LOCAL_TTL", 300))
+OMDB_LOCAL_MAX_ENTRIES = int(os.getenv("OMDB_LOCAL_MAX_ENTRIES", 2048))
+# Seconds between two deletions of expired `omdb_response` rows by a worker
+OMDB_CACHE_PRUNE_INTERVAL = float(os.getenv("OMDB_CACHE_PRUNE_INTERVAL", 3600))
+
+
+class DatabaseCache:
+    """
+    Shared cache tier in the `omdb_response` table, with the Redis subset ReadThroughCache uses.
+
+    Expired rows are deleted on a write at most every `prune_interval` seconds.
+    """
+
+    def __init__(self, session_factory=SessionLocal, prune_interval=OMDB_CACHE_PRUNE_INTERVAL):
+        self.session_factory = session_factory
+        self.prune_interval = prune_interval
+        self._pruned_at = None
+
+    def _get(self, key):
+        with self.session_factory() as database:
+            row = database.get(OmdbResponse, key)
+            if row is None or row.expires_at <= datetime.now():
+                return None
+            return row.body
+
+    def _mget(self, keys):
+        with self.session_factory() as database:
+            rows = database.query(OmdbResponse).filter(
+                OmdbResponse.key.in_(keys), OmdbResponse.expires_at > datetime.now()
+            )
+            bodies = {row.key: row.body for row in rows}
+        return [bodies.get(key) for key in keys]
+
+    def _prune_due(self):
+        now = time.monotonic()
+        if self._pruned_at is not None and now - self._pruned_at < self.prune_interval:
+            return False
+        self._pruned_at = now
+        return True
+
+    def _set(self, key, value, ex):
+        with self.session_factory() as database:
+            if self._prune_due():
+                # Uses the expires_at index
+                database.query(OmdbResponse).filter(OmdbResponse.expires_at < datetime.now()).delete(
+                    synchronize_session=False
+                )
+            database.merge(OmdbResponse(
+                key=key, body=value, expires_at=datetime.now() + timedelta(seconds=ex),
+            ))
+            database.commit()
+
+    def _delete(self, keys):
+        with self.session_factory() as database:
+            deleted = database.query(OmdbResponse).filter(OmdbResponse.key.in_(keys)).delete(
+                synchronize_session=False
+            )
+            database.commit()
+            return deleted
+
+    async def get(self, key):
+        return await asyncio.to_thread(self._get, key)
+
+    async def mget(self, *keys):
+        return await asyncio.to_thread(self._mget, keys)
+
+    async def set(self, key, value, ex=OMDB_CACHE_TTL):
+        await asyncio.to_thread(self._set, key, value, ex)
+        return True
+
+    async def delete(self, *keys):
+        return await asyncio.to_thread(self._delete, keys)
+
+
+class OmdbClient:
+    """Cached, coalesced OMDb lookups over a pooled HTTP client."""
+
+    def __init__(self, base_url=OMDB_URL, api_key=OMDB_API_KEY, shared=None, transport=None):
+        self.base_url = base_url
+        self.api_key = api_key
+        self.transport = transport
+        self.cache = ReadThroughCache(
+            "omdb",
+            local=LocalCache(max_entries=OMDB_LOCAL_MAX_ENTRIES, ttl=OMDB_LOCAL_TTL),
+            shared=DatabaseCache() if shared is None else shared,
+            shared_ttl=OMDB_CACHE_TTL,
+        )
+        self.in_flight = SingleFlight()
+        self._http = None
+
+    def _client(self):
+        if self._http is None:
+            self._http = httpx.AsyncClient(
+                timeout=OMDB_TIMEOUT,
+                limits=httpx.Limits(
+                    max_connections=OMDB_MAX_CONNECTIONS,
+                    max_keepalive_connections=OMDB_MAX_CONNECTIONS,
+                ),
+                transport=self.transport,
+            )
+        return self._http
+
+    async def close(self):
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    def forget_connections(self):
+        # A forked worker must not share the parent's sockets
+        self._http = None
+
+    async def _fetch(self, endpoint, params):
+        if not self.api_key:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="OMDb lookups are not configured.",
+            )
+        started = time.perf_counter()
+        outcome = "error"
+        with start_span(f"omdb {endpoint}", SpanKind.CLIENT, {"server.address": self.base_url}):
+            try:
+                response = await self._client().get(self.base_url, params={**params, "apikey": self.api_key})
+                outcome = str(response.status_code)
+            except httpx.TimeoutException:
+                logger.warning(f"OMDb {endpoint} timed out after {OMDB_TIMEOUT}s")
+                raise HTTPException(
+                    status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail="OMDb did not answer in time."
+                )
+            except httpx.HTTPError as e:
+                logger.warning(f"OMDb {endpoint} failed: {e}")
+                raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail="OMDb is unavailable.")
+            finally:
+                OMDB_REQUEST_DURATION.labels(endpoint, outcome).observe(time.perf_counter() - started)
+
+        if response.status_code != status.HTTP_200_OK:
+            logger.warning(f"OMDb {endpoint} answered {response.status_code}: {response.text[:200]}")
+            raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail="OMDb is unavailable.")
+        try:
+            return response.json()
+        except json.JSONDecodeError:
+            raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail="OMDb sent an invalid answer.")
+
+    async def lookup(self, endpoint, params):
+        """The OMDb answer for `params`, from the cache when possible."""
+        params = {name: value for name, value in sorted(params.items()) if value is not None}
+        key = f"{endpoint}:" + "&".join(f"{name}={value}" for name, value in params.items())
+        return await self.in_flight.do(
+            key, lambda: self.cache.get_or_load(key, lambda: self._fetch(endpoint, params))
+        )
+
+    async def search(self, query, page=1, media_type=None, year=None):
+        # Searches are case-insensitive upstream; one cache entry serves every spelling
+        return await self.lookup("search", {
+            "s": " ".join(query.lower().split()), "page": page, "type": media_type, "y": year,
+        })
+
+    async def title(self, imdb_id, plot="short"):
+        return await self.lookup("title", {"i": imdb_id, "plot": plot})
+
+
+omdb_client = OmdbClient()
+
+os.register_at_fork(after_in_child=omdb_client.forget_connections)
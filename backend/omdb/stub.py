@@ -0,0 +1,103 @@
+"""
+Local stand-in for the OMDb API, for tests and offline development.
+
+It answers searches (`s`) and title lookups (`i`) over a small catalogue the
+way OMDb does, including the `"Response": "False"` answers and the 401 for a
+wrong key. Run it with
+
+    uvicorn backend.omdb.stub:app --port 8001
+
+and start the backend with OMDB_URL=http://localhost:8001/ OMDB_API_KEY=stub.
+`app.state.requests` counts the calls it served and `app.state.delay` adds
+latency to each of them.
+"""
+import asyncio
+from typing import Optional
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+
+STUB_API_KEY = "stub"
+PAGE_SIZE = 10
+
+
+def _title(imdb_id, title, year, media_type="movie", **details):
+    return {
+        "Title": title,
+        "Year": year,
+        "imdbID": imdb_id,
+        "Type": media_type,
+        "Poster": f"https://m.media-amazon.com/images/M/{imdb_id}.jpg",
+        "Plot": details.pop("Plot", f"The plot of {title}."),
+        "Director": details.pop("Director", "N/A"),
+        "Runtime": details.pop("Runtime", "N/A"),
+        "Genre": details.pop("Genre", "N/A"),
+        "imdbRating": details.pop("imdbRating", "N/A"),
+        **details,
+    }
+
+
+CATALOGUE = [
+    _title("tt0372784", "Batman Begins", "2005", Director="Christopher Nolan", Runtime="140 min"),
+    _title("tt0468569", "The Dark Knight", "2008", Director="Christopher Nolan", Runtime="152 min"),
+    _title("tt1345836", "The Dark Knight Rises", "2012", Director="Christopher Nolan", Runtime="164 min"),
+    _title("tt0096895", "Batman", "1989", Director="Tim Burton", Runtime="126 min"),
+    _title("tt0103776", "Batman Returns", "1992", Director="Tim Burton", Runtime="126 min"),
+    _title("tt0112462", "Batman Forever", "1995", Director="Joel Schumacher"),
+    _title("tt0118688", "Batman & Robin", "1997", Director="Joel Schumacher"),
+    _title("tt0877057", "Batman: The Animated Series", "1992–1995", media_type="series"),
+    _title("tt2975590", "Batman v Superman: Dawn of Justice", "2016", Director="Zack Snyder"),
+    _title("tt1877830", "The Batman", "2022", Director="Matt Reeves", Runtime="176 min"),
+    _title("tt4116284", "The Lego Batman Movie", "2017", Director="Chris McKay"),
+    _title("tt0371746", "Iron Man", "2008", Director="Jon Favreau", Runtime="126 min"),
+    _title("tt1228705", "Iron Man 2", "2010", Director="Jon Favreau"),
+    _title("tt1300854", "Iron Man 3", "2013", Director="Shane Black"),
+    _title("tt0145487", "Spider-Man", "2002", Director="Sam Raimi"),
+]
+
+SEARCH_FIELDS = ("Title", "Year", "imdbID", "Type", "Poster")
+
+app = FastAPI(title="OMDb stand-in", docs_url=None, redoc_url=None)
+app.state.requests = 0
+app.state.delay = 0.0
+
+
+def _false(error, status_code=200):
+    return JSONResponse({"Response": "False", "Error": error}, status_code=status_code)
+
+
+@app.get("/")
+async def omdb(
+    apikey: Optional[str] = None,
+    s: Optional[str] = None,
+    i: Optional[str] = None,
+    page: int = 1,
+    type: Optional[str] = None,
+    y: Optional[str] = None,
+    plot: str = "short",
+):
+    app.state.requests += 1
+    if app.state.delay:
+        await asyncio.sleep(app.state.delay)
+    if apikey != STUB_API_KEY:
+        return _false("Invalid API key!", status_code=401)
+
+    if i is not None:
+        for movie in CATALOGUE:
+            if movie["imdbID"] == i:
+                return {**movie, "Plot": movie["Plot"] * (2 if plot == "full" else 1), "Response": "True"}
+        return _false("Incorrect IMDb ID.")
+
+    if not s:
+        return _false("Incorrect IMDb ID.")
+    matches = [
+        {field: movie[field] for field in SEARCH_FIELDS}
+        for movie in CATALOGUE
+        if s.lower() in movie["Title"].lower()
+        and (type is None or movie["Type"] == type)
+        and (y is None or movie["Year"].startswith(str(y)))
+    ]
+    results = matches[(page - 1) * PAGE_SIZE:page * PAGE_SIZE]
+    if not results:
+        return _false("Movie not found!")
+    return {"Search": results, "totalResults": str(len(matches)), "Response": "True"}
@@ -0,0 +1,40 @@
+"""
+Poster resizing, run in the poster process pool.
+
+Kept free of application imports: spawned pool processes import only this
+module and Pillow.
+"""
+import os
+
+from PIL import Image, ImageOps
+
+# Widths of the variants; heights follow the poster's aspect ratio
+VARIANT_WIDTHS = {"thumbnail": 92, "grid": 300, "detail": 600}
+JPEG_QUALITY = 82
+
+
+def _save_atomically(image, path):
+    temporary = f"{path}.{os.getpid()}.tmp"
+    image.save(temporary, "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+    os.replace(temporary, path)
+
+
+def render_variants(original_path, variant_paths):
+    """
+    Decodes the original once and writes each size variant as a JPEG.
+
+    `variant_paths` maps a variant name to its path. A variant is never wider
+    than the original. Returns the (width, height) of the original.
+    """
+    with Image.open(original_path) as original:
+        # Phone pictures carry their rotation in EXIF
+        image = ImageOps.exif_transpose(original)
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        size = image.size
+        for name, path in variant_paths.items():
+            width = min(VARIANT_WIDTHS[name], image.width)
+            height = max(1, round(image.height * width / image.width))
+            variant = image if width == image.width else image.resize((width, height), Image.Resampling.LANCZOS)
+            _save_atomically(variant, path)
+    return size
@@ -0,0 +1,42 @@
+import os
+from typing import Literal
+
+from fastapi import APIRouter, Depends, Request, Response
+from fastapi.responses import FileResponse
+from sqlalchemy.orm import Session
+
+from backend import db
+from backend.etag import etag_matches, make_etag, not_modified
+
+from . import services
+
+router = APIRouter(tags=["Poster"], prefix="/api/posters")
+
+# A variant's bytes only change when the movie's poster URL does
+POSTER_MAX_AGE = int(os.getenv("POSTER_MAX_AGE", 7 * 24 * 3600))
+CACHE_CONTROL = f"public, max-age={POSTER_MAX_AGE}, stale-while-revalidate=86400"
+# Internal location of POSTER_CACHE_DIR in a fronting nginx, which then sends
+# the file itself with sendfile (X-Accel-Redirect); unset, the app streams it
+POSTER_ACCEL_REDIRECT = os.getenv("POSTER_ACCEL_REDIRECT")
+
+
+@router.get("/{movie_id}", response_class=FileResponse)
+async def get_poster(
+    movie_id: int,
+    request: Request,
+    size: Literal["thumbnail", "grid", "detail"] = "grid",
+    database: Session = Depends(db.get_db),
+):
+    url = services.get_poster_url(database, movie_id)
+    digest, path = await services.poster_store.variant(url, size)
+    etag = make_etag(digest[:32], size)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag, CACHE_CONTROL)
+
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if POSTER_ACCEL_REDIRECT:
+        location = path.relative_to(services.poster_store.directory).as_posix()
+        headers["X-Accel-Redirect"] = f"{POSTER_ACCEL_REDIRECT.rstrip('/')}/{location}"
+        return Response(media_type="image/jpeg", headers=headers)
+    # Range requests are answered with 206 partial content
+    return FileResponse(path, media_type="image/jpeg", headers=headers)
@@ -0,0 +1,276 @@
+"""
+Poster images of saved movies, fetched once and served resized.
+
+The first request for a poster downloads it and stores it under
+POSTER_CACHE_DIR, named by the SHA-256 of its bytes, so titles sharing an
+image share one copy. A small index maps each remote URL to that digest.
+The thumbnail, grid and detail variants are rendered together in a process
+pool (POSTER_WORKERS processes), off the event loop, and stored next to the
+original. Later requests are served from disk without contacting the remote
+host. Concurrent requests for the same poster share one download and one
+render.
+
+Posters are only fetched from POSTER_ALLOWED_HOSTS (and their subdomains)
+over http(s), and never from a host resolving to a private, loopback,
+link-local or otherwise non-public address, so a saved poster URL cannot
+make the server reach internal services. The request connects to the
+address that was checked (TLS still verifies the host name), so a host
+cannot resolve to a public address for the check and a private one for the
+connection. Redirects are followed by hand, checking every hop, and only
+`image/*` responses are accepted.
+
+A poster that cannot be downloaded or decoded is not retried for
+POSTER_RETRY_AFTER seconds.
+"""
+import asyncio
+import hashlib
+import ipaddress
+import logging
+import multiprocessing
+import os
+import socket
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import httpx
+from fastapi import HTTPException, status
+
+from backend.cache import LocalCache, SingleFlight
+from backend.movies.models import Movie
+from .images import VARIANT_WIDTHS, render_variants
+
+logger = logging.getLogger(__name__)
+
+POSTER_CACHE_DIR = os.getenv("POSTER_CACHE_DIR", os.path.join(tempfile.gettempdir(), "poster-cache"))
+POSTER_WORKERS = int(os.getenv("POSTER_WORKERS", 2))
+POSTER_FETCH_TIMEOUT = float(os.getenv("POSTER_FETCH_TIMEOUT", 10))
+POSTER_MAX_BYTES = int(os.getenv("POSTER_MAX_BYTES", 10 * 1024 * 1024))
+POSTER_RETRY_AFTER = float(os.getenv("POSTER_RETRY_AFTER", 300))
+# Hosts posters may be fetched from; empty allows any host with a public address
+POSTER_ALLOWED_HOSTS = tuple(
+    host.strip().lower()
+    for host in os.getenv("POSTER_ALLOWED_HOSTS", "m.media-amazon.com,ia.media-imdb.com").split(",")
+    if host.strip()
+)
+POSTER_MAX_REDIRECTS = 5
+
+VARIANTS = tuple(VARIANT_WIDTHS)
+
+
+def _sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _write_atomically(path, data):
+    temporary = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    temporary.write_bytes(data)
+    os.replace(temporary, path)
+
+
+class PosterStore:
+    """Content-addressed poster files, their variants and the URL index."""
+
+    def __init__(self, directory=POSTER_CACHE_DIR, executor=None, transport=None,
+                 allowed_hosts=POSTER_ALLOWED_HOSTS, resolve=None):
+        self.directory = Path(directory)
+        self.transport = transport
+        self.allowed_hosts = allowed_hosts
+        # Async callable returning the IP addresses of a host
+        self.resolve = resolve or _resolve
+        self._executor = executor
+        self._http = None
+        self.in_flight = SingleFlight()
+        # URLs that failed recently, with the reason
+        self.failures = LocalCache(max_entries=4096, ttl=POSTER_RETRY_AFTER)
+
+    def _index_path(self, url):
+        return self.directory / "urls" / _sha256(url.encode())
+
+    def original_path(self, digest):
+        return self.directory / "originals" / digest[:2] / digest
+
+    def variant_path(self, digest, variant):
+        return self.directory / "variants" / digest[:2] / f"{digest}-{variant}.jpg"
+
+    def _client(self):
+        if self._http is None:
+            self._http = httpx.AsyncClient(
+                timeout=POSTER_FETCH_TIMEOUT, follow_redirects=False, transport=self.transport,
+            )
+        return self._http
+
+    def _pool(self):
+        if self._executor is None:
+            # Spawned, so the pool never inherits the worker's threads and sockets
+            self._executor = ProcessPoolExecutor(
+                max_workers=POSTER_WORKERS, mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    async def close(self):
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def forget_resources(self):
+        # A forked worker must not share the parent's sockets or pool processes
+        self._http = None
+        self._executor = None
+
+    def _unavailable(self, url, reason):
+        self.failures.set(url, reason)
+        return HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=reason)
+
+    def _host_allowed(self, host):
+        return not self.allowed_hosts or any(
+            host == allowed or host.endswith(f".{allowed}") for allowed in self.allowed_hosts
+        )
+
+    async def _check_location(self, url, location):
+        """
+        The public address to connect to for `location`; refuses a location
+        outside the allowed hosts or resolving to a non-public address.
+        """
+        parts = urlsplit(location)
+        host = (parts.hostname or "").lower()
+        if parts.scheme not in ("http", "https") or not host or not self._host_allowed(host):
+            raise self._unavailable(url, "The poster host is not allowed.")
+        try:
+            addresses = await self.resolve(host, parts.port or (443 if parts.scheme == "https" else 80))
+        except OSError:
+            raise self._unavailable(url, "The poster could not be fetched.")
+        if not addresses or not all(ipaddress.ip_address(address).is_global for address in addresses):
+            logger.warning(f"Refused to fetch poster {url}: {host} resolves to a non-public address")
+            raise self._unavailable(url, "The poster host is not allowed.")
+        return addresses[0]
+
+    def _pinned_request(self, location, address):
+        """A GET of `location` sent to `address`, with the original Host header and TLS server name."""
+        location = httpx.URL(location)
+        extensions = {"sni_hostname": location.host} if location.scheme == "https" else {}
+        return self._client().build_request(
+            "GET", location.copy_with(host=address),
+            headers={"Host": location.netloc.decode("ascii")}, extensions=extensions,
+        )
+
+    async def _download(self, url):
+        """The poster's bytes, bounded by POSTER_MAX_BYTES."""
+        location = url
+        try:
+            for _ in range(POSTER_MAX_REDIRECTS + 1):
+                address = await self._check_location(url, location)
+                response = await self._client().send(self._pinned_request(location, address), stream=True)
+                try:
+                    if response.is_redirect:
+                        # Relative to the requested URL, not the pinned address
+                        location = str(httpx.URL(location).join(response.headers["location"]))
+                        continue
+                    if response.status_code != status.HTTP_200_OK:
+                        raise self._unavailable(url, f"The poster host answered {response.status_code}.")
+                    if not response.headers.get("content-type", "").startswith("image/"):
+                        raise self._unavailable(url, "The poster URL is not an image.")
+                    data = bytearray()
+                    async for chunk in response.aiter_bytes():
+                        data += chunk
+                        if len(data) > POSTER_MAX_BYTES:
+                            raise self._unavailable(url, "The poster is too large.")
+                    return bytes(data)
+                finally:
+                    await response.aclose()
+        except httpx.HTTPError as e:
+            logger.warning(f"Fetching poster {url} failed: {e}")
+            raise self._unavailable(url, "The poster could not be fetched.")
+        raise self._unavailable(url, "The poster host redirected too many times.")
+
+    def _stored_digest(self, url):
+        """The digest of an already stored poster with all its variants, else None."""
+        index = self._index_path(url)
+        if not index.exists():
+            return None
+        digest = index.read_text()
+        if all(self.variant_path(digest, variant).exists() for variant in VARIANTS):
+            return digest
+        return None
+
+    def _store_original(self, data):
+        """Stores the downloaded bytes; returns their digest and the variants left to render."""
+        digest = _sha256(data)
+        original = self.original_path(digest)
+        for path in (original, *(self.variant_path(digest, variant) for variant in VARIANTS)):
+            path.parent.mkdir(parents=True, exist_ok=True)
+        if not original.exists():
+            _write_atomically(original, data)
+        variants = {
+            variant: str(self.variant_path(digest, variant))
+            for variant in VARIANTS
+            # Already rendered for another URL with the same image
+            if not self.variant_path(digest, variant).exists()
+        }
+        return digest, variants
+
+    def _store_index(self, url, digest):
+        index = self._index_path(url)
+        index.parent.mkdir(parents=True, exist_ok=True)
+        _write_atomically(index, digest.encode())
+
+    async def _fetch(self, url):
+        """Downloads the poster, stores it by digest and renders its variants; returns the digest."""
+        # Disk work runs in a thread, like the rendering runs in the pool
+        digest = await asyncio.to_thread(self._stored_digest, url)
+        if digest is not None:
+            return digest
+
+        data = await self._download(url)
+        digest, variants = await asyncio.to_thread(self._store_original, data)
+        original = self.original_path(digest)
+        try:
+            if variants:
+                await asyncio.get_running_loop().run_in_executor(
+                    self._pool(), render_variants, str(original), variants
+                )
+        except Exception as e:
+            logger.warning(f"Poster {url} could not be decoded: {e}")
+            await asyncio.to_thread(original.unlink, missing_ok=True)
+            raise self._unavailable(url, "The poster could not be decoded.")
+
+        await asyncio.to_thread(self._store_index, url, digest)
+        return digest
+
+    async def variant(self, url, variant):
+        """(digest, path) of a poster variant, fetching and rendering it on first use."""
+        index = self._index_path(url)
+        if index.exists():
+            digest = index.read_text()
+            path = self.variant_path(digest, variant)
+            if path.exists():
+                return digest, path
+
+        reason = self.failures.get(url)
+        if reason is not None:
+            raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=reason)
+        digest = await self.in_flight.do(url, lambda: self._fetch(url))
+        return digest, self.variant_path(digest, variant)
+
+
+async def _resolve(host, port):
+    addresses = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    # Scoped IPv6 addresses carry a %zone suffix ipaddress does not parse
+    return [address[4][0].split("%", 1)[0] for address in addresses]
+
+
+def get_poster_url(database, movie_id):
+    """The remote poster URL of a saved movie; 404 when it has none."""
+    url = database.query(Movie.poster).filter(Movie.id == movie_id).scalar()
+    if not url or url == "N/A":
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Poster Not Found!")
+    return url
+
+
+poster_store = PosterStore()
+
+os.register_at_fork(after_in_child=poster_store.forget_resources)
@@ -1,14 +1,28 @@
 # rabbitmq_utils.py
+import asyncio
+import json
 import os
+import time
 import aio_pika
 from aio_pika.abc import AbstractRobustConnection, AbstractChannel
 
+from backend.breaker import CircuitBreaker
+from backend.deadline import timeout_for
+from backend.metrics import RABBITMQ_PUBLISH_DURATION, RABBITMQ_PUBLISH_FAILURES
+from backend.spool import SPOOL_FAST_ACK, Spool, SpoolDrainer
+from backend.tracing import SpanKind, inject_headers, start_span
+
 RABBITMQ_HOST = os.getenv("RABBITMQ_HOST", "localhost")
 RABBITMQ_PORT = int(os.getenv("RABBITMQ_PORT", 5672))
 RABBITMQ_USER = os.getenv("RABBITMQ_USER", "guest")
 RABBITMQ_PASS = os.getenv("RABBITMQ_PASS", "guest")
 RABBITMQ_QUEUE = os.getenv("RABBITMQ_QUEUE", "movies_queue")
 
+# Seconds a request may wait to reconnect and for a publish to be confirmed;
+# both are shortened to the request's deadline
+RABBITMQ_CONNECT_TIMEOUT = float(os.getenv("RABBITMQ_CONNECT_TIMEOUT", 5))
+RABBITMQ_PUBLISH_TIMEOUT = float(os.getenv("RABBITMQ_PUBLISH_TIMEOUT", 5))
+
 AMQP_URL = f"amqp://{RABBITMQ_USER}:{RABBITMQ_PASS}@{RABBITMQ_HOST}:{RABBITMQ_PORT}/"
 
 class RabbitMQManager:
@@ -16,38 +30,165 @@ class RabbitMQManager:
         self.connection: AbstractRobustConnection = None
         self.channel: AbstractChannel = None
         self.queue = None
+        # While RabbitMQ fails, publishes are skipped instead of reconnecting on
+        # every request, and spooled to disk until the drainer can publish them
+        self.breaker = CircuitBreaker("rabbitmq")
+        self.spool = Spool("rabbitmq")
+        self.drainer = SpoolDrainer(self.spool, self.breaker, self._publish_spooled)
 
     async def connect(self):
-        """Establishes a robust connection to RabbitMQ."""
+        """Establishes a robust connection to RabbitMQ; returns True on success."""
+        # Publishes what earlier processes spooled, and what this one spools while RabbitMQ is down
+        self.drainer.start()
         try:
             self.connection = await aio_pika.connect_robust(AMQP_URL)
             self.channel = await self.connection.channel()
             self.queue = await self.channel.declare_queue(RABBITMQ_QUEUE, durable=True)
             print("Connected to RabbitMQ")
+            return True
         except Exception as e:
             print(f"Failed to connect to RabbitMQ: {e}")
-            # You might want to implement retry logic here
+            # Retried in the background by backend/lifecycle.py
+            return False
 
     async def disconnect(self):
         """Closes the RabbitMQ connection."""
+        await self.drainer.stop()
+        await self.spool.close()
         if self.channel:
             await self.channel.close()
+            self.channel = None
             print("RabbitMQ channel closed.")
         if self.connection:
             await self.connection.close()
+            self.connection = None
             print("RabbitMQ connection closed.")
 
     async def publish_message(self, message: str, routing_key: str = RABBITMQ_QUEUE):
-        """Publishes a message to the specified queue."""
+        """
+        Publishes a message to the specified queue.
+
+        Returns True once RabbitMQ confirmed it, or once it is spooled in
+        fast-ack mode; False when it was spooled because RabbitMQ is failing.
+        """
+        if SPOOL_FAST_ACK:
+            return await self._spool(message, routing_key)
+        # Behind spooled messages, a message waits its turn so the order is kept
+        if self.spool.has_pending() or not self.breaker.allow():
+            await self._spool(message, routing_key)
+            return False
+        try:
+            await self._publish(message, routing_key)
+        except Exception as e:
+            self.breaker.record_failure()
+            print(f"Failed to publish message to queue '{routing_key}': {e}")
+            await self._spool(message, routing_key)
+            return False
+        self.breaker.record_success()
+        print(f"Published message: '{message}' to queue '{routing_key}'")
+        return True
+
+    async def publish_messages(self, messages, routing_key: str = RABBITMQ_QUEUE):
+        """
+        Publishes a batch of messages and waits once for all their confirmations.
+
+        The messages are written to the channel in order. Returns like
+        `publish_message`; only the messages that were not confirmed are spooled.
+        """
+        if not messages:
+            return True
+        if SPOOL_FAST_ACK:
+            return all(await asyncio.gather(*(self._spool(message, routing_key) for message in messages)))
+        if self.spool.has_pending() or not self.breaker.allow():
+            await asyncio.gather(*(self._spool(message, routing_key) for message in messages))
+            return False
+        try:
+            failed = await self._publish_batch(messages, routing_key)
+        except Exception as e:
+            print(f"Failed to publish messages to queue '{routing_key}': {e}")
+            failed = messages
+        if failed:
+            self.breaker.record_failure()
+            await asyncio.gather(*(self._spool(message, routing_key) for message in failed))
+            return False
+        self.breaker.record_success()
+        print(f"Published {len(messages)} messages to queue '{routing_key}'")
+        return True
+
+    async def _spool(self, message, routing_key):
+        payload = json.dumps({"routing_key": routing_key, "body": message}).encode()
+        try:
+            await self.spool.append(payload)
+        except OSError as e:
+            print(f"Failed to spool message for queue '{routing_key}', it is lost: {e}")
+            return False
+        return True
+
+    async def _publish_spooled(self, payload):
+        record = json.loads(payload)
+        await self._publish(record["body"], record["routing_key"])
+
+    async def _publish(self, message, routing_key):
+        """Publishes one message and waits for its confirmation; raises on failure."""
         if not self.channel:
             print("RabbitMQ channel not available, attempting to reconnect...")
-            await self.connect() # Reconnect if connection was lost (robust connection handles most cases)
+            # Reconnect if connection was lost (robust connection handles most cases)
+            if not await asyncio.wait_for(self.connect(), timeout_for(RABBITMQ_CONNECT_TIMEOUT)):
+                raise ConnectionError("RabbitMQ is not reachable")
 
-        await self.channel.default_exchange.publish(
-            aio_pika.Message(body=message.encode()),
-            routing_key=routing_key,
-        )
-        print(f"Published message: '{message}' to queue '{routing_key}'")
+        started = time.perf_counter()
+        with start_span(f"{routing_key} publish", SpanKind.PRODUCER,
+                        {"messaging.system": "rabbitmq", "messaging.destination.name": routing_key}):
+            try:
+                await self.channel.default_exchange.publish(
+                    # Trace context travels in the AMQP headers
+                    aio_pika.Message(body=message.encode(), headers=inject_headers() or None),
+                    routing_key=routing_key,
+                    timeout=timeout_for(RABBITMQ_PUBLISH_TIMEOUT),
+                )
+            except Exception:
+                RABBITMQ_PUBLISH_FAILURES.labels(routing_key).inc()
+                raise
+        RABBITMQ_PUBLISH_DURATION.labels(routing_key).observe(time.perf_counter() - started)
+
+    async def _publish_batch(self, messages, routing_key):
+        """Publishes the messages concurrently; returns those that were not confirmed."""
+        if not self.channel:
+            if not await asyncio.wait_for(self.connect(), timeout_for(RABBITMQ_CONNECT_TIMEOUT)):
+                raise ConnectionError("RabbitMQ is not reachable")
+
+        started = time.perf_counter()
+        with start_span(f"{routing_key} publish", SpanKind.PRODUCER,
+                        {"messaging.system": "rabbitmq", "messaging.destination.name": routing_key,
+                         "messaging.batch.message_count": len(messages)}):
+            headers = inject_headers() or None
+            timeout = timeout_for(RABBITMQ_PUBLISH_TIMEOUT)
+            # Tasks start in creation order, so the frames go out in message order
+            results = await asyncio.gather(*(
+                self.channel.default_exchange.publish(
+                    aio_pika.Message(body=message.encode(), headers=headers),
+                    routing_key=routing_key,
+                    timeout=timeout,
+                )
+                for message in messages
+            ), return_exceptions=True)
+        failed = [message for message, result in zip(messages, results) if isinstance(result, BaseException)]
+        if failed:
+            RABBITMQ_PUBLISH_FAILURES.labels(routing_key).inc(len(failed))
+        elapsed = time.perf_counter() - started
+        for _ in range(len(messages) - len(failed)):
+            RABBITMQ_PUBLISH_DURATION.labels(routing_key).observe(elapsed)
+        return failed
+
+rabbitmq_manager = RabbitMQManager()
+
+
+def _forget_connection_after_fork():
+    # The parent's connection belongs to its event loop; the worker's lifespan connects again
+    rabbitmq_manager.connection = None
+    rabbitmq_manager.channel = None
+    rabbitmq_manager.queue = None
+    rabbitmq_manager.drainer._task = None
 
 
-rabbitmq_manager = RabbitMQManager()
\ No newline at end of file
+os.register_at_fork(after_in_child=_forget_connection_after_fork)
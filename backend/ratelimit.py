@@ -0,0 +1,271 @@
+"""
+Token-bucket rate limiting per client and route.
+
+Requests are keyed by the user id of a valid bearer token, or else by the
+client address (uvicorn resolves X-Forwarded-For from trusted proxies).
+Each route budget in ROUTE_LIMITS has its own bucket per client; other
+routes share DEFAULT_LIMIT. A request over budget is answered with 429 and a
+Retry-After header before it reaches the route.
+
+Buckets live in this process by default, so with N workers a client gets
+up to N times its budget. Set RATE_LIMIT_REDIS_URL to share them through
+Redis (needs the `redis` package); the bucket update is one atomic script
+there. A shared backend that fails lets requests through.
+"""
+import logging
+import math
+import os
+import time
+from collections import OrderedDict
+
+from fastapi import status
+from fastapi.responses import JSONResponse
+from jose import JWTError, jwt
+from starlette.datastructures import Headers
+
+from backend.auth.jwt import ALGORITHM, SECRET_KEY
+from backend.cache import redis_client
+from backend.metrics import RATE_LIMITED_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL")
+# Requests per second and burst of routes without their own budget
+RATE_LIMIT_RATE = float(os.getenv("RATE_LIMIT_RATE", 20))
+RATE_LIMIT_BURST = float(os.getenv("RATE_LIMIT_BURST", 40))
+# Clients tracked by the in-process buckets; the least recently seen are dropped
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", 100_000))
+
+EXEMPT_PATHS = ("/healthz", "/readyz", "/metrics")
+
+
+class RouteLimit:
+    """A budget of `rate` requests per second, with bursts of up to `burst`."""
+
+    def __init__(self, name, rate, burst, method=None, path=None, prefix=False):
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.method = method
+        self.path = path.rstrip("/") if path else path
+        self.prefix = prefix
+
+    def matches(self, method, path):
+        if self.method is not None and method != self.method:
+            return False
+        if self.prefix:
+            return path.startswith(self.path)
+        return path.rstrip("/") == self.path
+
+
+def per_minute(count):
+    return count / 60
+
+
+ROUTE_LIMITS = [
+    # bcrypt makes every attempt cost tens of milliseconds of CPU
+    RouteLimit("login", per_minute(10), 5, "POST", "/api/auth/login"),
+    RouteLimit("register", per_minute(5), 3, "POST", "/api/auth/register"),
+    RouteLimit("movie_create", per_minute(60), 10, "POST", "/api/movies"),
+    RouteLimit("movie_import", per_minute(2), 2, "POST", "/api/movies/import"),
+    RouteLimit("omdb", 5, 20, "GET", "/api/omdb/", prefix=True),
+    # a grid loads dozens of posters at once; they are disk-cached and served with a long max-age
+    RouteLimit("posters", 50, 200, "GET", "/api/posters/", prefix=True),
+]
+DEFAULT_LIMIT = RouteLimit("default", RATE_LIMIT_RATE, RATE_LIMIT_BURST)
+
+
+class LocalBuckets:
+    """Token buckets in this process, for at most `max_keys` clients."""
+
+    def __init__(self, max_keys=RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+
+    async def take(self, key, rate, burst, cost=1):
+        """Takes `cost` tokens; returns 0 when allowed, else the seconds until they are available."""
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(key, (burst, now))
+        tokens = min(burst, tokens + (now - updated) * rate)
+        if tokens >= cost:
+            tokens -= cost
+            wait = 0.0
+        else:
+            wait = (cost - tokens) / rate
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return wait
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+# KEYS[1]: bucket; ARGV: rate, burst, cost. Returns the wait in microseconds.
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or burst
+local updated = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+local wait = 0
+if tokens >= cost then
+    tokens = tokens - cost
+else
+    wait = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return math.ceil(wait * 1000000)
+"""
+
+
+class RedisBuckets:
+    """Token buckets shared by every worker through a Redis-compatible `eval`."""
+
+    def __init__(self, client, prefix="ratelimit:"):
+        self.client = client
+        self.prefix = prefix
+
+    async def take(self, key, rate, burst, cost=1):
+        try:
+            wait = await self.client.eval(TOKEN_BUCKET_SCRIPT, 1, self.prefix + key, rate, burst, cost)
+        except Exception as e:
+            logger.warning(f"Rate limit backend failed, letting the request through: {e}")
+            return 0.0
+        return int(wait) / 1_000_000
+
+
+class InMemoryRedis:
+    """
+    Stand-in for a Redis client that runs `eval` scripts against hashes kept
+    in this process. Scripts run in Lua through the optional `lupa` package;
+    `redis.call` supports the TIME, HMGET, HSET and EXPIRE commands of
+    TOKEN_BUCKET_SCRIPT.
+    """
+
+    def __init__(self, clock=time.time):
+        import lupa
+
+        self.clock = clock
+        self._hashes = {}
+        self._expires = {}
+        self._lua = lupa.LuaRuntime()
+        self._lua.execute("redis = {}")
+        self._lua.globals().redis.call = self._call
+
+    @staticmethod
+    def _encode(value):
+        # Redis receives every argument as a string
+        return format(value, ".17g") if isinstance(value, float) else str(value)
+
+    def _hash(self, key):
+        expires_at = self._expires.get(key)
+        if expires_at is not None and expires_at <= self.clock():
+            self._hashes.pop(key, None)
+            self._expires.pop(key, None)
+        return self._hashes.get(key)
+
+    def _call(self, command, *args):
+        command = command.upper()
+        if command == "TIME":
+            seconds, fraction = divmod(self.clock(), 1)
+            return self._lua.table(str(int(seconds)), str(int(fraction * 1_000_000)))
+        key, args = args[0], [self._encode(arg) for arg in args[1:]]
+        fields = self._hash(key)
+        if command == "HMGET":
+            # Missing fields are nil replies, which Lua scripts see as false
+            return self._lua.table(*(fields.get(name, False) if fields else False for name in args))
+        if command == "HSET":
+            fields = self._hashes.setdefault(key, {})
+            for name, value in zip(args[::2], args[1::2]):
+                fields[name] = value
+            return len(args) // 2
+        if command == "EXPIRE":
+            if fields is None:
+                return 0
+            self._expires[key] = self.clock() + int(args[0])
+            return 1
+        raise ValueError(f"Unsupported command: {command}")
+
+    async def eval(self, script, numkeys, *keys_and_args):
+        keys_and_args = [self._encode(value) for value in keys_and_args]
+        function = self._lua.eval(f"function(KEYS, ARGV) {script} end")
+        result = function(self._lua.table(*keys_and_args[:numkeys]), self._lua.table(*keys_and_args[numkeys:]))
+        # Lua numbers come back as integer replies
+        return int(result) if isinstance(result, float) else result
+
+    async def ttl(self, key):
+        if self._hash(key) is None:
+            return -2
+        expires_at = self._expires.get(key)
+        return -1 if expires_at is None else math.ceil(expires_at - self.clock())
+
+
+def rate_limit_backend(url=RATE_LIMIT_REDIS_URL):
+    client = redis_client(url)
+    return LocalBuckets() if client is None else RedisBuckets(client)
+
+
+def client_key(scope, headers):
+    """`user:<id>` for a valid bearer token, else `ip:<address>`."""
+    authorization = headers.get("authorization", "")
+    if authorization[:7].lower() == "bearer ":
+        try:
+            claims = jwt.decode(authorization[7:], SECRET_KEY, algorithms=[ALGORITHM])
+        except JWTError:
+            claims = {}
+        user = claims.get("id") or claims.get("sub")
+        if user is not None:
+            return f"user:{user}"
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+
+def route_limit(method, path, limits=ROUTE_LIMITS, default=DEFAULT_LIMIT):
+    for limit in limits:
+        if limit.matches(method, path):
+            return limit
+    return default
+
+
+class RateLimitMiddleware:
+    """ASGI middleware answering 429 to clients over their route budget."""
+
+    def __init__(self, app, backend=None, limits=None, default=None, enabled=RATE_LIMIT_ENABLED):
+        self.app = app
+        self.backend = rate_limit_backend() if backend is None else backend
+        self.limits = ROUTE_LIMITS if limits is None else limits
+        self.default = DEFAULT_LIMIT if default is None else default
+        self.enabled = enabled
+
+    async def __call__(self, scope, receive, send):
+        if (
+            not self.enabled
+            or scope["type"] != "http"
+            or scope["method"] == "OPTIONS"
+            or scope["path"] in EXEMPT_PATHS
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        limit = route_limit(scope["method"], scope["path"], self.limits, self.default)
+        key = f"{limit.name}:{client_key(scope, Headers(scope=scope))}"
+        wait = await self.backend.take(key, limit.rate, limit.burst)
+        if wait <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        RATE_LIMITED_REQUESTS.labels(limit.name).inc()
+        response = JSONResponse(
+            {"detail": "Too many requests, please retry later."},
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            headers={"Retry-After": str(max(1, math.ceil(wait)))},
+        )
+        await response(scope, receive, send)
@@ -37,7 +37,8 @@ def setup_test_environment():
         "pytest-asyncio", 
         "pytest-cov",
         "pytest-xdist",
-        "httpx"  # For async client testing
+        "httpx",  # For async client testing
+        "lupa"  # Runs the rate limit's Redis script in InMemoryRedis
     ]
     
     for package in test_requirements:
@@ -0,0 +1,192 @@
+"""
+Production launcher: `python -m backend.server`.
+
+Runs `main:app` under uvicorn with uvloop and httptools and one worker per
+usable CPU core (WEB_CONCURRENCY overrides it). The workers share the
+listening socket, so a busy worker never refuses a connection another one
+could take.
+
+Signals to the parent process:
+
+- SIGHUP reloads the code with a rolling restart: each worker's replacement
+  is started and must finish its lifespan startup before the old worker is
+  asked to stop, and a stopping worker finishes its in-flight requests
+  (up to SERVER_GRACEFUL_TIMEOUT seconds). A replacement that fails to start
+  is discarded and the old worker kept.
+- SIGTTIN / SIGTTOU add or remove a worker.
+- SIGTERM / SIGINT stop every worker gracefully.
+
+Workers are started with the `spawn` method and connect to Kafka, RabbitMQ
+and Elasticsearch in their own lifespan; the modules holding those clients
+also drop any inherited connection after a fork (gunicorn `--preload` and
+the like).
+"""
+import importlib.util
+import logging
+import math
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import uvicorn
+from uvicorn.supervisors.multiprocess import Multiprocess, Process
+
+logger = logging.getLogger("uvicorn.error")
+
+SERVER_HOST = os.getenv("SERVER_HOST", "0.0.0.0")
+SERVER_PORT = int(os.getenv("SERVER_PORT", 8000))
+# Seconds a stopping worker gets to finish its in-flight requests
+SERVER_GRACEFUL_TIMEOUT = int(os.getenv("SERVER_GRACEFUL_TIMEOUT", 30))
+# Seconds a replacement worker gets to complete its startup during a reload
+SERVER_RELOAD_TIMEOUT = float(os.getenv("SERVER_RELOAD_TIMEOUT", 60))
+SERVER_BACKLOG = int(os.getenv("SERVER_BACKLOG", 2048))
+# Where workers report that they are serving; set by the launcher
+SERVER_STATE_DIR_ENV = "SERVER_STATE_DIR"
+
+CGROUP_CPU_MAX = "/sys/fs/cgroup/cpu.max"
+
+
+def cpu_count(cgroup_cpu_max=CGROUP_CPU_MAX):
+    """CPUs this process may use, honouring its affinity and a cgroup v2 CPU quota."""
+    if hasattr(os, "sched_getaffinity"):
+        count = len(os.sched_getaffinity(0))
+    else:
+        count = os.cpu_count() or 1
+    try:
+        quota, period = Path(cgroup_cpu_max).read_text().split()
+        if quota != "max":
+            count = min(count, max(1, math.ceil(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return count
+
+
+def default_workers():
+    """WEB_CONCURRENCY, or one worker per usable core."""
+    # An event loop keeps its core busy on its own; more workers only add switching
+    return int(os.getenv("WEB_CONCURRENCY") or cpu_count())
+
+
+def _implementation(preferred, module):
+    if importlib.util.find_spec(module) is not None:
+        return preferred
+    logger.warning(f"{module} is not installed, falling back to uvicorn's default")
+    return "auto"
+
+
+def ready_path(pid, state_dir=None):
+    return Path(state_dir or os.environ[SERVER_STATE_DIR_ENV], f"ready-{pid}")
+
+
+async def notify_ready():
+    """Marks this worker as serving; uvicorn calls it once the startup completes."""
+    state_dir = os.getenv(SERVER_STATE_DIR_ENV)
+    if state_dir:
+        ready_path(os.getpid(), state_dir).touch()
+
+
+def worker_exited(pid):
+    """Forgets a worker that is gone: its ready marker and its live metrics."""
+    # Imported here: PROMETHEUS_MULTIPROC_DIR must be set before backend.metrics loads
+    from backend.metrics import mark_process_dead
+
+    ready_path(pid).unlink(missing_ok=True)
+    mark_process_dead(pid)
+
+
+def wait_until_ready(process, timeout):
+    """True once `process` reports it is serving; False if it exits or times out."""
+    deadline = time.monotonic() + timeout
+    path = ready_path(process.pid)
+    while time.monotonic() < deadline:
+        if path.exists():
+            return True
+        if not process.process.is_alive():
+            return False
+        time.sleep(0.1)
+    return False
+
+
+class Supervisor(Multiprocess):
+    """uvicorn's process manager with rolling reloads and worker clean-up."""
+
+    def __init__(self, config, target, sockets, reload_timeout=SERVER_RELOAD_TIMEOUT):
+        super().__init__(config, target, sockets)
+        self.reload_timeout = reload_timeout
+
+    def _forget_exited(self, pids):
+        for pid in pids - {process.pid for process in self.processes}:
+            worker_exited(pid)
+
+    def restart_all(self):
+        for idx, process in enumerate(self.processes):
+            replacement = Process(self.config, self.target, self.sockets)
+            replacement.start()
+            if not wait_until_ready(replacement, self.reload_timeout):
+                logger.error(
+                    f"Replacement worker [{replacement.pid}] did not start, "
+                    f"keeping worker [{process.pid}]"
+                )
+                replacement.terminate()
+                replacement.join()
+                worker_exited(replacement.pid)
+                continue
+            # The replacement already accepts on the shared socket
+            self.processes[idx] = replacement
+            process.terminate()
+            process.join()
+            worker_exited(process.pid)
+
+    def keep_subprocess_alive(self):
+        pids = {process.pid for process in self.processes}
+        super().keep_subprocess_alive()
+        self._forget_exited(pids)
+
+    def handle_ttou(self):
+        pids = {process.pid for process in self.processes}
+        super().handle_ttou()
+        self._forget_exited(pids)
+
+
+def prepare_state_dirs(workers):
+    """Creates the ready-marker directory and, for several workers, the metrics one."""
+    os.environ[SERVER_STATE_DIR_ENV] = tempfile.mkdtemp(prefix="server-state-")
+    metrics_dir = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if workers > 1 and not metrics_dir:
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="prometheus-")
+    elif metrics_dir:
+        # Files left by a previous run would be aggregated with the new ones
+        os.makedirs(metrics_dir, exist_ok=True)
+        for path in Path(metrics_dir).glob("*.db"):
+            path.unlink()
+
+
+def build_config(workers=None, host=SERVER_HOST, port=SERVER_PORT):
+    workers = default_workers() if workers is None else workers
+    return uvicorn.Config(
+        "main:app",
+        host=host,
+        port=port,
+        workers=workers,
+        loop=_implementation("uvloop", "uvloop"),
+        http=_implementation("httptools", "httptools"),
+        backlog=SERVER_BACKLOG,
+        timeout_graceful_shutdown=SERVER_GRACEFUL_TIMEOUT,
+        callback_notify=notify_ready,
+        proxy_headers=True,
+    )
+
+
+def main():
+    config = build_config()
+    prepare_state_dirs(config.workers)
+    server = uvicorn.Server(config)
+    sock = config.bind_socket()
+    # Supervised even with one worker: a lone uvicorn Server does not handle
+    # SIGHUP, which would kill it instead of reloading it
+    Supervisor(config, target=server.run, sockets=[sock]).run()
+
+
+if __name__ == "__main__":
+    main()
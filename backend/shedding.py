@@ -0,0 +1,130 @@
+"""
+Adaptive load shedding on event-loop lag and database pool wait.
+
+`loop_monitor` samples how late a short sleep wakes up, which is how long
+every request on this worker waits before its next step runs. The database
+pool reports how long checkouts wait for a connection (`pool_wait`). Both
+signals are smoothed and decay when no new samples arrive.
+
+Once a signal exceeds its threshold, new requests are answered with 503 and
+Retry-After with a probability growing with the excess: half of them at 1.5x
+the threshold, all of them at 2x. Shedding part of the load lets the
+requests already admitted finish instead of timing out together. Health and
+metrics endpoints are never shed.
+"""
+import asyncio
+import math
+import os
+import random
+import time
+
+from fastapi import status
+from fastapi.responses import JSONResponse
+
+from backend.metrics import EVENT_LOOP_LAG, SHED_REQUESTS
+
+LOAD_SHED_ENABLED = os.getenv("LOAD_SHED_ENABLED", "true").lower() == "true"
+# Seconds of event-loop lag and of pool checkout wait above which requests are shed
+LOAD_SHED_LOOP_LAG = float(os.getenv("LOAD_SHED_LOOP_LAG", 0.1))
+LOAD_SHED_POOL_WAIT = float(os.getenv("LOAD_SHED_POOL_WAIT", 0.25))
+LOOP_LAG_INTERVAL = 0.05
+
+EXEMPT_PATHS = ("/healthz", "/readyz", "/metrics")
+
+
+class SmoothedSignal:
+    """Exponentially weighted samples whose value halves every `half_life` seconds without new ones."""
+
+    def __init__(self, weight=0.3, half_life=1.0):
+        self.weight = weight
+        self.half_life = half_life
+        self._value = 0.0
+        self._updated = time.monotonic()
+
+    def value(self, now=None):
+        now = time.monotonic() if now is None else now
+        return self._value * 0.5 ** (max(0.0, now - self._updated) / self.half_life)
+
+    def observe(self, sample):
+        now = time.monotonic()
+        self._value = self.weight * sample + (1 - self.weight) * self.value(now)
+        self._updated = now
+
+
+class LoopLagMonitor:
+    """Measures how late the event loop runs a `LOOP_LAG_INTERVAL` sleep."""
+
+    def __init__(self, interval=LOOP_LAG_INTERVAL):
+        self.interval = interval
+        self.lag = SmoothedSignal()
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - started - self.interval)
+            self.lag.observe(lag)
+            EVENT_LOOP_LAG.set(lag)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+loop_monitor = LoopLagMonitor()
+# Fed by backend/db.py on every pool checkout
+pool_wait = SmoothedSignal()
+
+
+def shed_probability(value, threshold):
+    if value <= threshold:
+        return 0.0
+    return min(1.0, (value - threshold) / threshold)
+
+
+class LoadShedMiddleware:
+    """ASGI middleware shedding requests while the worker is overloaded."""
+
+    def __init__(self, app, lag=None, wait=None, loop_lag_threshold=LOAD_SHED_LOOP_LAG,
+                 pool_wait_threshold=LOAD_SHED_POOL_WAIT, enabled=LOAD_SHED_ENABLED):
+        self.app = app
+        self.lag = loop_monitor.lag if lag is None else lag
+        self.wait = pool_wait if wait is None else wait
+        self.loop_lag_threshold = loop_lag_threshold
+        self.pool_wait_threshold = pool_wait_threshold
+        self.enabled = enabled
+
+    def _overload(self):
+        """(reason, signal value, probability) of the most overloaded signal."""
+        lag = self.lag.value()
+        wait = self.wait.value()
+        return max(
+            ("loop_lag", lag, shed_probability(lag, self.loop_lag_threshold)),
+            ("pool_wait", wait, shed_probability(wait, self.pool_wait_threshold)),
+            key=lambda overload: overload[2],
+        )
+
+    async def __call__(self, scope, receive, send):
+        if not self.enabled or scope["type"] != "http" or scope["path"] in EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        reason, value, probability = self._overload()
+        if probability == 0.0 or random.random() >= probability:
+            await self.app(scope, receive, send)
+            return
+
+        SHED_REQUESTS.labels(reason).inc()
+        response = JSONResponse(
+            {"detail": "The server is overloaded, please retry later."},
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            headers={"Retry-After": str(max(1, math.ceil(value)))},
+        )
+        await response(scope, receive, send)
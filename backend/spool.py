@@ -0,0 +1,340 @@
+"""
+Append-only local spool for broker events that could not be published yet.
+
+Records are appended to segment files as frames of
+
+    length (4 bytes, big endian) | CRC-32 of the payload (4 bytes) | payload
+
+and fsynced in batches: appends made within SPOOL_FSYNC_INTERVAL of each
+other share one fsync, and each `append` returns once its record is on disk.
+A torn or corrupted frame (a crash in the middle of a write) ends its
+segment when read back; the records before it are kept.
+
+A SpoolDrainer replays the segments in order through the broker's circuit
+breaker once the broker is back, checkpoints its position in a segment, and
+deletes segments once they are fully published. Delivery is at least once:
+a crash between a publish and its checkpoint replays that record.
+
+Every process claims its own numbered slot directory under the spool's
+directory with an exclusive lock, so the workers of one server never write
+to the same segment; a restarted worker claims the slot its predecessor
+released and drains what it left.
+"""
+import asyncio
+import fcntl
+import logging
+import os
+import struct
+import tempfile
+import time
+import weakref
+import zlib
+from itertools import count
+from pathlib import Path
+
+from backend.breaker import OPEN
+from backend.metrics import SPOOL_FSYNC_DURATION, SPOOL_RECORDS
+
+logger = logging.getLogger(__name__)
+
+SPOOL_DIR = os.getenv("SPOOL_DIR", os.path.join(tempfile.gettempdir(), "event-spool"))
+# Publish every event through the spool and return as soon as it is on disk
+SPOOL_FAST_ACK = os.getenv("SPOOL_FAST_ACK", "false").lower() == "true"
+# Seconds appends wait to share an fsync
+SPOOL_FSYNC_INTERVAL = float(os.getenv("SPOOL_FSYNC_INTERVAL", 0.002))
+SPOOL_SEGMENT_BYTES = int(os.getenv("SPOOL_SEGMENT_BYTES", 16 * 1024 * 1024))
+# Seconds between drain attempts while nothing new is appended
+SPOOL_DRAIN_INTERVAL = float(os.getenv("SPOOL_DRAIN_INTERVAL", 1))
+# Records published between two checkpoints of the drain position
+SPOOL_CHECKPOINT_EVERY = 100
+
+FRAME_HEADER = struct.Struct(">II")
+SEGMENT_SUFFIX = ".seg"
+CHECKPOINT_SUFFIX = ".ack"
+
+_spools = weakref.WeakSet()
+
+
+def frame(payload):
+    return FRAME_HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def read_segment(path, offset=0):
+    """
+    The records of a segment from `offset`, as (end offset, payload) pairs,
+    and whether the segment ended with a torn or corrupted frame.
+    """
+    with open(path, "rb") as segment:
+        segment.seek(offset)
+        data = segment.read()
+    records = []
+    position = 0
+    while position < len(data):
+        if len(data) - position < FRAME_HEADER.size:
+            return records, True
+        length, crc = FRAME_HEADER.unpack_from(data, position)
+        start = position + FRAME_HEADER.size
+        payload = data[start:start + length]
+        if len(payload) < length or zlib.crc32(payload) != crc:
+            return records, True
+        position = start + length
+        records.append((offset + position, payload))
+    return records, False
+
+
+class Spool:
+    """Segment files of one broker's spooled events, in `directory/<slot>/`."""
+
+    def __init__(self, name, directory=None, segment_bytes=None, fsync_interval=None):
+        self.name = name
+        self.directory = Path(SPOOL_DIR if directory is None else directory) / name
+        self.segment_bytes = SPOOL_SEGMENT_BYTES if segment_bytes is None else segment_bytes
+        self.fsync_interval = SPOOL_FSYNC_INTERVAL if fsync_interval is None else fsync_interval
+        self.path = None
+        # Called after each append; the drainer uses it to wake up
+        self.on_append = None
+        self._reset()
+        _spools.add(self)
+
+    def _reset(self):
+        self._pending = False
+        self._lock_fd = None
+        self._fd = None
+        self._active = None
+        self._segment_size = 0
+        self._next_segment = 1
+        # Descriptors written to since the last fsync and those being synced,
+        # mapped to whether their segment is sealed (closed once synced)
+        self._unsynced = {}
+        self._syncing = {}
+        self._waiters = []
+        self._flush_task = None
+
+    def _claim(self):
+        for slot in count():
+            path = self.directory / str(slot)
+            path.mkdir(parents=True, exist_ok=True)
+            fd = os.open(path / "lock", os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                continue
+            self._lock_fd = fd
+            self.path = path
+            existing = self.segments()
+            self._next_segment = int(existing[-1].stem) + 1 if existing else 1
+            self._pending = bool(existing)
+            return
+
+    def _ensure_claimed(self):
+        # Claimed on first use, so a server that forks workers after importing
+        # the app does not hand one slot to all of them
+        if self._lock_fd is None:
+            self._claim()
+
+    def segments(self):
+        """Segment files in write order."""
+        self._ensure_claimed()
+        return sorted(self.path.glob(f"*{SEGMENT_SUFFIX}"))
+
+    def sealed_segments(self):
+        """Segment files no longer written to, in write order."""
+        return [segment for segment in self.segments() if segment != self._active]
+
+    def has_pending(self):
+        """Whether records are waiting to be drained, without listing the directory."""
+        self._ensure_claimed()
+        return self._pending
+
+    def refresh_pending(self):
+        self._pending = self._segment_size > 0 or bool(self.segments())
+
+    def _open_segment(self):
+        self._active = self.path / f"{self._next_segment:020d}{SEGMENT_SUFFIX}"
+        self._next_segment += 1
+        self._fd = os.open(self._active, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        self._segment_size = 0
+
+    def seal(self):
+        """Ends the segment being written, so the next append starts a new one."""
+        if self._fd is None:
+            return
+        if self._fd in self._unsynced:
+            self._unsynced[self._fd] = True
+        elif self._fd in self._syncing:
+            self._syncing[self._fd] = True
+        else:
+            os.close(self._fd)
+        self._fd = None
+        self._active = None
+        self._segment_size = 0
+
+    async def append(self, payload):
+        """Appends `payload` (bytes); returns once it is on disk."""
+        self._ensure_claimed()
+        if self._fd is not None and self._segment_size >= self.segment_bytes:
+            self.seal()
+        if self._fd is None:
+            self._open_segment()
+        record = frame(payload)
+        os.write(self._fd, record)
+        self._segment_size += len(record)
+        self._pending = True
+        self._unsynced.setdefault(self._fd, False)
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush())
+        await waiter
+        SPOOL_RECORDS.labels(self.name, "appended").inc()
+        if self.on_append is not None:
+            self.on_append()
+
+    async def _flush(self):
+        # One flush at a time: appends made while it syncs wait for the next one
+        await asyncio.sleep(self.fsync_interval)
+        waiters, self._waiters = self._waiters, []
+        self._syncing, self._unsynced = self._unsynced, {}
+        error = None
+        started = time.perf_counter()
+        try:
+            await asyncio.to_thread(self._fsync, list(self._syncing))
+            SPOOL_FSYNC_DURATION.labels(self.name).observe(time.perf_counter() - started)
+        except OSError as e:
+            error = e
+        finally:
+            for fd, sealed in self._syncing.items():
+                if sealed:
+                    os.close(fd)
+            self._syncing = {}
+            self._flush_task = asyncio.create_task(self._flush()) if self._waiters else None
+        for waiter in waiters:
+            if waiter.done():
+                continue
+            if error is None:
+                waiter.set_result(None)
+            else:
+                waiter.set_exception(error)
+
+    @staticmethod
+    def _fsync(fds):
+        for fd in fds:
+            os.fsync(fd)
+
+    async def close(self):
+        while self._flush_task is not None:
+            await self._flush_task
+        self.seal()
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+        self._reset()
+
+    def checkpoint(self, segment):
+        """Offset of `segment` up to which records were published."""
+        try:
+            return int((segment.with_suffix(CHECKPOINT_SUFFIX)).read_text())
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def save_checkpoint(self, segment, offset):
+        checkpoint = segment.with_suffix(CHECKPOINT_SUFFIX)
+        temporary = checkpoint.with_suffix(".tmp")
+        temporary.write_text(str(offset))
+        os.replace(temporary, checkpoint)
+
+    def remove(self, segment):
+        segment.unlink(missing_ok=True)
+        segment.with_suffix(CHECKPOINT_SUFFIX).unlink(missing_ok=True)
+
+
+class SpoolDrainer:
+    """
+    Publishes a spool's records in order with `publish`, an async callable
+    taking one payload and raising on failure, whenever `breaker` allows.
+    """
+
+    def __init__(self, spool, breaker, publish, interval=None):
+        self.spool = spool
+        self.breaker = breaker
+        self.publish = publish
+        self.interval = SPOOL_DRAIN_INTERVAL if interval is None else interval
+        self._task = None
+        self._wake = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._wake = asyncio.Event()
+            self.spool.on_append = self._wake.set
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            if self.breaker.state != OPEN and self.spool.has_pending():
+                try:
+                    await self.drain()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error(f"Draining the {self.spool.name} spool failed: {e}")
+            self._wake.clear()
+            # Not wait_for: it can swallow stop()'s cancellation when the wake-up lands at the same time
+            try:
+                async with asyncio.timeout(self.interval):
+                    await self._wake.wait()
+            except TimeoutError:
+                pass
+
+    async def drain(self):
+        """Publishes every spooled record; returns False if it stopped at a failure."""
+        # Records of the segment being written become readable once it is sealed
+        self.spool.seal()
+        for segment in self.spool.sealed_segments():
+            if not await self._drain_segment(segment):
+                return False
+        self.spool.refresh_pending()
+        return True
+
+    async def _drain_segment(self, segment):
+        offset = self.spool.checkpoint(segment)
+        records, torn = await asyncio.to_thread(read_segment, segment, offset)
+        if torn:
+            SPOOL_RECORDS.labels(self.spool.name, "corrupt").inc()
+            logger.warning(f"{segment} ends with a torn or corrupted record, skipping the rest of it")
+        published = offset
+        try:
+            for index, (end, payload) in enumerate(records, 1):
+                if not self.breaker.allow():
+                    return False
+                try:
+                    await self.publish(payload)
+                except Exception as e:
+                    self.breaker.record_failure()
+                    logger.warning(f"Replaying the {self.spool.name} spool failed: {e}")
+                    return False
+                self.breaker.record_success()
+                SPOOL_RECORDS.labels(self.spool.name, "replayed").inc()
+                published = end
+                if index % SPOOL_CHECKPOINT_EVERY == 0:
+                    self.spool.save_checkpoint(segment, published)
+        finally:
+            if published != offset:
+                self.spool.save_checkpoint(segment, published)
+        self.spool.remove(segment)
+        return True
+
+
+def _forget_spools_after_fork():
+    # The parent's lock and segment descriptors stay the parent's; a worker claims its own slot
+    for spool in list(_spools):
+        spool._reset()
+
+
+os.register_at_fork(after_in_child=_forget_spools_after_fork)
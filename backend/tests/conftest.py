@@ -3,6 +3,7 @@
 import pytest
 import os
 import sys
+import tempfile
 from unittest.mock import Mock
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
@@ -12,6 +13,13 @@ from fastapi.testclient import TestClient
 backend_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.append(backend_dir)
 
+# Endpoint tests send bursts from one client; the limiter and the load
+# shedder are exercised by their own tests with explicit settings
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+os.environ.setdefault("LOAD_SHED_ENABLED", "false")
+# Broker events that fail to publish are spooled here instead of the system temp dir
+os.environ.setdefault("SPOOL_DIR", tempfile.mkdtemp(prefix="test-spool-"))
+
 # Test Database Configuration
 TEST_DATABASE_URL = "sqlite:///./test.db"
 
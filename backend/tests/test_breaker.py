@@ -0,0 +1,269 @@
+import pytest
+import os
+import sys
+import tempfile
+import time
+from unittest.mock import AsyncMock, Mock, patch
+
+# Get the directory one level above the 'tests' directory
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Add this directory to Python's sys.path
+sys.path.append(backend_dir)
+
+from backend import deadline, elastic
+from backend.breaker import CLOSED, HALF_OPEN, OPEN, Backlog, CircuitBreaker
+from backend.kafkaConnection import KafkaConnection
+from backend.rabbitMQ import RabbitMQManager
+from backend.spool import Spool
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    clock = Clock()
+    # The event loop reads time.monotonic too, so only the breaker's view of it is replaced
+    with patch("backend.breaker.time", Mock(monotonic=clock)):
+        yield clock
+
+
+def kafka_connection(failure_threshold=2):
+    with patch("backend.breaker.BREAKER_FAILURE_THRESHOLD", failure_threshold), \
+            patch("backend.breaker.BREAKER_RESET_TIMEOUT", 5):
+        connection = KafkaConnection()
+    connection.spool = Spool("kafka", directory=tempfile.mkdtemp(), fsync_interval=0)
+    connection.drainer.spool = connection.spool
+    return connection
+
+
+def failing_kafka():
+    connection = kafka_connection()
+    connection.producer = Mock(send_and_wait=AsyncMock(side_effect=ConnectionError("broker down")))
+    connection._producer_started = True
+    return connection
+
+
+# Circuit Breaker Tests
+class TestCircuitBreaker:
+    def test_opens_after_consecutive_failures(self, clock):
+        """Test the breaker opens at the threshold and a success resets the count"""
+        breaker = CircuitBreaker("test", failure_threshold=3, reset_timeout=5)
+        breaker.record_failure()
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        breaker.record_failure()
+        assert breaker.state == CLOSED
+
+        breaker.record_failure()
+        assert breaker.state == OPEN
+        assert not breaker.allow()
+
+    def test_half_open_lets_one_probe_through(self, clock):
+        """Test only one caller probes the dependency once the reset timeout passes"""
+        breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=5)
+        breaker.record_failure()
+        clock.now += 5
+
+        assert breaker.state == HALF_OPEN
+        assert breaker.allow()
+        assert not breaker.allow()
+
+        breaker.record_success()
+        assert breaker.state == CLOSED
+        assert breaker.allow()
+
+    def test_failed_probe_opens_again(self, clock):
+        """Test a failing probe keeps the dependency skipped for another period"""
+        breaker = CircuitBreaker("test", failure_threshold=3, reset_timeout=5)
+        for _ in range(3):
+            breaker.record_failure()
+        clock.now += 5
+        assert breaker.allow()
+        breaker.record_failure()
+
+        assert breaker.state == OPEN
+        clock.now += 4
+        assert not breaker.allow()
+
+    def test_lost_probe_does_not_block_recovery(self, clock):
+        """Test a probe whose caller never reports back is replaced after the reset timeout"""
+        breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=5)
+        breaker.record_failure()
+        clock.now += 5
+        assert breaker.allow()
+        clock.now += 5
+        assert breaker.allow()
+
+
+# Backlog Tests
+class TestBacklog:
+    @pytest.mark.asyncio
+    async def test_replays_in_order_and_stops_at_a_failure(self):
+        """Test a failing replay keeps the item and everything after it"""
+        replayed = []
+
+        async def replay(item):
+            if item == 3:
+                raise ConnectionError("down again")
+            replayed.append(item)
+
+        backlog = Backlog("test", CircuitBreaker("test"), replay)
+        for item in range(1, 5):
+            backlog.add(item)
+        await backlog.replay_all()
+
+        assert replayed == [1, 2]
+        assert len(backlog) == 2
+
+    @pytest.mark.asyncio
+    async def test_replay_does_not_inherit_the_request_deadline(self):
+        """Test a replay scheduled by a request runs without that request's budget"""
+        budgets = []
+
+        async def replay(item):
+            budgets.append(deadline.remaining())
+
+        backlog = Backlog("test", CircuitBreaker("test"), replay)
+        backlog.add(1)
+        token = deadline._deadline.set(time.monotonic() + 0.01)
+        try:
+            backlog.schedule()
+        finally:
+            deadline._deadline.reset(token)
+        await backlog._task
+        assert budgets == [None]
+
+    def test_full_backlog_drops_the_oldest(self):
+        """Test memory stays bounded during a long outage"""
+        backlog = Backlog("test", CircuitBreaker("test"), AsyncMock(), max_items=2)
+        for item in range(3):
+            backlog.add(item)
+        assert list(backlog._items) == [1, 2]
+
+
+# Client Integration Tests
+class TestKafkaBreaker:
+    @pytest.mark.asyncio
+    async def test_open_breaker_skips_the_broker(self, clock):
+        """Test sends stop reaching a failing broker and are spooled instead"""
+        connection = failing_kafka()
+        for _ in range(5):
+            assert await connection.send_message("movie-events", {"n": 1}) is False
+
+        assert connection.producer.send_and_wait.call_count == 1
+        assert connection.spool.has_pending()
+
+    @pytest.mark.asyncio
+    async def test_recovery_drains_in_order(self, clock):
+        """Test the drainer's probe publishes the spooled messages, then new ones follow them"""
+        connection = failing_kafka()
+        for n in range(3):
+            await connection.send_message("movie-events", {"n": n})
+
+        connection.producer.send_and_wait = AsyncMock()
+        assert await connection.send_message("movie-events", {"n": 3}) is False  # still behind the spool
+        clock.now += 5
+        assert await connection.drainer.drain() is True
+        assert await connection.send_message("movie-events", {"n": 4}) is True
+
+        sent = [call.kwargs["value"]["n"] for call in connection.producer.send_and_wait.call_args_list]
+        assert sent == [0, 1, 2, 3, 4]
+        assert not connection.spool.has_pending()
+
+    @pytest.mark.asyncio
+    async def test_connecting_is_skipped_while_open(self, clock):
+        """Test an unreachable broker is not reconnected to on every request"""
+        connection = kafka_connection(failure_threshold=1)
+        with patch.object(connection, "create_producer", AsyncMock(return_value=None)) as create_producer:
+            await connection.send_message("movie-events", {"n": 1})
+            await connection.send_message("movie-events", {"n": 2})
+        create_producer.assert_called_once()
+
+
+class TestRabbitMQBreaker:
+    @pytest.mark.asyncio
+    async def test_failed_publish_is_kept_without_raising(self, clock):
+        """Test a request publishing to a failing RabbitMQ still succeeds"""
+        manager = RabbitMQManager()
+        manager.spool = manager.drainer.spool = Spool("rabbitmq", directory=tempfile.mkdtemp(), fsync_interval=0)
+        manager.channel = Mock()
+        manager.channel.default_exchange.publish = AsyncMock(side_effect=ConnectionError("closed"))
+
+        assert await manager.publish_message('{"event": "movie_created"}') is False
+
+        manager.channel.default_exchange.publish = AsyncMock()
+        assert await manager.drainer.drain() is True
+        published = manager.channel.default_exchange.publish.call_args
+        assert published.args[0].body == b'{"event": "movie_created"}'
+        assert published.kwargs["routing_key"] == "movies_queue"
+
+    @pytest.mark.asyncio
+    async def test_batch_spools_only_unconfirmed_messages(self, clock):
+        """Test a batch publishes every message in order and keeps the ones not confirmed"""
+        manager = RabbitMQManager()
+        manager.spool = manager.drainer.spool = Spool("rabbitmq", directory=tempfile.mkdtemp(), fsync_interval=0)
+        manager.channel = Mock()
+        manager.channel.default_exchange.publish = AsyncMock(side_effect=[None, ConnectionError("closed"), None])
+
+        assert await manager.publish_messages(["a", "b", "c"]) is False
+
+        published = manager.channel.default_exchange.publish.call_args_list
+        assert [call.args[0].body for call in published] == [b"a", b"b", b"c"]
+        manager.channel.default_exchange.publish = AsyncMock()
+        assert await manager.drainer.drain() is True
+        assert manager.channel.default_exchange.publish.call_args.args[0].body == b"b"
+
+
+class TestElasticsearchBreaker:
+    @pytest.mark.asyncio
+    async def test_documents_are_indexed_after_recovery(self, clock):
+        """Test documents skipped during an outage are indexed once Elasticsearch answers"""
+        breaker = CircuitBreaker("elasticsearch", failure_threshold=1, reset_timeout=5)
+        backlog = Backlog("elasticsearch", breaker, lambda item: elastic._index(client, *item))
+        client = Mock()
+        client.options.return_value.index = AsyncMock(side_effect=ConnectionError("down"))
+
+        with patch.object(elastic, "es_breaker", breaker), patch.object(elastic, "es_backlog", backlog):
+            assert await elastic.index_document(client, "movies", 1, {"title": "Heat"}) is False
+            assert await elastic.index_document(client, "movies", 2, {"title": "Ran"}) is False
+            assert client.options.return_value.index.call_count == 1
+
+            client.options.return_value.index = AsyncMock()
+            clock.now += 5
+            assert await elastic.index_document(client, "movies", 3, {"title": "Alien"}) is True
+            await backlog._task
+
+        indexed = [call.kwargs["id"] for call in client.options.return_value.index.call_args_list]
+        assert indexed == [3, 1, 2]
+
+    @pytest.mark.asyncio
+    async def test_bulk_index_keeps_refused_documents(self, clock):
+        """Test documents Elasticsearch refuses in a bulk request are retried through the backlog"""
+        breaker = CircuitBreaker("elasticsearch", failure_threshold=1, reset_timeout=5)
+        backlog = Backlog("elasticsearch", breaker, AsyncMock())
+        client = Mock()
+        client.options.return_value.bulk = AsyncMock(return_value={"errors": True, "items": [
+            {"index": {"_id": "1", "status": 201}},
+            {"index": {"_id": "2", "status": 429, "error": {"type": "es_rejected_execution_exception"}}},
+        ]})
+        documents = {1: {"title": "Heat"}, 2: {"title": "Ran"}}
+
+        with patch.object(elastic, "es_breaker", breaker), patch.object(elastic, "es_backlog", backlog):
+            assert await elastic.index_documents(client, "movies", documents) is False
+            assert breaker.state == CLOSED
+            assert list(backlog._items) == [("movies", 2, {"title": "Ran"})]
+
+            client.options.return_value.bulk = AsyncMock(side_effect=ConnectionError("down"))
+            assert await elastic.index_documents(client, "movies", {3: {"title": "Alien"}}) is False
+            assert breaker.state == OPEN
+            assert len(backlog) == 2
+
+        operations = client.options.return_value.bulk.call_args.kwargs["operations"]
+        assert operations == [{"index": {"_index": "movies", "_id": 3}}, {"title": "Alien"}]
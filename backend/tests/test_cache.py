@@ -0,0 +1,199 @@
+import pytest
+from unittest.mock import Mock, AsyncMock, patch
+from datetime import datetime
+from fastapi import HTTPException
+from prometheus_client import REGISTRY
+from sqlalchemy.orm import Session
+import os
+import sys
+
+# Get the directory one level above the 'tests' directory
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Add this directory to Python's sys.path
+sys.path.append(backend_dir)
+
+from backend.cache import InMemorySharedCache, LocalCache, ReadThroughCache
+from backend.movies import models, services
+from backend.auth.models import User
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+@pytest.fixture
+def mock_user():
+    user = User(username="testuser", email="test@example.com", role="user", password="hashed")
+    user.id = 1
+    return user
+
+
+@pytest.fixture
+def movie(mock_user):
+    return models.Movie(
+        id=7, title="Heat", imdbID="tt0113277", year="1995", type="movie",
+        poster="https://example.com/heat.jpg", owner_id=1, owner=mock_user,
+        createdDate=datetime(2024, 1, 1),
+    )
+
+
+@pytest.fixture
+def caches():
+    """Fresh movie and playlist caches sharing an in-memory shared tier."""
+    shared = InMemorySharedCache()
+    movie_cache = ReadThroughCache("movie", shared=shared)
+    playlist_cache = ReadThroughCache("playlist", shared=shared)
+    with patch.object(services, "movie_cache", movie_cache), \
+         patch.object(services, "playlist_cache", playlist_cache):
+        yield movie_cache, playlist_cache
+
+
+# Local Tier Tests
+class TestLocalCache:
+    def test_entries_expire(self):
+        """Test entries are dropped once their TTL has passed"""
+        cache = LocalCache(ttl=10)
+        with patch("backend.cache.time.monotonic", return_value=100.0):
+            cache.set("a", 1)
+        with patch("backend.cache.time.monotonic", return_value=105.0):
+            assert cache.get("a") == 1
+        with patch("backend.cache.time.monotonic", return_value=111.0):
+            assert cache.get("a") is None
+        assert len(cache) == 0
+
+    def test_least_recently_used_is_evicted(self):
+        """Test the cache stays bounded, evicting the least recently used key"""
+        cache = LocalCache(max_entries=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        assert cache.get("b") is None
+        assert cache.get("a") == 1 and cache.get("c") == 3
+
+
+# Read-Through Tests
+class TestReadThroughCache:
+    @pytest.mark.asyncio
+    async def test_tiers_are_tried_in_order(self):
+        """Test a miss loads once, then the local and shared tiers answer"""
+        cache = ReadThroughCache("test_tiers", shared=InMemorySharedCache())
+        loader = AsyncMock(return_value={"id": 1})
+
+        assert await cache.get_or_load("1", loader) == {"id": 1}
+        assert await cache.get_or_load("1", loader) == {"id": 1}
+        cache.local.clear()
+        assert await cache.get_or_load("1", loader) == {"id": 1}
+
+        loader.assert_awaited_once()
+        for result in ("miss", "local_hit", "shared_hit"):
+            assert sample("cache_requests_total", cache="test_tiers", result=result) == 1
+
+    @pytest.mark.asyncio
+    async def test_invalidate_clears_both_tiers(self):
+        """Test invalidation forces the next lookup back to the loader"""
+        cache = ReadThroughCache("test_invalidate", shared=InMemorySharedCache())
+        loader = AsyncMock(side_effect=[{"v": 1}, {"v": 2}])
+
+        await cache.get_or_load("1", loader)
+        await cache.invalidate("1")
+
+        assert await cache.get_or_load("1", loader) == {"v": 2}
+
+    @pytest.mark.asyncio
+    async def test_load_racing_an_invalidation_is_not_served(self):
+        """Test a value loaded before a concurrent invalidation is not served from either tier"""
+        shared = InMemorySharedCache()
+        reader = ReadThroughCache("test_race", shared=shared)
+        writer = ReadThroughCache("test_race", shared=shared)
+
+        async def load_then_writer_deletes():
+            await writer.invalidate("1")
+            await reader.invalidate("2")
+            return {"deleted": False}
+
+        assert await reader.get_or_load("1", load_then_writer_deletes) == {"deleted": False}
+        fresh = AsyncMock(return_value={"deleted": True})
+        assert await writer.get_or_load("1", fresh) == {"deleted": True}
+        assert await reader.get_or_load("1", fresh) == {"deleted": True}
+        fresh.assert_awaited_once()
+
+        # The reader's own invalidations keep the value out of its local tier too
+        assert await reader.get_or_load("2", load_then_writer_deletes) == {"deleted": False}
+        assert reader.local.get("test_race:2") is None
+
+    @pytest.mark.asyncio
+    async def test_entries_without_a_generation_are_read(self):
+        """Test entries written before generations were recorded still count as hits"""
+        shared = InMemorySharedCache()
+        await shared.set("test_legacy:1", '{"v": 1}')
+        loader = AsyncMock()
+
+        assert await ReadThroughCache("test_legacy", shared=shared).get_or_load("1", loader) == {"v": 1}
+        loader.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_failing_shared_tier_falls_back_to_loader(self):
+        """Test a shared tier outage does not fail lookups"""
+        shared = Mock(mget=AsyncMock(side_effect=ConnectionError("down")),
+                      set=AsyncMock(side_effect=ConnectionError("down")),
+                      delete=AsyncMock(side_effect=ConnectionError("down")))
+        cache = ReadThroughCache("test_outage", shared=shared)
+
+        assert await cache.get_or_load("1", AsyncMock(return_value={"v": 1})) == {"v": 1}
+        await cache.invalidate("1")
+
+    @pytest.mark.asyncio
+    async def test_loader_errors_are_not_cached(self):
+        """Test a 404 from the loader is raised again on the next lookup"""
+        cache = ReadThroughCache("test_errors")
+        loader = AsyncMock(side_effect=HTTPException(status_code=404, detail="Movie Not Found!"))
+
+        for _ in range(2):
+            with pytest.raises(HTTPException):
+                await cache.get_or_load("1", loader)
+        assert loader.await_count == 2
+
+
+# Service Cache Tests
+class TestServiceCaching:
+    @pytest.mark.asyncio
+    async def test_movie_lookup_is_cached_until_delete(self, caches, mock_user, movie):
+        """Test repeated movie lookups skip the database until the movie is deleted"""
+        database = Mock(spec=Session)
+        database.query.return_value.filter_by.return_value.first.return_value = movie
+        database.query.return_value.filter.return_value.all.return_value = [(3,)]
+
+        first = await services.get_cached_movie(7, mock_user.id, database)
+        second = await services.get_cached_movie(7, mock_user.id, database)
+
+        assert first == second
+        assert first["title"] == "Heat" and first["poster"] == "https://example.com/heat.jpg"
+        assert database.query.call_count == 1
+
+        movie_cache, playlist_cache = caches
+        playlist_cache.local.set("playlist:1:3", {"stale": True})
+        await services.delete_movie_by_id(7, mock_user, database)
+        # The movie and the playlists that contained it are gone from the cache
+        assert movie_cache.local.get("movie:1:7") is None
+        assert playlist_cache.local.get("playlist:1:3") is None
+
+    @pytest.mark.asyncio
+    async def test_playlist_lookup_is_cached_until_changed(self, caches, mock_user, movie):
+        """Test playlist detail is served from the cache until a movie is removed"""
+        playlist = models.Playlist(id=3, name="Heist", owner_id=1, createdDate=datetime(2024, 1, 2))
+        database = Mock(spec=Session)
+        database.query.return_value.filter_by.return_value.first.return_value = playlist
+        database.query.return_value.join.return_value.filter.return_value.all.return_value = [movie]
+
+        detail = await services.get_cached_playlist(3, mock_user.id, database)
+        await services.get_cached_playlist(3, mock_user.id, database)
+
+        assert detail["playlist"]["name"] == "Heist"
+        assert [m["title"] for m in detail["movies"]] == ["Heat"]
+        assert database.query.call_count == 2
+
+        await services.remove_movie_from_playlist(3, 7, mock_user, database)
+        queries = database.query.call_count
+        await services.get_cached_playlist(3, mock_user.id, database)
+        assert database.query.call_count == queries + 2
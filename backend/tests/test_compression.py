@@ -0,0 +1,131 @@
+import pytest
+import gzip
+import zlib
+import brotli
+import zstandard
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+import os
+import sys
+
+# Get the directory one level above the 'tests' directory
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Add this directory to Python's sys.path
+sys.path.append(backend_dir)
+
+from backend.compression import CompressionMiddleware, available_encoders, negotiate
+
+LARGE_BODY = "".join(f'{{"id":{i},"poster":"https://m.media-amazon.com/images/M/{i}.jpg"}}\n' for i in range(200))
+
+compression_app = FastAPI()
+compression_app.add_middleware(CompressionMiddleware, minimum_size=1024)
+
+
+@compression_app.get("/large")
+def large():
+    return PlainTextResponse(LARGE_BODY, media_type="application/json", headers={"ETag": '"v1"'})
+
+
+@compression_app.get("/small")
+def small():
+    return PlainTextResponse("{}", media_type="application/json")
+
+
+@compression_app.get("/image")
+def image():
+    return Response(b"\x89PNG" * 1000, media_type="image/png")
+
+
+@compression_app.get("/stream")
+def stream():
+    return StreamingResponse((line + "\n" for line in LARGE_BODY.splitlines()),
+                             media_type="application/x-ndjson")
+
+
+client = TestClient(compression_app)
+
+DECOMPRESS = {
+    "gzip": gzip.decompress,
+    "br": brotli.decompress,
+    "zstd": lambda data: zstandard.ZstdDecompressor().decompressobj().decompress(data),
+}
+
+
+def raw_body(path, encoding):
+    with client.stream("GET", path, headers={"Accept-Encoding": encoding}) as response:
+        return response, b"".join(response.iter_raw())
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+# Negotiation Tests
+class TestNegotiation:
+    def test_server_preference_breaks_ties(self):
+        """Test zstd is chosen over br and gzip at equal weights"""
+        assert negotiate("gzip, deflate, br, zstd", available_encoders()) == "zstd"
+
+    def test_client_weights_win(self):
+        """Test a higher q-value beats the server preference"""
+        assert negotiate("zstd;q=0.5, gzip;q=1.0", available_encoders()) == "gzip"
+
+    def test_refused_and_unknown_encodings(self):
+        """Test q=0 refuses an encoding and unknown ones are ignored"""
+        assert negotiate("gzip;q=0, deflate", available_encoders()) is None
+        assert negotiate("", available_encoders()) is None
+        assert negotiate("*", {"gzip": None}) == "gzip"
+
+
+# Middleware Tests
+class TestCompressionMiddleware:
+    @pytest.mark.parametrize("encoding", ["gzip", "br", "zstd"])
+    def test_large_body_is_compressed(self, encoding):
+        """Test large JSON is compressed with the negotiated encoding"""
+        response, body = raw_body("/large", encoding)
+
+        assert response.headers["content-encoding"] == encoding
+        assert response.headers["vary"] == "Accept-Encoding"
+        assert int(response.headers["content-length"]) == len(body) < len(LARGE_BODY) / 4
+        assert DECOMPRESS[encoding](body).decode() == LARGE_BODY
+
+    def test_strong_etag_is_weakened(self):
+        """Test the compressed variant does not reuse the strong validator"""
+        response, _ = raw_body("/large", "gzip")
+        assert response.headers["etag"] == 'W/"v1"'
+
+    def test_small_and_binary_bodies_are_not_compressed(self):
+        """Test bodies under the threshold and non-text types are sent as is"""
+        for path in ("/small", "/image"):
+            response, _ = raw_body(path, "gzip")
+            assert "content-encoding" not in response.headers
+
+    def test_no_accept_encoding(self):
+        """Test clients that do not accept compression get the identity body"""
+        response, body = raw_body("/large", "identity")
+        assert "content-encoding" not in response.headers
+        assert body.decode() == LARGE_BODY
+
+    def test_streamed_body_is_compressed_per_chunk(self):
+        """Test each streamed chunk is flushed so it can be decoded on arrival"""
+        with client.stream("GET", "/stream", headers={"Accept-Encoding": "gzip"}) as response:
+            assert response.headers["content-encoding"] == "gzip"
+            assert "content-length" not in response.headers
+            decoder = zlib.decompressobj(31)
+            chunks = [decoder.decompress(chunk) for chunk in response.iter_raw()]
+
+        assert all(chunks)
+        assert b"".join(chunks).decode() == LARGE_BODY
+
+    def test_cost_and_savings_are_recorded(self):
+        """Test input, output bytes and CPU time are counted per encoding"""
+        before_in = sample("compression_input_bytes_total", encoding="br")
+        before_out = sample("compression_output_bytes_total", encoding="br")
+
+        _, body = raw_body("/large", "br")
+
+        assert sample("compression_input_bytes_total", encoding="br") == before_in + len(LARGE_BODY)
+        assert sample("compression_output_bytes_total", encoding="br") == before_out + len(body)
+        assert sample("compression_cpu_seconds_total", encoding="br") > 0
@@ -0,0 +1,207 @@
+import pytest
+import asyncio
+import os
+import sys
+import time
+from unittest.mock import AsyncMock, Mock, patch
+
+import httpx
+from fastapi import FastAPI
+
+# Get the directory one level above the 'tests' directory
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Add this directory to Python's sys.path
+sys.path.append(backend_dir)
+
+from backend import db, deadline
+from backend.deadline import DeadlineMiddleware, RouteDeadline, detached, remaining, timeout_for
+from backend.kafkaConnection import KafkaConnection
+from backend.rabbitMQ import RabbitMQManager
+
+
+def deadline_app():
+    app = FastAPI()
+
+    @app.get("/slow")
+    async def slow(seconds: float = 1.0):
+        await asyncio.sleep(seconds)
+        return {"ok": True}
+
+    @app.get("/budget")
+    async def budget():
+        return {"remaining": remaining()}
+
+    @app.get("/threaded")
+    def threaded():
+        return {"remaining": remaining()}
+
+    @app.get("/stream")
+    async def stream():
+        return {"remaining": remaining()}
+
+    app.add_middleware(
+        DeadlineMiddleware,
+        routes=[RouteDeadline("stream", None, "GET", "/stream")],
+        default=RouteDeadline("default", 0.2),
+    )
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+def with_deadline(seconds):
+    return deadline._deadline.set(time.monotonic() + seconds)
+
+
+# Deadline Tests
+class TestDeadline:
+    def test_timeouts_are_capped_by_the_remaining_budget(self):
+        """Test dependency timeouts shrink to what is left of the request"""
+        assert remaining() is None
+        assert timeout_for(5) == 5
+
+        token = with_deadline(1.0)
+        try:
+            assert 0.9 < timeout_for(5) <= 1.0
+            assert timeout_for(0.5) == 0.5
+        finally:
+            deadline._deadline.reset(token)
+
+    @pytest.mark.asyncio
+    async def test_background_tasks_do_not_inherit_the_deadline(self):
+        """Test work outliving its request runs without the request's deadline"""
+        token = with_deadline(1.0)
+        try:
+            inherited = await asyncio.create_task(self._remaining())
+            detached_remaining = await asyncio.create_task(detached(self._remaining()))
+            assert remaining() is not None
+        finally:
+            deadline._deadline.reset(token)
+        assert inherited is not None
+        assert detached_remaining is None
+
+    @staticmethod
+    async def _remaining():
+        return remaining()
+
+
+# Deadline Middleware Tests
+class TestDeadlineMiddleware:
+    @pytest.mark.asyncio
+    async def test_slow_requests_answer_504(self):
+        """Test a request still running at its deadline is cancelled"""
+        async with deadline_app() as http:
+            started = time.perf_counter()
+            response = await http.get("/slow")
+            elapsed = time.perf_counter() - started
+
+        assert response.status_code == 504
+        assert response.json()["detail"] == "The request did not complete in time."
+        assert elapsed < 0.5
+
+    @pytest.mark.asyncio
+    async def test_header_overrides_the_route_budget(self):
+        """Test clients may shorten or extend the budget, up to REQUEST_DEADLINE_MAX"""
+        async with deadline_app() as http:
+            shorter = await http.get("/slow", params={"seconds": 0.1}, headers={"X-Request-Timeout": "0.05"})
+            longer = await http.get("/slow", params={"seconds": 0.3}, headers={"X-Request-Timeout": "1"})
+            with patch.object(deadline, "REQUEST_DEADLINE_MAX", 0.1):
+                capped = await http.get("/slow", params={"seconds": 0.15}, headers={"X-Request-Timeout": "1"})
+            invalid = await http.get("/budget", headers={"X-Request-Timeout": "soon"})
+
+        assert shorter.status_code == 504
+        assert longer.status_code == 200
+        assert capped.status_code == 504
+        assert 0 < invalid.json()["remaining"] <= 0.2
+
+    @pytest.mark.asyncio
+    async def test_deadline_reaches_threaded_routes(self):
+        """Test sync routes, run in the threadpool, see the request's deadline"""
+        async with deadline_app() as http:
+            response = await http.get("/threaded")
+        assert 0 < response.json()["remaining"] <= 0.2
+
+    @pytest.mark.asyncio
+    async def test_streaming_routes_have_no_deadline(self):
+        """Test routes configured without a budget run unbounded"""
+        async with deadline_app() as http:
+            response = await http.get("/stream", headers={"X-Request-Timeout": "0.05"})
+        assert response.json()["remaining"] is None
+
+
+# Deadline Propagation Tests
+class TestPropagation:
+    def test_sql_statement_timeout(self):
+        """Test Postgres statements are capped by the remaining budget"""
+        conn, cursor = Mock(info={}), Mock()
+        conn.dialect.name = "postgresql"
+        db._apply_request_deadline(conn, cursor, "SELECT 1", {}, None, False)
+        cursor.execute.assert_not_called()
+
+        token = with_deadline(1.5)
+        try:
+            db._apply_request_deadline(conn, cursor, "SELECT 1", {}, None, False)
+        finally:
+            deadline._deadline.reset(token)
+        statement = cursor.execute.call_args.args[0]
+        assert statement.startswith("SET LOCAL statement_timeout = ")
+        assert 1400 < int(statement.rsplit(" ", 1)[1]) <= 1500
+
+    def test_timeout_is_set_once_per_transaction(self):
+        """Test later statements of a transaction reuse its timeout instead of another round trip"""
+        conn, cursor = Mock(info={}), Mock()
+        conn.dialect.name = "postgresql"
+        token = with_deadline(1.5)
+        try:
+            db._apply_request_deadline(conn, cursor, "SELECT 1", {}, None, False)
+            db._apply_request_deadline(conn, cursor, "SELECT 2", {}, None, False)
+            assert cursor.execute.call_count == 1
+
+            db._transaction_ended(conn)
+            db._apply_request_deadline(conn, cursor, "SELECT 3", {}, None, False)
+        finally:
+            deadline._deadline.reset(token)
+        assert cursor.execute.call_count == 2
+
+    def test_spent_budget_never_disables_the_timeout(self):
+        """Test an exhausted budget sets the shortest timeout, not Postgres' 0 (unlimited)"""
+        conn, cursor = Mock(info={}), Mock()
+        conn.dialect.name = "postgresql"
+        token = with_deadline(-1)
+        try:
+            db._apply_request_deadline(conn, cursor, "SELECT 1", {}, None, False)
+        finally:
+            deadline._deadline.reset(token)
+        cursor.execute.assert_called_once_with("SET LOCAL statement_timeout = 1")
+
+    @pytest.mark.asyncio
+    async def test_kafka_send_is_bounded(self):
+        """Test an unacknowledged send gives up at the request's deadline"""
+        connection = KafkaConnection()
+        connection.producer = Mock()
+
+        async def never_acknowledged(*args, **kwargs):
+            await asyncio.sleep(10)
+
+        connection.producer.send_and_wait = never_acknowledged
+        connection._producer_started = True
+
+        token = with_deadline(0.1)
+        try:
+            started = time.perf_counter()
+            assert await connection.send_message("movie-events", {"event": "movie_created"}) is False
+        finally:
+            deadline._deadline.reset(token)
+        assert time.perf_counter() - started < 1
+
+    @pytest.mark.asyncio
+    async def test_rabbitmq_publish_timeout(self):
+        """Test the publish confirmation wait is capped by the remaining budget"""
+        manager = RabbitMQManager()
+        manager.channel = Mock()
+        manager.channel.default_exchange.publish = AsyncMock()
+
+        token = with_deadline(0.5)
+        try:
+            await manager.publish_message("{}")
+        finally:
+            deadline._deadline.reset(token)
+        assert 0 < manager.channel.default_exchange.publish.call_args.kwargs["timeout"] <= 0.5
@@ -0,0 +1,103 @@
+import pytest
+import csv
+import io
+import json
+from datetime import datetime
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+import os
+import sys
+
+# Get the directory one level above the 'tests' directory
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Add this directory to Python's sys.path
+sys.path.append(backend_dir)
+
+from main import app
+from backend.db import Base
+from backend.auth.jwt import get_current_user
+from backend.auth.models import User
+from backend.movies import models, services
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def library():
+    """An in-memory database holding two users' libraries, used by the export."""
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(bind=engine)
+    database = session_factory()
+    owner = User(username="owner", email="owner@example.com", role="user", password="x")
+    other = User(username="other", email="other@example.com", role="user", password="x")
+    database.add_all([owner, other])
+    database.flush()
+    movies = [
+        models.Movie(title=f"Movie {i}", imdbID=f"tt{i:07d}", year="2001", type="movie",
+                     poster=f"https://example.com/{i}.jpg", owner_id=owner.id,
+                     createdDate=datetime(2024, 1, 1, 12, 0, i))
+        for i in range(5)
+    ]
+    database.add_all(movies + [
+        models.Movie(title="Not mine", imdbID="tt9999999", year="2001", type="movie", owner_id=other.id)
+    ])
+    database.flush()
+    heist = models.Playlist(name="Heist", owner_id=owner.id)
+    noir = models.Playlist(name="Noir", owner_id=owner.id)
+    database.add_all([heist, noir])
+    database.flush()
+    database.add_all([
+        models.PlaylistMovie(playlist_id=heist.id, movie_id=movies[0].id),
+        models.PlaylistMovie(playlist_id=noir.id, movie_id=movies[0].id),
+        models.PlaylistMovie(playlist_id=noir.id, movie_id=movies[3].id),
+    ])
+    database.commit()
+
+    app.dependency_overrides[get_current_user] = lambda: owner
+    with patch("backend.movies.services.SessionLocal", session_factory):
+        yield owner
+    app.dependency_overrides.clear()
+
+
+# Export Tests
+class TestLibraryExport:
+    def test_ndjson_export(self, library):
+        """Test the NDJSON export has one movie per line with its playlists"""
+        response = client.get("/api/movies/export?format=ndjson")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        assert 'filename="movies.ndjson"' in response.headers["content-disposition"]
+        movies = [json.loads(line) for line in response.text.splitlines()]
+        assert [movie["title"] for movie in movies] == [f"Movie {i}" for i in range(5)]
+        assert [p["name"] for p in movies[0]["playlists"]] == ["Heist", "Noir"]
+        assert movies[1]["playlists"] == []
+        assert movies[0]["createdDate"] == "2024-01-01T12:00:00"
+
+    def test_csv_export(self, library):
+        """Test the CSV export has a header and joins playlist membership"""
+        response = client.get("/api/movies/export?format=csv")
+
+        assert response.headers["content-type"].startswith("text/csv")
+        rows = list(csv.DictReader(io.StringIO(response.text)))
+        assert len(rows) == 5
+        assert rows[0]["playlists"] == "Heist;Noir"
+        assert rows[3]["playlists"] == "Noir"
+        assert rows[2]["playlist_ids"] == ""
+
+    def test_export_is_streamed_in_chunks(self, library):
+        """Test the body is produced in batches rather than one document"""
+        with patch.object(services, "EXPORT_BATCH_SIZE", 2):
+            chunks = list(services.export_movies(library.id, "ndjson"))
+
+        assert [chunk.count(b"\n") for chunk in chunks] == [2, 2, 1]
+
+    def test_unknown_format_is_rejected(self, library):
+        """Test formats other than ndjson and csv are a validation error"""
+        assert client.get("/api/movies/export?format=xml").status_code == 422
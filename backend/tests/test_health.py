@@ -0,0 +1,123 @@
+import pytest
+import asyncio
+import time
+from unittest.mock import AsyncMock, patch
+from fastapi.testclient import TestClient
+import os
+import sys
+
+# Get the directory one level above the 'tests' directory
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Add this directory to Python's sys.path
+sys.path.append(backend_dir)
+
+from main import app
+from backend import health
+from backend.health import HealthChecker
+from backend.lifecycle import Dependency, DependencyManager, UP, DOWN
+
+client = TestClient(app)
+
+
+def sleeper(seconds, error=None):
+    probe = AsyncMock()
+
+    async def run():
+        await probe()
+        await asyncio.sleep(seconds)
+        if error:
+            raise error
+    run.mock = probe
+    return run
+
+
+@pytest.fixture
+def manager():
+    return DependencyManager([
+        Dependency("postgres", AsyncMock(return_value=True), required=True),
+        Dependency("kafka", AsyncMock(return_value=True)),
+    ], initial_delay=60)
+
+
+# Health Checker Tests
+class TestHealthChecker:
+    @pytest.mark.asyncio
+    async def test_probes_run_concurrently_with_latency(self, manager):
+        """Test every dependency is probed at once and its latency reported"""
+        checker = HealthChecker({"postgres": sleeper(0.1), "kafka": sleeper(0.1)}, manager)
+
+        started = time.perf_counter()
+        results = await checker.check()
+
+        assert time.perf_counter() - started < 0.18
+        assert results["postgres"]["status"] == "up"
+        assert results["postgres"]["required"] is True
+        assert 90 <= results["kafka"]["latency_ms"] < 180
+
+    @pytest.mark.asyncio
+    async def test_results_are_cached(self, manager):
+        """Test probes within the TTL, sequential or concurrent, reuse one round"""
+        probe = sleeper(0.01)
+        checker = HealthChecker({"postgres": probe}, manager, ttl=60)
+
+        await asyncio.gather(checker.check(), checker.check(), checker.check())
+        await checker.check()
+
+        assert probe.mock.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_failing_probe_marks_dependency_down(self, manager):
+        """Test a lost dependency is reported and handed back for reconnection"""
+        manager.dependencies["kafka"]._set_state(UP)
+        manager.dependencies["kafka"].connect = AsyncMock(return_value=False)
+        checker = HealthChecker({"kafka": sleeper(0, ConnectionError("producer not started"))}, manager)
+
+        results = await checker.check()
+        assert "kafka" in manager._reconnect_tasks
+        await manager.stop()
+
+        assert results["kafka"] == {"status": "down", "error": "producer not started",
+                                    "latency_ms": results["kafka"]["latency_ms"], "required": False}
+        assert manager.dependencies["kafka"].state == DOWN
+
+    @pytest.mark.asyncio
+    async def test_readiness_requires_fast_postgres(self, manager):
+        """Test readiness ignores optional dependencies but ejects a slow database"""
+        checker = HealthChecker({"postgres": sleeper(0), "kafka": sleeper(0, OSError())}, manager, ttl=0)
+        assert checker.is_ready(await checker.check())
+
+        checker.slow_threshold_ms = 10
+        checker.probes["postgres"] = sleeper(0.05)
+        assert not checker.is_ready(await checker.check())
+
+        checker.probes["postgres"] = sleeper(5)
+        checker.timeout = 0.05
+        results = await checker.check()
+        assert "timed out" in results["postgres"]["error"]
+        assert not checker.is_ready(results)
+
+
+# Health Endpoint Tests
+class TestHealthEndpoints:
+    def test_liveness_reports_degraded_dependencies(self):
+        """Test /healthz answers 200 even while dependencies are down"""
+        probes = {"postgres": sleeper(0), "kafka": sleeper(0, ConnectionError("down"))}
+        with patch.object(health.health_checker, "probes", probes), \
+             patch.object(health.health_checker, "_results", None):
+            response = client.get("/healthz")
+
+        assert response.status_code == 200
+        assert response.json()["status"] == "degraded"
+        assert response.json()["dependencies"]["kafka"]["status"] == "down"
+
+    def test_readiness_follows_postgres(self):
+        """Test /readyz is 503 while Postgres is down and 200 once it answers"""
+        with patch.object(health.health_checker, "_results", None), \
+             patch.object(health.health_checker, "probes", {"postgres": sleeper(0, OSError("refused"))}):
+            assert client.get("/readyz").status_code == 503
+
+        with patch.object(health.health_checker, "_results", None), \
+             patch.object(health.health_checker, "probes", {"postgres": sleeper(0)}):
+            response = client.get("/readyz")
+        assert response.status_code == 200
+        assert response.json()["status"] == "ready"
@@ -0,0 +1,225 @@
+import pytest
+import pytest_asyncio
+import httpx
+import json
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, patch
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+import os
+import sys
+import threading
+from fastapi import HTTPException
+
+# Get the directory one level above the 'tests' directory
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Add this directory to Python's sys.path
+sys.path.append(backend_dir)
+
+from main import app
+from backend.db import Base
+from backend.auth.jwt import get_current_user
+from backend.auth.models import User
+from backend.movies import imports, models
+
+
+def ndjson(*movies):
+    return "".join(json.dumps(movie) + "\n" for movie in movies).encode()
+
+
+def movie(i, **fields):
+    return {"title": f"Movie {i}", "imdbID": f"tt{i:07d}", "year": "2001", "type": "movie", **fields}
+
+
+@pytest.fixture
+def session_factory():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine)
+    database = factory()
+    owner = User(username="owner", email="owner@example.com", role="user", password="x")
+    database.add(owner)
+    database.commit()
+    owner_id = owner.id
+    database.close()
+
+    current_user = {"user": owner}
+    app.dependency_overrides[get_current_user] = lambda: current_user["user"]
+    with patch("backend.movies.imports.SessionLocal", factory):
+        factory.owner_id = owner_id
+        factory.current_user = current_user
+        yield factory
+    app.dependency_overrides.clear()
+
+
+@pytest_asyncio.fixture
+async def api():
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+        yield client
+
+
+async def run_import(api, body, **params):
+    response = await api.post("/api/movies/import", content=body, params=params)
+    assert response.status_code == 202
+    job_id = response.json()["id"]
+    task = imports.job_store.tasks.get(job_id)
+    if task is not None:
+        await task
+    return (await api.get(f"/api/movies/import/{job_id}")).json()
+
+
+def titles(session_factory):
+    database = session_factory()
+    try:
+        return {m.imdbID: m.title for m in database.query(models.Movie).all()}
+    finally:
+        database.close()
+
+
+# Import Tests
+class TestLibraryImport:
+    @pytest.mark.asyncio
+    async def test_ndjson_import(self, session_factory, api):
+        """Test an NDJSON upload is imported by a background job"""
+        job = await run_import(api, ndjson(*(movie(i) for i in range(5))))
+
+        assert job["status"] == "completed"
+        assert job["rows"] == job["imported"] == 5
+        assert len(titles(session_factory)) == 5
+
+    @pytest.mark.asyncio
+    async def test_upsert_on_owner_and_imdb_id(self, session_factory, api):
+        """Test importing a title the user already has updates it in place"""
+        await run_import(api, ndjson(movie(1), movie(2)))
+        job = await run_import(api, ndjson(movie(1, title="Renamed"), movie(3)))
+
+        assert job["imported"] == 2
+        assert titles(session_factory) == {
+            "tt0000001": "Renamed", "tt0000002": "Movie 2", "tt0000003": "Movie 3",
+        }
+
+    @pytest.mark.asyncio
+    async def test_csv_import_reports_invalid_rows(self, session_factory, api):
+        """Test invalid rows are skipped and reported with their line numbers"""
+        body = (
+            "id,title,imdbID,year,type,poster\n"
+            "1,Heat,tt0113277,1995,movie,https://example.com/heat.jpg\n"
+            "2,No id,,1995,movie,\n"
+            "3,Ronin,tt0122690,1998,movie,not a url\n"
+            "4,Thief,tt0083190,1981,movie,\n"
+        ).encode()
+
+        job = await run_import(api, body, format="csv")
+
+        assert job["status"] == "completed"
+        assert (job["rows"], job["imported"], job["invalid"]) == (4, 2, 2)
+        assert [error["line"] for error in job["errors"]] == [3, 4]
+        assert set(titles(session_factory).values()) == {"Heat", "Thief"}
+
+    @pytest.mark.asyncio
+    async def test_rows_are_upserted_in_chunks(self, session_factory, api):
+        """Test the file is read, validated and written chunk by chunk"""
+        with patch.object(imports, "IMPORT_CHUNK_SIZE", 2), \
+             patch.object(imports, "upsert_movies", wraps=imports.upsert_movies) as upsert:
+            job = await run_import(api, ndjson(*(movie(i) for i in range(5)), movie(4)) + b"{broken\n")
+
+        assert [len(call.args[2]) for call in upsert.call_args_list] == [2, 2, 1]
+        assert (job["rows"], job["imported"], job["invalid"]) == (7, 5, 1)
+        assert len(titles(session_factory)) == 5
+
+    @pytest.mark.asyncio
+    async def test_oversized_upload_is_rejected(self, session_factory, api):
+        """Test uploads over the size limit are refused before any import"""
+        with patch.object(imports, "IMPORT_MAX_BYTES", 10):
+            response = await api.post("/api/movies/import", content=ndjson(movie(1)))
+        assert response.status_code == 413
+
+    @pytest.mark.asyncio
+    async def test_upload_is_written_in_blocks_off_the_loop(self, tmp_path):
+        """Test the body is written in blocks by worker threads and removed when refused"""
+        uploads = []
+
+        class RecordingFile:
+            def __init__(self, **kwargs):
+                self.file = open(tmp_path / f"upload-{len(uploads)}", "wb")
+                self.name = self.file.name
+                self.writes = []
+                uploads.append(self)
+
+            def write(self, data):
+                self.writes.append((threading.get_ident(), data))
+                return self.file.write(data)
+
+            def close(self):
+                self.file.close()
+
+        async def body(*chunks):
+            for chunk in chunks:
+                yield chunk
+
+        with patch.object(imports, "IMPORT_WRITE_BLOCK_BYTES", 4), \
+                patch.object(imports.tempfile, "NamedTemporaryFile", RecordingFile):
+            path = await imports.spool_upload(body(b"ab", b"cd", b"ef"), max_bytes=100)
+            with pytest.raises(HTTPException):
+                await imports.spool_upload(body(b"abcd", b"efgh"), max_bytes=6)
+
+        with open(path, "rb") as f:
+            assert f.read() == b"abcdef"
+        assert [data for _, data in uploads[0].writes] == [b"abcd", b"ef"]
+        assert threading.get_ident() not in {thread for thread, _ in uploads[0].writes}
+        assert not os.path.exists(uploads[1].name)
+
+    @pytest.mark.asyncio
+    async def test_jobs_are_private(self, session_factory, api):
+        """Test another user cannot read an import's status"""
+        job = await run_import(api, ndjson(movie(1)))
+        stranger = User(username="x", email="x@example.com", role="user", password="x")
+        stranger.id = session_factory.owner_id + 1
+        session_factory.current_user["user"] = stranger
+
+        assert (await api.get(job["status_url"])).status_code == 404
+
+    @pytest.mark.asyncio
+    async def test_status_is_readable_from_any_worker(self, session_factory, api):
+        """Test a job's status is served from the import_job table when another worker ran it"""
+        job = await run_import(api, ndjson(movie(1), movie(2)))
+        with patch.object(imports.job_store, "jobs", {}):
+            polled = (await api.get(job["status_url"])).json()
+
+        assert polled["status"] == "completed"
+        assert polled["imported"] == 2
+
+    @pytest.mark.asyncio
+    async def test_expired_jobs_are_deleted(self, session_factory, api):
+        """Test starting an import deletes job rows past their expiry"""
+        database = session_factory()
+        database.add(models.ImportJobState(
+            id="old", owner_id=session_factory.owner_id, state="{}",
+            expires_at=datetime.now() - timedelta(seconds=1),
+        ))
+        database.commit()
+
+        await run_import(api, ndjson(movie(1)))
+        assert database.get(models.ImportJobState, "old") is None
+        database.close()
+
+    @pytest.mark.asyncio
+    async def test_imported_movies_are_indexed_and_announced(self, session_factory, api):
+        """Test each chunk is bulk indexed and only the movies it created emit movie_created"""
+        with patch.object(imports, "es_client", True), \
+                patch.object(imports, "index_documents", AsyncMock()) as index_documents, \
+                patch.object(imports, "announce_movies_created", AsyncMock()) as announce:
+            await run_import(api, ndjson(movie(1), movie(2)))
+            await run_import(api, ndjson(movie(1, title="Renamed"), movie(3)))
+
+        indexed = [call.args[2] for call in index_documents.call_args_list]
+        assert [sorted(d["imdbID"] for d in documents.values()) for documents in indexed] == [
+            ["tt0000001", "tt0000002"], ["tt0000001", "tt0000003"],
+        ]
+        assert any(d["title"] == "Renamed" for d in indexed[1].values())
+        announced = [[movie.imdbID for movie in call.args[0]] for call in announce.call_args_list]
+        assert announced == [["tt0000001", "tt0000002"], ["tt0000003"]]
@@ -13,6 +13,7 @@ sys.path.append(backend_dir)
 
 from backend.kafkaConnection import KafkaConnection, send_kafka_message, get_kafka_connection
 from backend.kafka_consumer import EventProcessor, KafkaEventConsumer
+from backend.spool import Spool, read_segment
 
 # Test Fixtures
 @pytest.fixture
@@ -145,6 +146,27 @@ class TestKafkaConnection:
         
         assert result == False
 
+    @pytest.mark.asyncio
+    async def test_send_messages_waits_once_for_the_batch(self, tmp_path):
+        """Test a batch is queued in order and only its unacknowledged messages are spooled"""
+        loop = asyncio.get_running_loop()
+        deliveries = [loop.create_future() for _ in range(3)]
+        deliveries[0].set_result(None)
+        deliveries[1].set_exception(ConnectionError("broker down"))
+        deliveries[2].set_result(None)
+        kafka_conn = KafkaConnection()
+        kafka_conn.spool = Spool("kafka", directory=tmp_path, fsync_interval=0)
+        kafka_conn.producer = Mock(send=AsyncMock(side_effect=deliveries), send_and_wait=AsyncMock())
+        kafka_conn._producer_started = True
+
+        messages = [({"n": n}, str(n)) for n in range(3)]
+        assert await kafka_conn.send_messages("test-topic", messages) is False
+
+        assert [call.kwargs["value"] for call in kafka_conn.producer.send.call_args_list] == [{"n": 0}, {"n": 1}, {"n": 2}]
+        kafka_conn.producer.send_and_wait.assert_not_called()
+        spooled = [json.loads(payload)["value"] for _, payload in read_segment(kafka_conn.spool.segments()[0])[0]]
+        assert spooled == [{"n": 1}]
+
     @pytest.mark.asyncio
     async def test_close_connections_success(self):
         """Test successful connection closure"""
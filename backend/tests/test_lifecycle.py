@@ -0,0 +1,100 @@
+import pytest
+import asyncio
+import time
+from unittest.mock import AsyncMock
+import os
+import sys
+
+# Get the directory one level above the 'tests' directory
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Add this directory to Python's sys.path
+sys.path.append(backend_dir)
+
+from backend.lifecycle import Dependency, DependencyManager, UP, DOWN
+
+
+def flaky(failures):
+    """Connect callable failing `failures` times before succeeding."""
+    calls = []
+
+    async def connect():
+        calls.append(time.perf_counter())
+        return len(calls) > failures
+    connect.calls = calls
+    return connect
+
+
+async def hang():
+    await asyncio.sleep(60)
+    return True
+
+
+# Dependency Manager Tests
+class TestDependencyManager:
+    @pytest.mark.asyncio
+    async def test_start_is_concurrent_and_time_bounded(self):
+        """Test unreachable dependencies cost one timeout in total, not one each"""
+        manager = DependencyManager([
+            Dependency("postgres", AsyncMock(return_value=True), required=True),
+            Dependency("elasticsearch", hang, timeout=0.2),
+            Dependency("kafka", hang, timeout=0.2),
+        ], initial_delay=60)
+
+        started = time.perf_counter()
+        await manager.start()
+        elapsed = time.perf_counter() - started
+        await manager.stop()
+
+        assert elapsed < 0.35
+        assert manager.dependencies["postgres"].state == UP
+        assert manager.dependencies["kafka"].state == DOWN
+        assert "timed out" in manager.dependencies["kafka"].error
+
+    @pytest.mark.asyncio
+    async def test_failed_dependency_reconnects_in_background(self):
+        """Test a dependency down at startup is retried until it connects"""
+        connect = flaky(failures=2)
+        manager = DependencyManager([Dependency("rabbitmq", connect)], initial_delay=0.01, max_delay=0.02)
+
+        await manager.start()
+        assert manager.dependencies["rabbitmq"].state == DOWN
+        for _ in range(100):
+            if manager.dependencies["rabbitmq"].state == UP:
+                break
+            await asyncio.sleep(0.01)
+        await manager.stop()
+
+        assert manager.dependencies["rabbitmq"].state == UP
+        assert manager.dependencies["rabbitmq"].attempts == 3
+
+    @pytest.mark.asyncio
+    async def test_readiness_only_requires_required_dependencies(self):
+        """Test the app is ready in degraded mode once Postgres is up"""
+        manager = DependencyManager([
+            Dependency("postgres", flaky(failures=1), required=True),
+            Dependency("kafka", AsyncMock(side_effect=OSError("no brokers"))),
+        ], initial_delay=60)
+        assert not manager.is_ready()
+
+        await manager.start()
+        assert not manager.is_ready()
+        assert manager.status()["kafka"]["error"] == "no brokers"
+
+        manager.dependencies["postgres"]._set_state(UP)
+        assert manager.is_ready()
+        await manager.stop()
+
+    @pytest.mark.asyncio
+    async def test_stop_cancels_reconnects_and_closes(self):
+        """Test shutdown stops retrying and closes every dependency"""
+        close = AsyncMock()
+        manager = DependencyManager([Dependency("elasticsearch", AsyncMock(return_value=False), close)],
+                                    initial_delay=60)
+        await manager.start()
+        assert manager._reconnect_tasks
+
+        await manager.stop()
+
+        assert not manager._reconnect_tasks
+        close.assert_awaited_once()
+
@@ -0,0 +1,131 @@
+import pytest
+import subprocess
+from unittest.mock import Mock, AsyncMock, patch
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+import os
+import sys
+
+# Get the directory one level above the 'tests' directory
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Add this directory to Python's sys.path
+sys.path.append(backend_dir)
+
+from main import app
+from backend import db
+from backend.kafkaConnection import KafkaConnection, record_consumer_lag
+from backend.rabbitMQ import RabbitMQManager
+
+client = TestClient(app)
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+# HTTP Metrics Tests
+class TestHTTPMetrics:
+    def test_requests_are_labelled_with_route_template(self):
+        """Test latency is recorded per route template, not per raw path"""
+        labels = {"method": "GET", "route": "/healthz", "status": "200"}
+        before = sample("http_request_duration_seconds_count", **labels)
+
+        with patch("backend.health.health_checker.check", AsyncMock(return_value={})):
+            client.get("/healthz")
+            client.get("/healthz")
+
+        assert sample("http_request_duration_seconds_count", **labels) == before + 2
+        assert sample("http_requests_in_progress", method="GET") == 0
+
+    def test_unmatched_paths_share_one_label(self):
+        """Test unknown paths do not create a series each"""
+        before = sample("http_request_duration_seconds_count", method="GET", route="unmatched", status="404")
+        client.get("/no-such-page-123")
+        client.get("/no-such-page-456")
+        assert sample("http_request_duration_seconds_count",
+                      method="GET", route="unmatched", status="404") == before + 2
+
+    def test_metrics_endpoint_exposes_all_families(self):
+        """Test /metrics serves the Prometheus text format"""
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        for name in ("http_request_duration_seconds", "db_query_duration_seconds",
+                     "kafka_send_duration_seconds", "rabbitmq_publish_duration_seconds",
+                     "elasticsearch_request_duration_seconds", "kafka_consumer_lag"):
+            assert f"# TYPE {name}" in response.text
+
+
+# Database Metrics Tests
+class TestDatabaseMetrics:
+    def test_engine_events_record_statement_duration(self):
+        """Test the cursor execute hooks time each statement by type"""
+        before = sample("db_query_duration_seconds_count", operation="SELECT")
+        conn = Mock(info={})
+
+        db._start_query_timer(conn, None, "  select 1", {}, None, False)
+        db._record_query_duration(conn, None, "  select 1", {}, None, False)
+
+        assert sample("db_query_duration_seconds_count", operation="SELECT") == before + 1
+        assert conn.info["query_start_time"] == []
+
+
+# Broker Metrics Tests
+class TestBrokerMetrics:
+    @pytest.mark.asyncio
+    async def test_kafka_send_latency_and_failures(self):
+        """Test Kafka sends are timed and failures counted"""
+        kafka_conn = KafkaConnection()
+        kafka_conn.producer = Mock(send_and_wait=AsyncMock())
+        kafka_conn._producer_started = True
+        sent = sample("kafka_send_duration_seconds_count", topic="metrics-topic")
+        failed = sample("kafka_send_failures_total", topic="metrics-topic")
+
+        await kafka_conn.send_message("metrics-topic", {"a": 1})
+        kafka_conn.producer.send_and_wait.side_effect = Exception("broker down")
+        await kafka_conn.send_message("metrics-topic", {"a": 1})
+
+        assert sample("kafka_send_duration_seconds_count", topic="metrics-topic") == sent + 1
+        assert sample("kafka_send_failures_total", topic="metrics-topic") == failed + 1
+
+    @pytest.mark.asyncio
+    async def test_rabbitmq_publish_latency(self):
+        """Test RabbitMQ publishes are timed"""
+        manager = RabbitMQManager()
+        manager.channel = Mock()
+        manager.channel.default_exchange.publish = AsyncMock()
+        before = sample("rabbitmq_publish_duration_seconds_count", routing_key="metrics_queue")
+
+        await manager.publish_message("hello", routing_key="metrics_queue")
+
+        assert sample("rabbitmq_publish_duration_seconds_count", routing_key="metrics_queue") == before + 1
+
+    def test_consumer_lag(self):
+        """Test lag is the distance from the message to the high watermark"""
+        consumer = Mock()
+        consumer.highwater.return_value = 110
+        message = Mock(topic="movie-events", partition=0, offset=99)
+
+        record_consumer_lag(consumer, message, "test-group")
+
+        assert sample("kafka_consumer_lag", topic="movie-events", partition="0", group="test-group") == 10
+
+
+# Multiprocess Mode Tests
+class TestMultiprocessMetrics:
+    def test_scrape_aggregates_all_workers(self, tmp_path):
+        """Test every worker's samples are summed, whichever worker is scraped"""
+        env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(tmp_path)}
+        repo_root = os.path.dirname(backend_dir)
+        worker = ("from backend.metrics import KAFKA_SEND_FAILURES; "
+                  "KAFKA_SEND_FAILURES.labels('multi').inc(3)")
+        scrape = ("from prometheus_client import generate_latest; "
+                  "from backend.metrics import metrics_registry; "
+                  "print(generate_latest(metrics_registry()).decode())")
+
+        for _ in range(2):
+            subprocess.run([sys.executable, "-c", worker], env=env, cwd=repo_root, check=True)
+        output = subprocess.run([sys.executable, "-c", scrape], env=env, cwd=repo_root,
+                                check=True, capture_output=True, text=True).stdout
+
+        assert 'kafka_send_failures_total{topic="multi"} 6.0' in output
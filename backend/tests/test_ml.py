@@ -0,0 +1,544 @@
+import pytest
+import numpy as np
+import os
+import sys
+from unittest.mock import patch
+
+# Get the directory one level above the 'tests' directory
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Add this directory to Python's sys.path
+sys.path.append(backend_dir)
+
+from backend.ml.ranking import top_k, recommend_by_index
+from backend.ml.content import ContentRecommender
+from backend.ml.recommender import PlaylistRecommendationCache
+from backend.ml.ann import ANNIndex, IVFIndex, exact_neighbors, recall_at_k, rerank
+from backend.ml.incremental import IncrementalUpdater
+from backend.ml import pipeline
+from backend.ml.registry import HotSwapModel, ModelIntegrityError, ModelRegistry
+from scipy.sparse import vstack
+from sklearn.preprocessing import normalize
+
+
+@pytest.fixture
+def similarity_matrix():
+    rng = np.random.default_rng(0)
+    matrix = rng.random((50, 50))
+    matrix = (matrix + matrix.T) / 2
+    np.fill_diagonal(matrix, 1.0)
+    return matrix
+
+
+def sorted_enumerate(cosine_sim, idx, top_n):
+    """Reference ranking previously used by get_recommendations"""
+    sim_scores = sorted(list(enumerate(cosine_sim[idx])), key=lambda x: x[1], reverse=True)
+    return [i[0] for i in sim_scores[1:top_n + 1]]
+
+
+# Ranking Tests
+class TestTopK:
+    def test_single_query_matches_sorted_enumerate(self, similarity_matrix):
+        """Test top_k returns the same ranking as the full sort"""
+        for idx in range(10):
+            indices, scores = top_k(similarity_matrix[idx], 10, exclude=idx)
+            assert list(indices) == sorted_enumerate(similarity_matrix, idx, 10)
+            assert np.all(np.diff(scores) <= 0)
+
+    def test_batched_query_matches_single_queries(self, similarity_matrix):
+        """Test 2-D batched ranking equals row-by-row ranking"""
+        queries = [3, 7, 11, 42]
+        indices, scores = recommend_by_index(similarity_matrix, queries, top_n=5)
+        assert indices.shape == (4, 5)
+        for row, idx in enumerate(queries):
+            single_indices, single_scores = top_k(similarity_matrix[idx], 5, exclude=idx)
+            assert list(indices[row]) == list(single_indices)
+            assert np.allclose(scores[row], single_scores)
+
+    def test_excluded_column_never_returned(self, similarity_matrix):
+        """Test the query movie is excluded from its own results"""
+        indices, _ = recommend_by_index(similarity_matrix, np.arange(50), top_n=10)
+        assert not np.any(indices == np.arange(50)[:, np.newaxis])
+
+    def test_k_larger_than_catalog(self):
+        """Test k is capped at the number of candidates"""
+        indices, scores = top_k(np.array([0.1, 0.9, 0.5]), 10, exclude=1)
+        assert list(indices) == [2, 0]
+        assert list(scores) == [0.5, 0.1]
+
+    def test_input_not_modified(self, similarity_matrix):
+        """Test ranking does not mutate the similarity matrix"""
+        original = similarity_matrix.copy()
+        recommend_by_index(similarity_matrix, [0, 1, 2], top_n=5)
+        assert np.array_equal(original, similarity_matrix)
+
+
+@pytest.fixture
+def recommender():
+    from scipy.sparse import csr_matrix
+    # Three "action" movies sharing terms and two unrelated "romance" movies
+    tfidf_matrix = csr_matrix(np.array([
+        [1.0, 1.0, 0.0, 0.0],
+        [1.0, 0.8, 0.0, 0.1],
+        [0.9, 1.0, 0.1, 0.0],
+        [0.0, 0.0, 1.0, 1.0],
+        [0.0, 0.1, 1.0, 0.9],
+    ]))
+    titles = ["Die Hard", "Speed", "Heat", "Notting Hill", "Sleepless in Seattle"]
+    return ContentRecommender(tfidf_matrix, titles)
+
+
+# Recommender Tests
+class TestContentRecommender:
+    def test_recommend_excludes_playlist_movies(self, recommender):
+        """Test movies already in the playlist are never recommended"""
+        results = recommender.recommend(["Die Hard", "Speed"], top_n=5)
+        titles = [title for title, _ in results]
+        assert "Die Hard" not in titles
+        assert "Speed" not in titles
+        assert titles[0] == "Heat"
+
+    def test_recommend_matches_titles_case_insensitively(self, recommender):
+        """Test OMDb titles are matched with normalized catalog titles"""
+        results = recommender.recommend(["  notting   HILL "], top_n=1)
+        assert results[0][0] == "Sleepless in Seattle"
+
+    def test_recommend_unknown_titles(self, recommender):
+        """Test playlists without catalog movies get no recommendations"""
+        assert recommender.recommend(["Unknown Movie"]) == []
+        assert recommender.recommend([]) == []
+
+    def test_scores_are_cosine_similarities(self, recommender):
+        """Test scores are bounded cosine similarities in descending order"""
+        scores = [score for _, score in recommender.recommend(["Heat"], top_n=4)]
+        assert all(-1.0 <= score <= 1.0 + 1e-6 for score in scores)
+        assert scores == sorted(scores, reverse=True)
+
+
+class TestPlaylistRecommendationCache:
+    def test_cache_hit_for_same_titles(self):
+        """Test cached recommendations are returned for an unchanged playlist"""
+        cache = PlaylistRecommendationCache()
+        cache.set(1, ["Heat", "Speed"], 10, [("Die Hard", 0.9)])
+        assert cache.get(1, ["Speed", "heat"], 10) == [("Die Hard", 0.9)]
+
+    def test_cache_miss_when_playlist_changes(self):
+        """Test a changed playlist never returns stale recommendations"""
+        cache = PlaylistRecommendationCache()
+        cache.set(1, ["Heat"], 10, [("Die Hard", 0.9)])
+        assert cache.get(1, ["Heat", "Speed"], 10) is None
+        assert cache.get(1, ["Heat"], 5) is None
+
+    def test_invalidate(self):
+        """Test explicit invalidation removes the playlist entry"""
+        cache = PlaylistRecommendationCache()
+        cache.set(1, ["Heat"], 10, [("Die Hard", 0.9)])
+        cache.invalidate("1")
+        assert cache.get(1, ["Heat"], 10) is None
+
+    def test_bounded_size(self):
+        """Test least recently used playlists are evicted"""
+        cache = PlaylistRecommendationCache(max_entries=2)
+        for playlist_id in range(3):
+            cache.set(playlist_id, ["Heat"], 10, [])
+        assert cache.get(0, ["Heat"], 10) is None
+        assert cache.get(2, ["Heat"], 10) == []
+
+
+@pytest.fixture
+def tfidf_catalog():
+    """Sparse catalog of 400 movies drawn from 20 topics of shared terms"""
+    from scipy.sparse import csr_matrix
+    rng = np.random.default_rng(1)
+    topics = rng.integers(0, 20, size=400)
+    dense = rng.random((400, 300)) * (rng.random((400, 300)) < 0.02)
+    for row, topic in enumerate(topics):
+        dense[row, topic * 15:(topic + 1) * 15] += rng.random(15)
+    return csr_matrix(dense)
+
+
+# ANN Index Tests
+class TestIVFIndex:
+    def test_full_probe_matches_brute_force(self):
+        """Test probing every list returns the exact neighbors"""
+        rng = np.random.default_rng(2)
+        vectors = rng.normal(size=(300, 16)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        index = IVFIndex(n_lists=10).build(vectors)
+
+        ids, _ = index.search(vectors[:20], 5, n_probe=10, exclude=[{i} for i in range(20)])
+        exact, _ = top_k(vectors[:20] @ vectors.T, 5, exclude=np.arange(20))
+        assert recall_at_k(ids, exact) == 1.0
+
+    def test_add_appends_searchable_vectors(self):
+        """Test vectors added after the build are returned by searches"""
+        rng = np.random.default_rng(3)
+        vectors = rng.normal(size=(100, 8)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        index = IVFIndex(n_lists=5).build(vectors[:90])
+
+        new_ids = index.add(vectors[90:])
+        assert list(new_ids) == list(range(90, 100))
+        ids, scores = index.search(vectors[95], 1, n_probe=5)
+        assert ids[0, 0] == 95
+        assert scores[0, 0] == pytest.approx(1.0, abs=1e-5)
+
+    def test_save_and_load(self, tmp_path):
+        """Test an index round-trips through disk"""
+        rng = np.random.default_rng(4)
+        vectors = rng.normal(size=(50, 8)).astype(np.float32)
+        index = IVFIndex(n_lists=4, n_probe=2).build(vectors)
+        index.save(str(tmp_path / "index.npz"))
+
+        loaded = IVFIndex.load(str(tmp_path / "index.npz"))
+        assert loaded.n_probe == 2
+        assert np.array_equal(loaded.search(vectors[:5], 3)[0], index.search(vectors[:5], 3)[0])
+
+
+class TestANNIndex:
+    def test_recall_against_exact_cosine(self, tfidf_catalog):
+        """Test re-ranked ANN results recover the exact cosine neighbors"""
+        index = ANNIndex.build(tfidf_catalog, n_components=32, n_lists=10, n_probe=4)
+        queries = np.arange(0, 400, 10)
+        exact = exact_neighbors(tfidf_catalog, queries, k=5)
+
+        candidates, _ = index.query(tfidf_catalog[queries], 50, exclude=[{q} for q in queries])
+        normalized = normalize(tfidf_catalog)
+        reranked, _ = rerank(normalized, normalized[queries], candidates, 5)
+        assert recall_at_k(reranked, exact) >= 0.8
+
+    def test_save_and_load(self, tfidf_catalog, tmp_path):
+        """Test the SVD projection and index are persisted together"""
+        index = ANNIndex.build(tfidf_catalog, n_components=16, n_lists=8)
+        index.save(str(tmp_path))
+        assert ANNIndex.exists(str(tmp_path))
+
+        loaded = ANNIndex.load(str(tmp_path))
+        assert len(loaded) == 400
+        assert np.array_equal(
+            loaded.query(tfidf_catalog[:3], 5)[0], index.query(tfidf_catalog[:3], 5)[0]
+        )
+
+    def test_unknown_backend(self, tfidf_catalog):
+        """Test an unsupported backend name is rejected"""
+        with pytest.raises(ValueError):
+            ANNIndex.build(tfidf_catalog, n_components=8, backend="annoy")
+
+    def test_recommender_uses_ann_index(self, tfidf_catalog):
+        """Test the recommender answers from the ANN index when one is loaded"""
+        titles = [f"Movie {i}" for i in range(400)]
+        ann_index = ANNIndex.build(tfidf_catalog, n_components=32, n_lists=10, n_probe=10)
+        with_ann = ContentRecommender(tfidf_catalog, titles, ann_index)
+        exact = ContentRecommender(tfidf_catalog, titles)
+
+        ann_titles = {title for title, _ in with_ann.recommend(["Movie 1", "Movie 2"], top_n=5)}
+        exact_titles = {title for title, _ in exact.recommend(["Movie 1", "Movie 2"], top_n=5)}
+        assert "Movie 1" not in ann_titles
+        assert len(ann_titles & exact_titles) >= 4
+
+
+@pytest.fixture
+def fitted_catalog():
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    documents = [
+        "space alien invasion spaceship",
+        "alien spaceship crew space horror",
+        "romantic comedy wedding love",
+        "love letters romance comedy",
+        "detective murder mystery crime",
+    ]
+    titles = ["Independence Day", "Alien", "Wedding Crashers", "The Lake House", "Knives Out"]
+    vectorizer = TfidfVectorizer()
+    tfidf_matrix = vectorizer.fit_transform(documents)
+    return vectorizer, documents, ContentRecommender(tfidf_matrix, titles)
+
+
+# Incremental Update Tests
+class TestIncrementalUpdater:
+    def test_apply_appends_new_movies(self, fitted_catalog):
+        """Test new movies become recommendable without a retrain"""
+        vectorizer, documents, recommender = fitted_catalog
+        updater = IncrementalUpdater(vectorizer, documents)
+
+        rows = updater.apply(recommender, [{"event": "movie_created", "title": "Space Alien", "type": "movie"}])
+
+        assert rows == [5]
+        assert recommender.tfidf_matrix.shape[0] == 6
+        assert recommender.titles[5] == "Space Alien"
+        assert "Space Alien" in [t for t, _ in recommender.recommend(["Alien"], top_n=2)]
+
+    def test_queries_during_an_append_see_a_consistent_catalog(self, fitted_catalog):
+        """Test recommend, called while an append is half done, never sees a row the matrix lacks"""
+        vectorizer, documents, recommender = fitted_catalog
+        recommender.ann_index = ANNIndex.build(recommender.tfidf_matrix, n_components=3, n_lists=1)
+        add = recommender.ann_index.add
+        seen = []
+
+        def query():
+            seen.append(recommender.recommend(["Space Alien"]))
+            seen.append(recommender.recommend(["Alien", "Independence Day"], top_n=4))
+
+        def stack_then_query(blocks, format):
+            query()
+            return vstack(blocks, format=format)
+
+        def add_then_query(rows):
+            ids = add(rows)
+            query()
+            return ids
+
+        recommender.ann_index.add = add_then_query
+        with patch("backend.ml.content.vstack", side_effect=stack_then_query):
+            IncrementalUpdater(vectorizer, documents).apply(recommender, [{"title": "Space Alien"}])
+
+        assert seen[0] == seen[2] == []
+        assert all("Space Alien" not in [title for title, _ in found] for found in seen[1::2])
+        assert "Space Alien" in [title for title, _ in recommender.recommend(["Alien", "Independence Day"], top_n=4)]
+
+    def test_apply_skips_known_and_duplicate_titles(self, fitted_catalog):
+        """Test replayed events do not append the same movie twice"""
+        vectorizer, documents, recommender = fitted_catalog
+        updater = IncrementalUpdater(vectorizer, documents)
+        events = [{"title": "alien"}, {"title": "Heat"}, {"title": "heat "}, {"year": "2020"}]
+
+        assert updater.apply(recommender, events) == [5]
+        assert updater.apply(recommender, events) == []
+
+    def test_needs_rebuild_on_vocabulary_drift(self, fitted_catalog):
+        """Test unseen vocabulary schedules a full rebuild"""
+        vectorizer, documents, recommender = fitted_catalog
+        updater = IncrementalUpdater(vectorizer, documents, max_oov_ratio=0.5,
+                                     max_appended_fraction=10)
+        assert not updater.needs_rebuild()
+
+        updater.apply(recommender, [{"title": "Zyzzyva Quokka Brouhaha"}])
+        assert updater.oov_ratio == 1.0
+        assert updater.needs_rebuild()
+
+    def test_documents_use_the_title_only(self, fitted_catalog):
+        """Test type and year, absent from training documents, do not count as vocabulary drift"""
+        vectorizer, documents, recommender = fitted_catalog
+        updater = IncrementalUpdater(vectorizer, documents)
+
+        updater.apply(recommender, [{"title": "Alien Love", "type": "movie", "year": "2024"}])
+        assert updater.documents[-1] == "Alien Love"
+        assert updater.oov_ratio == 0.0
+
+    def test_needs_rebuild_on_interval(self, fitted_catalog):
+        """Test the rebuild interval only triggers once movies were appended"""
+        vectorizer, documents, recommender = fitted_catalog
+        updater = IncrementalUpdater(vectorizer, documents, rebuild_interval=0,
+                                     max_oov_ratio=1.0, max_appended_fraction=10)
+        assert not updater.needs_rebuild()
+        updater.apply(recommender, [{"title": "Alien Love"}])
+        assert updater.needs_rebuild()
+
+    def test_rebuild_refits_vocabulary(self, fitted_catalog):
+        """Test a rebuild learns terms that appeared after the last fit"""
+        vectorizer, documents, recommender = fitted_catalog
+        updater = IncrementalUpdater(vectorizer, documents)
+        updater.apply(recommender, [{"title": "Quokka"}])
+
+        rebuilt = updater.rebuild(recommender)
+
+        assert "quokka" in updater.vectorizer.vocabulary_
+        assert rebuilt.titles == recommender.titles
+        assert rebuilt.tfidf_matrix.shape[0] == 6
+        assert not updater.needs_rebuild()
+
+
+@pytest.fixture
+def movies_csv(tmp_path):
+    import csv
+    rows = [
+        ("Alien", "space horror", "alien spaceship", "A crew meets an alien.", None),
+        ("Aliens", "space action", "alien marines", "Marines fight aliens.", "This time it's war"),
+        ("Notting Hill", "romance comedy", "bookshop love", None, None),
+        ("Love Actually", "romance comedy", "christmas love", "Love stories in London.", None),
+        ("Heat", "crime thriller", "heist detective", "A detective hunts a thief.", None),
+        ("Ronin", "crime action", "heist", "Mercenaries plan a heist.", None),
+    ]
+    path = tmp_path / "movies.csv"
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "title", "original_title", "genres", "keywords", "overview", "tagline"])
+        for i, (title, genres, keywords, overview, tagline) in enumerate(rows):
+            writer.writerow([i, title, title, genres, keywords, overview, tagline])
+    return path
+
+
+# Training Pipeline Tests
+class TestTrainingPipeline:
+    def test_streamed_vocabulary_matches_in_memory_fit(self, movies_csv):
+        """Test chunked document frequencies reproduce TfidfVectorizer"""
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        vectorizer, n_documents = pipeline.fit_vocabulary(str(movies_csv), 2, 1, None)
+        documents = [doc for _, chunk in pipeline.iter_documents(str(movies_csv), 2) for doc in chunk]
+        reference = TfidfVectorizer(stop_words='english').fit(documents)
+
+        assert n_documents == 6
+        assert vectorizer.vocabulary_ == reference.vocabulary_
+        assert np.allclose(vectorizer.idf_, reference.idf_)
+        assert vectorizer.transform(documents).dtype == np.float32
+
+    def test_train_writes_model_and_report(self, movies_csv, tmp_path):
+        """Test the CLI saves loadable components and per-stage stats"""
+        model_dir = tmp_path / "model"
+        args = pipeline.parse_args([
+            "--csv", str(movies_csv), "--model-dir", str(model_dir), "--chunk-size", "4",
+            "--workers", "2", "--block-size", "2", "--top-n", "3",
+        ])
+        report = pipeline.train(args)
+
+        assert [stage["stage"] for stage in report["stages"]] == ["vocabulary", "transform", "neighbors", "save"]
+        assert all(stage["seconds"] >= 0 and stage["max_rss_mb"] > 0 for stage in report["stages"])
+        recommender = ContentRecommender.load(str(model_dir))
+        assert recommender.titles[0] == "Alien"
+        assert recommender.recommend(["Alien"], top_n=1)[0][0] == "Aliens"
+
+    def test_precomputed_neighbors_answer_single_titles(self, movies_csv, tmp_path):
+        """Test the pipeline's neighbors are loaded and agree with scoring the catalog"""
+        model_dir = tmp_path / "model"
+        pipeline.train(pipeline.parse_args([
+            "--csv", str(movies_csv), "--model-dir", str(model_dir), "--workers", "1",
+            "--top-n", "3", "--no-trace-memory",
+        ]))
+        recommender = ContentRecommender.load(str(model_dir))
+        assert recommender.neighbors[0].shape == (6, 3)
+
+        precomputed = recommender.recommend(["Alien"], top_n=3)
+        assert [title for title, _ in precomputed] == [recommender.titles[i] for i in recommender.neighbors[0][0]]
+        scored = ContentRecommender(recommender.tfidf_matrix, recommender.titles).recommend(["Alien"], top_n=3)
+        assert [title for title, _ in precomputed] == [title for title, _ in scored]
+        assert np.allclose([s for _, s in precomputed], [s for _, s in scored])
+
+        recommender.append(recommender.tfidf_matrix[:1], ["Alien Again"])
+        assert recommender.neighbors is None
+
+    def test_train_publishes_registry_version(self, movies_csv, tmp_path):
+        """Test --publish adds a verified, loadable registry version"""
+        registry_dir = tmp_path / "registry"
+        args = pipeline.parse_args([
+            "--csv", str(movies_csv), "--model-dir", str(tmp_path / "model"), "--workers", "1",
+            "--no-trace-memory", "--publish", "--registry-dir", str(registry_dir),
+        ])
+        report = pipeline.train(args)
+
+        registry = ModelRegistry(str(registry_dir))
+        assert registry.current_version() == report["version"]
+        manifest = registry.verify(report["version"])
+        assert manifest["metadata"]["n_movies"] == 6
+        assert pipeline.NEIGHBORS_FILE in manifest["files"]
+        recommender = ContentRecommender.load(registry.version_dir(report["version"]))
+        assert recommender.titles[0] == "Alien"
+
+    def test_block_neighbors_match_exact(self, movies_csv):
+        """Test row-block neighbors across workers equal the exact neighbors"""
+        vectorizer, _ = pipeline.fit_vocabulary(str(movies_csv), 10, 1, None)
+        matrix, _, _ = pipeline.transform_corpus(str(movies_csv), 10, vectorizer)
+        ids, scores = pipeline.compute_neighbors(matrix, 3, workers=2, block_size=4)
+        assert np.array_equal(ids, exact_neighbors(matrix, np.arange(6), 3))
+        assert np.all(np.diff(scores, axis=1) <= 0)
+
+
+@pytest.fixture
+def model_source(tmp_path):
+    def write(name, content):
+        source = tmp_path / name
+        source.mkdir()
+        (source / "model.txt").write_text(content)
+        return str(source)
+    return write
+
+
+def read_model(model_dir):
+    with open(os.path.join(model_dir, "model.txt")) as f:
+        return f.read()
+
+
+# Model Registry Tests
+class TestModelRegistry:
+    def test_publish_activates_verified_version(self, model_source, tmp_path):
+        """Test a published version gets a manifest and becomes current"""
+        registry = ModelRegistry(str(tmp_path / "registry"))
+        version = registry.publish(model_source("v1", "one"), version="v1", metadata={"n_movies": 6})
+
+        assert registry.current_version() == version == "v1"
+        assert registry.versions() == ["v1"]
+        manifest = registry.verify("v1")
+        assert set(manifest["files"]) == {"model.txt"}
+        assert manifest["metadata"] == {"n_movies": 6}
+
+    def test_verify_detects_tampered_files(self, model_source, tmp_path):
+        """Test a checksum mismatch is refused"""
+        registry = ModelRegistry(str(tmp_path / "registry"))
+        registry.publish(model_source("v1", "one"), version="v1")
+        with open(os.path.join(registry.version_dir("v1"), "model.txt"), "w") as f:
+            f.write("corrupted")
+
+        with pytest.raises(ModelIntegrityError):
+            registry.verify("v1")
+        with pytest.raises(ModelIntegrityError):
+            registry.activate("v1")
+
+    def test_activate_rolls_back(self, model_source, tmp_path):
+        """Test CURRENT can be pointed back at an older version"""
+        registry = ModelRegistry(str(tmp_path / "registry"))
+        registry.publish(model_source("v1", "one"), version="v1")
+        registry.publish(model_source("v2", "two"), version="v2")
+        assert registry.current_version() == "v2"
+
+        registry.activate("v1")
+        assert registry.current_version() == "v1"
+
+
+class TestHotSwapModel:
+    def test_falls_back_to_unversioned_directory(self, model_source, tmp_path):
+        """Test the model loads from the plain model directory without a registry"""
+        holder = HotSwapModel(read_model, ModelRegistry(str(tmp_path / "registry")), model_source("plain", "plain"))
+        assert holder.get() == "plain"
+        assert holder.version is None
+        assert holder.check_for_update() is False
+
+    def test_swaps_in_new_version(self, model_source, tmp_path):
+        """Test a newly published version replaces the loaded one"""
+        registry = ModelRegistry(str(tmp_path / "registry"))
+        registry.publish(model_source("v1", "one"), version="v1")
+        swaps = []
+        holder = HotSwapModel(read_model, registry, None, on_swap=lambda: swaps.append(holder.version))
+        assert holder.get() == "one"
+
+        registry.publish(model_source("v2", "two"), version="v2")
+        assert holder.check_for_update() is True
+        assert holder.get() == "two"
+        assert holder.version == "v2"
+        assert swaps == ["v2"]
+        assert holder.check_for_update() is False
+
+    def test_old_version_released_after_in_flight_requests(self, model_source, tmp_path):
+        """Test a swap during a request keeps the old model until its lease ends"""
+        registry = ModelRegistry(str(tmp_path / "registry"))
+        registry.publish(model_source("v1", "one"), version="v1")
+        holder = HotSwapModel(read_model, registry, None)
+
+        with holder.lease() as model:
+            old_handle = holder._handle
+            registry.publish(model_source("v2", "two"), version="v2")
+            holder.check_for_update()
+            assert model == "one"
+            assert old_handle.model == "one"
+            assert holder.get() == "two"
+        assert old_handle.model is None
+
+    def test_broken_version_keeps_current_model(self, model_source, tmp_path):
+        """Test a version failing verification is not swapped in"""
+        registry = ModelRegistry(str(tmp_path / "registry"))
+        registry.publish(model_source("v1", "one"), version="v1")
+        holder = HotSwapModel(read_model, registry, None)
+        holder.get()
+        registry.publish(model_source("v2", "two"), version="v2")
+        with open(os.path.join(registry.version_dir("v2"), "model.txt"), "w") as f:
+            f.write("corrupted")
+
+        with pytest.raises(ModelIntegrityError):
+            holder.check_for_update()
+        assert holder.get() == "one"
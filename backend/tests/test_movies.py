@@ -16,6 +16,9 @@ sys.path.append(backend_dir)
 from main import app
 from backend.movies import models, services, schema
 from backend.auth.models import User
+from backend.ml.recommender import PlaylistRecommendationCache
+from backend.serialization import trusted_response
+import json
 from pydantic import HttpUrl
 
 client = TestClient(app)
@@ -230,7 +233,7 @@ class TestMovieServices:
             Mock(title="Movie 1", id=1),
             Mock(title="Movie 2", id=2)
         ]
-        mock_database.query.return_value.filter.return_value.all.return_value = mock_movies
+        mock_database.query.return_value.join.return_value.filter.return_value.all.return_value = mock_movies
 
         result = await services.get_movie_listing(mock_database, mock_user.id)
         
@@ -264,6 +267,7 @@ class TestMovieServices:
         """Test successful movie deletion"""
         mock_movie = Mock(id=1, title="Test Movie")
         mock_database.query.return_value.filter_by.return_value.first.return_value = mock_movie
+        mock_database.query.return_value.filter.return_value.all.return_value = []
         mock_database.query.return_value.filter.return_value.delete.return_value = None
         mock_database.commit = Mock()
 
@@ -314,6 +318,45 @@ class TestMovieServices:
         assert exc_info.value.status_code == status.HTTP_400_BAD_REQUEST
         assert "up to 10 playlists" in exc_info.value.detail
 
+    @pytest.mark.asyncio
+    async def test_get_playlist_recommendations_success(self, mock_user, mock_database):
+        """Test playlist recommendations come from the content recommender"""
+        mock_database.query.return_value.filter_by.return_value.first.return_value = Mock(id=7)
+        mock_database.query.return_value.join.return_value.filter.return_value.all.return_value = [("Heat",)]
+        mock_recommend = Mock(return_value=[("Ronin", 0.8), ("Collateral", 0.6)])
+
+        with patch('backend.movies.services.recommend_titles', mock_recommend), \
+             patch('backend.movies.services.recommendation_cache', PlaylistRecommendationCache()):
+            result = await services.get_playlist_recommendations(7, mock_user, mock_database, 2)
+            cached = await services.get_playlist_recommendations(7, mock_user, mock_database, 2)
+
+        assert result == [{"title": "Ronin", "score": 0.8}, {"title": "Collateral", "score": 0.6}]
+        assert cached == result
+        mock_recommend.assert_called_once_with(["Heat"], 2)
+
+    @pytest.mark.asyncio
+    async def test_get_playlist_recommendations_not_found(self, mock_user, mock_database):
+        """Test recommendations for a playlist the user does not own"""
+        mock_database.query.return_value.filter_by.return_value.first.return_value = None
+
+        with pytest.raises(HTTPException) as exc_info:
+            await services.get_playlist_recommendations(999, mock_user, mock_database)
+
+        assert exc_info.value.status_code == status.HTTP_404_NOT_FOUND
+
+    @pytest.mark.asyncio
+    async def test_get_playlist_recommendations_model_missing(self, mock_user, mock_database):
+        """Test recommendations when the model has not been trained"""
+        mock_database.query.return_value.filter_by.return_value.first.return_value = Mock(id=7)
+        mock_database.query.return_value.join.return_value.filter.return_value.all.return_value = [("Heat",)]
+
+        with patch('backend.movies.services.recommend_titles', side_effect=FileNotFoundError), \
+             patch('backend.movies.services.recommendation_cache', PlaylistRecommendationCache()):
+            with pytest.raises(HTTPException) as exc_info:
+                await services.get_playlist_recommendations(7, mock_user, mock_database)
+
+        assert exc_info.value.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+
 # Integration Tests (commented out as they require full app setup)
 class TestMovieEndpoints:
     def test_movie_endpoints_exist(self):
@@ -327,6 +370,98 @@ class TestMovieEndpoints:
         routes = [route.path for route in app.routes]
         assert "/api/playlists/" in routes or any("/api/playlists" in route for route in routes)
 
+# Conditional GET Tests
+@pytest.fixture
+def listing_client(mock_user, mock_database):
+    """Client whose requests run as mock_user against mock_database."""
+    from backend import db
+    from backend.auth.jwt import get_current_user
+    mock_user.id = 1
+    app.dependency_overrides[db.get_db] = lambda: mock_database
+    app.dependency_overrides[get_current_user] = lambda: mock_user
+    yield client
+    app.dependency_overrides.clear()
+
+
+class TestListingETags:
+    def test_listing_carries_version_etag(self, listing_client, mock_database):
+        """Test listings are tagged with the owner's collection version"""
+        mock_database.query.return_value.filter.return_value.scalar.return_value = 4
+        mock_database.query.return_value.filter.return_value.all.return_value = []
+
+        response = listing_client.get("/api/playlists/")
+
+        assert response.status_code == 200
+        assert response.headers["etag"] == '"playlists-1-4"'
+        assert response.headers["cache-control"] == "private, no-cache"
+
+    def test_unchanged_listing_is_not_modified(self, listing_client, mock_database):
+        """Test a matching If-None-Match answers 304 without querying the rows"""
+        mock_database.query.return_value.filter.return_value.scalar.return_value = 4
+
+        response = listing_client.get("/api/movies/", headers={"If-None-Match": 'W/"movies-1-4"'})
+
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["etag"] == '"movies-1-4"'
+        mock_database.query.return_value.filter.return_value.all.assert_not_called()
+
+    def test_stale_etag_gets_full_listing(self, listing_client, mock_database):
+        """Test an ETag from before a write is answered with the new listing"""
+        mock_database.query.return_value.filter.return_value.scalar.return_value = 5
+        mock_database.query.return_value.join.return_value.filter.return_value.all.return_value = []
+
+        response = listing_client.get("/api/movies/", headers={"If-None-Match": '"movies-1-4"'})
+
+        assert response.status_code == 200
+        assert response.headers["etag"] == '"movies-1-5"'
+
+    @pytest.mark.asyncio
+    async def test_writes_bump_collection_version(self, mock_user, mock_database):
+        """Test writes bump the owner's version in the same transaction"""
+        mock_database.query.return_value.filter_by.return_value.first.return_value = Mock(id=1)
+        mock_database.query.return_value.filter.return_value.all.return_value = []
+
+        await services.delete_movie_by_id(1, mock_user, mock_database)
+
+        mock_database.query.return_value.filter.return_value.update.assert_called_once()
+        mock_database.commit.assert_called_once()
+
+
+# Lean Serialization Tests
+class TestLeanSerialization:
+    @pytest.mark.asyncio
+    async def test_movie_listing_matches_response_model(self, mock_user, mock_database):
+        """Test the unvalidated listing renders exactly as the response_model would"""
+        row = Mock(year="2008", title="Iron Man", imdbID="tt0371746", type="movie",
+                   poster="https://example.com/iron-man.jpg", id=1,
+                   createdDate=datetime(2024, 1, 1, 12, 30, 15, 250000), owner_id=1,
+                   username="testuser", email="test@example.com")
+        mock_database.query.return_value.join.return_value.filter.return_value.all.return_value = [row]
+
+        result = await services.get_movie_listing(mock_database, 1)
+
+        validated = [schema.MovieList.model_validate(item).model_dump(mode="json") for item in result]
+        assert json.loads(trusted_response(result).body) == validated
+
+    def test_user_listing_groups_movies_by_owner(self, mock_database):
+        """Test the user listing loads every user's movies in a single query"""
+        from backend.users import services as user_services
+        users = [Mock(id=1, **{"_asdict.return_value": {"id": 1, "username": "a"}}),
+                 Mock(id=2, **{"_asdict.return_value": {"id": 2, "username": "b"}})]
+        movies = [Mock(**{"_asdict.return_value": {"id": 9, "title": "Heat", "owner_id": 2}})]
+        mock_database.query.return_value.all.return_value = users
+        mock_database.query.return_value.__iter__ = Mock(return_value=iter(movies))
+
+        result = asyncio.run(user_services.get_user_listing(mock_database))
+
+        assert result == [
+            {"id": 1, "username": "a", "movies": []},
+            {"id": 2, "username": "b", "movies": [{"id": 9, "title": "Heat"}]},
+        ]
+        assert mock_database.query.call_count == 2
+
+
 # Utility Tests
 class TestMovieUtilities:
     def test_poster_url_conversion(self):
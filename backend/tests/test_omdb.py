@@ -0,0 +1,193 @@
+import pytest
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import httpx
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+# Get the directory one level above the 'tests' directory
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Add this directory to Python's sys.path
+sys.path.append(backend_dir)
+
+from backend.db import Base
+from backend.omdb import services, stub
+from backend.omdb.models import OmdbResponse
+from backend.omdb.services import DatabaseCache, OmdbClient
+
+
+@pytest.fixture
+def session_factory():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine)
+
+
+@pytest.fixture
+def upstream():
+    stub.app.state.requests = 0
+    stub.app.state.delay = 0.0
+    yield stub.app
+    stub.app.state.delay = 0.0
+
+
+def make_client(session_factory, api_key=stub.STUB_API_KEY, transport=None):
+    return OmdbClient(
+        base_url="http://omdb.test/",
+        api_key=api_key,
+        shared=DatabaseCache(session_factory),
+        transport=transport or httpx.ASGITransport(app=stub.app),
+    )
+
+
+# OMDb Proxy Tests
+class TestOmdbClient:
+    @pytest.mark.asyncio
+    async def test_search_is_cached(self, session_factory, upstream):
+        """Test a repeated search is answered without calling OMDb"""
+        client = make_client(session_factory)
+        first = await client.search("batman")
+        second = await client.search("  BATMAN ")
+        await client.close()
+
+        assert first == second
+        assert first["Response"] == "True"
+        assert len(first["Search"]) == 9
+        assert first["totalResults"] == "9"
+        assert upstream.state.requests == 1
+
+    @pytest.mark.asyncio
+    async def test_identical_lookups_in_flight_are_coalesced(self, session_factory, upstream):
+        """Test concurrent identical lookups share one upstream call"""
+        upstream.state.delay = 0.1
+        client = make_client(session_factory)
+        results = await asyncio.gather(*(client.title("tt0468569") for _ in range(20)))
+        await client.close()
+
+        assert all(result["Title"] == "The Dark Knight" for result in results)
+        assert upstream.state.requests == 1
+        assert len(client.in_flight) == 0
+
+    @pytest.mark.asyncio
+    async def test_database_tier_is_shared(self, session_factory, upstream):
+        """Test another worker (or a restarted one) is answered from the table"""
+        first = make_client(session_factory)
+        await first.title("tt0372784", plot="full")
+        await first.close()
+
+        second = make_client(session_factory)
+        result = await second.title("tt0372784", plot="full")
+        await second.close()
+
+        assert result["Title"] == "Batman Begins"
+        assert upstream.state.requests == 1
+        with session_factory() as database:
+            assert database.query(OmdbResponse).count() == 1
+
+    @pytest.mark.asyncio
+    async def test_expired_entries_are_fetched_again(self, session_factory, upstream):
+        """Test a row past its expiry is a miss"""
+        client = make_client(session_factory)
+        await client.title("tt0096895")
+        with session_factory() as database:
+            database.query(OmdbResponse).update({"expires_at": datetime.now() - timedelta(seconds=1)})
+            database.commit()
+        client.cache.local.clear()
+
+        await client.title("tt0096895")
+        await client.close()
+        assert upstream.state.requests == 2
+
+    @pytest.mark.asyncio
+    async def test_expired_rows_are_deleted(self, session_factory):
+        """Test writes delete expired rows, at most once per prune interval"""
+        cache = DatabaseCache(session_factory, prune_interval=3600)
+        with session_factory() as database:
+            database.add(OmdbResponse(key="old", body="{}", expires_at=datetime.now() - timedelta(seconds=1)))
+            database.commit()
+
+        await cache.set("fresh", "{}")
+        with session_factory() as database:
+            assert [row.key for row in database.query(OmdbResponse)] == ["fresh"]
+            database.add(OmdbResponse(key="old", body="{}", expires_at=datetime.now() - timedelta(seconds=1)))
+            database.commit()
+
+        await cache.set("newer", "{}")
+        with session_factory() as database:
+            assert database.query(OmdbResponse).count() == 3
+
+    @pytest.mark.asyncio
+    async def test_not_found_answers_are_cached(self, session_factory, upstream):
+        """Test OMDb's "Response": "False" answers are kept like the others"""
+        client = make_client(session_factory)
+        first = await client.search("no such movie")
+        await client.search("no such movie")
+        await client.close()
+
+        assert first == {"Response": "False", "Error": "Movie not found!"}
+        assert upstream.state.requests == 1
+
+    @pytest.mark.asyncio
+    async def test_upstream_errors_are_not_cached(self, session_factory, upstream):
+        """Test an invalid key is reported as a bad gateway and retried next time"""
+        client = make_client(session_factory, api_key="wrong")
+        for _ in range(2):
+            with pytest.raises(HTTPException) as error:
+                await client.title("tt0468569")
+            assert error.value.status_code == 502
+        await client.close()
+
+        assert upstream.state.requests == 2
+        with session_factory() as database:
+            assert database.query(OmdbResponse).count() == 0
+
+    @pytest.mark.asyncio
+    async def test_timeout_is_a_gateway_timeout(self, session_factory):
+        """Test an OMDb call that times out answers 504"""
+        def timeout(request):
+            raise httpx.ReadTimeout("timed out", request=request)
+
+        client = make_client(session_factory, transport=httpx.MockTransport(timeout))
+        with pytest.raises(HTTPException) as error:
+            await client.search("batman")
+        await client.close()
+        assert error.value.status_code == 504
+
+    @pytest.mark.asyncio
+    async def test_missing_api_key(self, session_factory, upstream):
+        """Test lookups are refused without calling OMDb when no key is configured"""
+        client = make_client(session_factory, api_key=None)
+        with pytest.raises(HTTPException) as error:
+            await client.search("batman")
+        assert error.value.status_code == 503
+        assert upstream.state.requests == 0
+
+
+# OMDb Endpoint Tests
+class TestOmdbEndpoints:
+    @pytest.mark.asyncio
+    async def test_search_and_title_endpoints(self, session_factory, upstream):
+        """Test the proxy endpoints answer with OMDb's documents"""
+        from main import app
+
+        client = make_client(session_factory)
+        with patch.object(services, "omdb_client", client):
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as http:
+                search = await http.get("/api/omdb/search", params={"s": "iron man", "y": 2010})
+                title = await http.get("/api/omdb/title/tt0371746")
+                invalid = await http.get("/api/omdb/title/not-an-id")
+        await client.close()
+
+        assert search.status_code == 200
+        assert [movie["Title"] for movie in search.json()["Search"]] == ["Iron Man 2"]
+        assert search.headers["cache-control"].startswith("public")
+        assert title.status_code == 200
+        assert title.json()["Director"] == "Jon Favreau"
+        assert invalid.status_code == 422
+        assert upstream.state.requests == 2
@@ -0,0 +1,304 @@
+import pytest
+import pytest_asyncio
+import asyncio
+import io
+import multiprocessing
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from unittest.mock import patch
+
+import httpx
+from fastapi import HTTPException
+from PIL import Image
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+# Get the directory one level above the 'tests' directory
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Add this directory to Python's sys.path
+sys.path.append(backend_dir)
+
+from backend import db
+from backend.auth.models import User
+from backend.movies.models import Movie
+from backend.posters import router as posters_router, services
+from backend.posters.services import PosterStore
+
+
+def jpeg(width, height, color=(200, 30, 30)):
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), color).save(buffer, "JPEG")
+    return buffer.getvalue()
+
+
+POSTER = jpeg(1000, 1500)
+SMALL_POSTER = jpeg(200, 300, color=(30, 30, 200))
+
+
+class PosterHost:
+    """Remote poster host answering from a dict of path -> (status, content type, body)."""
+
+    def __init__(self):
+        self.requests = []
+        self.connections = []
+        self.delay = 0.0
+        self.files = {
+            "/a.jpg": (200, "image/jpeg", POSTER),
+            "/same-as-a.jpg": (200, "image/jpeg", POSTER),
+            "/small.jpg": (200, "image/jpeg", SMALL_POSTER),
+            "/page.html": (200, "text/html", b"<html></html>"),
+            "/broken.jpg": (200, "image/jpeg", b"not really a jpeg"),
+            "/untyped.jpg": (200, None, POSTER),
+            "/moved.jpg": (302, "https://img.test/a.jpg", b""),
+            "/relative.jpg": (302, "/small.jpg", b""),
+            "/to-internal.jpg": (302, "http://internal.img.test:9200/", b""),
+            "/loop.jpg": (302, "https://img.test/loop.jpg", b""),
+        }
+
+    async def __call__(self, request):
+        self.requests.append(request.url.path)
+        self.connections.append(
+            (request.url.host, request.headers["host"], request.extensions.get("sni_hostname"))
+        )
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        status_code, header, body = self.files.get(request.url.path, (404, "text/plain", b"missing"))
+        if status_code == 302:
+            return httpx.Response(status_code, headers={"location": header})
+        return httpx.Response(status_code, headers={"content-type": header} if header else {}, content=body)
+
+
+# img.test is public; hosts under internal.img.test resolve to a private address
+async def resolve(host, port):
+    return ["10.0.0.5"] if host.startswith("internal.") else ["93.184.216.34"]
+
+
+@pytest.fixture(scope="module")
+def executor():
+    pool = ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context("spawn"))
+    yield pool
+    pool.shutdown()
+
+
+@pytest.fixture
+def host():
+    return PosterHost()
+
+
+@pytest_asyncio.fixture
+async def store(tmp_path, executor, host):
+    store = PosterStore(tmp_path, executor=executor, transport=httpx.MockTransport(host),
+                        allowed_hosts=("img.test",), resolve=resolve)
+    yield store
+    store._executor = None  # the module's pool outlives the store
+    await store.close()
+
+
+# Poster Store Tests
+class TestPosterStore:
+    @pytest.mark.asyncio
+    async def test_variants_are_rendered_once(self, store, host):
+        """Test the first request renders every variant and later ones use the disk"""
+        sizes = {}
+        for variant in ("thumbnail", "grid", "detail"):
+            _, path = await store.variant("https://img.test/a.jpg", variant)
+            with Image.open(path) as image:
+                sizes[variant] = image.size
+                assert image.format == "JPEG"
+
+        assert sizes == {"thumbnail": (92, 138), "grid": (300, 450), "detail": (600, 900)}
+        _, grid = await store.variant("https://img.test/a.jpg", "grid")
+        assert grid.stat().st_size < len(POSTER)
+        assert host.requests == ["/a.jpg"]
+
+    @pytest.mark.asyncio
+    async def test_variants_are_never_upscaled(self, store):
+        """Test a poster narrower than a variant keeps its own width"""
+        _, path = await store.variant("https://img.test/small.jpg", "detail")
+        with Image.open(path) as image:
+            assert image.size == (200, 300)
+
+    @pytest.mark.asyncio
+    async def test_identical_images_are_stored_once(self, store, tmp_path):
+        """Test two URLs serving the same bytes share one original and its variants"""
+        first, first_path = await store.variant("https://img.test/a.jpg", "grid")
+        second, second_path = await store.variant("https://img.test/same-as-a.jpg", "grid")
+
+        assert first == second and first_path == second_path
+        assert len(list((tmp_path / "originals").rglob("*"))) == 2  # one shard directory, one file
+
+    @pytest.mark.asyncio
+    async def test_files_are_written_off_the_event_loop(self, store):
+        """Test the original and the URL index are written by worker threads"""
+        writers = []
+        write = services._write_atomically
+
+        def record_writer(path, data):
+            writers.append(threading.get_ident())
+            write(path, data)
+
+        with patch.object(services, "_write_atomically", record_writer):
+            await store.variant("https://img.test/a.jpg", "grid")
+        assert len(writers) == 2
+        assert threading.get_ident() not in writers
+
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_share_one_download(self, store, host):
+        """Test a burst of requests for a new poster fetches it once"""
+        host.delay = 0.05
+        results = await asyncio.gather(*(store.variant("https://img.test/a.jpg", "grid") for _ in range(10)))
+        assert len({digest for digest, _ in results}) == 1
+        assert host.requests == ["/a.jpg"]
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("path", ["/missing.jpg", "/page.html", "/broken.jpg", "/untyped.jpg"])
+    async def test_failures_are_not_retried_immediately(self, store, host, path):
+        """Test unavailable, non-image and undecodable posters answer 502 without refetching"""
+        for _ in range(2):
+            with pytest.raises(HTTPException) as error:
+                await store.variant(f"https://img.test{path}", "grid")
+            assert error.value.status_code == 502
+        assert host.requests == [path]
+
+    @pytest.mark.asyncio
+    async def test_oversized_posters_are_refused(self, store):
+        """Test a download stops past POSTER_MAX_BYTES"""
+        with patch.object(services, "POSTER_MAX_BYTES", 1000):
+            with pytest.raises(HTTPException) as error:
+                await store.variant("https://img.test/a.jpg", "grid")
+        assert error.value.detail == "The poster is too large."
+
+    @pytest.mark.asyncio
+    async def test_redirects_are_followed(self, store, host):
+        """Test a redirect to an allowed public host is followed"""
+        digest, _ = await store.variant("https://img.test/moved.jpg", "grid")
+        assert digest == services._sha256(POSTER)
+        assert host.requests == ["/moved.jpg", "/a.jpg"]
+
+        await store.variant("https://img.test/relative.jpg", "grid")
+        assert host.requests[2:] == ["/relative.jpg", "/small.jpg"]
+        assert host.connections[-1] == ("93.184.216.34", "img.test", "img.test")
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("url", [
+        "https://elsewhere.test/a.jpg",
+        "https://internal.img.test/a.jpg",
+        "http://127.0.0.1:9200/a.jpg",
+        "file:///etc/passwd",
+        "https://img.test/to-internal.jpg",
+    ])
+    async def test_internal_hosts_are_never_fetched(self, store, host, url):
+        """Test hosts outside the allowlist or resolving to private addresses are refused, on every hop"""
+        with pytest.raises(HTTPException) as error:
+            await store.variant(url, "grid")
+        assert error.value.status_code == 502
+        assert error.value.detail == "The poster host is not allowed."
+        assert all(path == "/to-internal.jpg" for path in host.requests)
+
+    @pytest.mark.asyncio
+    async def test_private_addresses_are_refused_without_an_allowlist(self, store):
+        """Test an empty allowlist still refuses loopback, private and link-local addresses"""
+        store.allowed_hosts = ()
+        store.resolve = services._resolve
+        for url in ("http://localhost/a.jpg", "http://169.254.169.254/latest/meta-data", "http://[::1]/a.jpg"):
+            with pytest.raises(HTTPException) as error:
+                await store.variant(url, "grid")
+            assert error.value.detail == "The poster host is not allowed."
+
+    @pytest.mark.asyncio
+    async def test_connection_goes_to_the_checked_address(self, store, host):
+        """Test a host rebinding to a private address after the check is still reached at the checked one"""
+        answers = iter([["93.184.216.34"], ["10.0.0.5"]])
+
+        async def rebinding(host_name, port):
+            return next(answers)
+
+        store.allowed_hosts = ()
+        store.resolve = rebinding
+        await store.variant("https://img.test:8443/a.jpg", "grid")
+        assert host.connections == [("93.184.216.34", "img.test:8443", "img.test")]
+
+    @pytest.mark.asyncio
+    async def test_redirect_loops_give_up(self, store, host):
+        """Test a host redirecting forever is given up on after POSTER_MAX_REDIRECTS hops"""
+        with pytest.raises(HTTPException) as error:
+            await store.variant("https://img.test/loop.jpg", "grid")
+        assert error.value.detail == "The poster host redirected too many times."
+        assert len(host.requests) == services.POSTER_MAX_REDIRECTS + 1
+
+
+# Poster Endpoint Tests
+class TestPosterEndpoint:
+    @pytest_asyncio.fixture
+    async def client(self, store):
+        from main import app
+
+        engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        db.Base.metadata.create_all(engine)
+        session_factory = sessionmaker(bind=engine)
+        with session_factory() as database:
+            user = User(username="poster", email="poster@example.com", role="user", password="x")
+            database.add(user)
+            database.flush()
+            for movie_id, poster in ((1, "https://img.test/a.jpg"), (2, "N/A")):
+                database.add(Movie(id=movie_id, title=f"Movie {movie_id}", imdbID=f"tt000000{movie_id}",
+                                   poster=poster, owner_id=user.id, createdDate=datetime(2024, 1, 1)))
+            database.commit()
+
+        def get_db():
+            with session_factory() as database:
+                yield database
+
+        app.dependency_overrides[db.get_db] = get_db
+        with patch.object(services, "poster_store", store):
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as http:
+                yield http
+        app.dependency_overrides.clear()
+
+    @pytest.mark.asyncio
+    async def test_poster_is_served_with_long_lived_headers(self, client):
+        """Test a variant is served as a JPEG browsers may keep"""
+        response = await client.get("/api/posters/1", params={"size": "thumbnail"})
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "image/jpeg"
+        assert response.headers["cache-control"].startswith("public, max-age=")
+        assert response.headers["accept-ranges"] == "bytes"
+        with Image.open(io.BytesIO(response.content)) as image:
+            assert image.size == (92, 138)
+
+    @pytest.mark.asyncio
+    async def test_range_and_conditional_requests(self, client):
+        """Test byte ranges answer 206 and a matching ETag answers 304"""
+        full = await client.get("/api/posters/1")
+        partial = await client.get("/api/posters/1", headers={"Range": "bytes=0-99"})
+        assert partial.status_code == 206
+        assert partial.headers["content-range"] == f"bytes 0-99/{len(full.content)}"
+        assert partial.content == full.content[:100]
+
+        cached = await client.get("/api/posters/1", headers={"If-None-Match": full.headers["etag"]})
+        assert cached.status_code == 304
+        assert cached.content == b""
+        other_size = await client.get("/api/posters/1", params={"size": "detail"},
+                                      headers={"If-None-Match": full.headers["etag"]})
+        assert other_size.status_code == 200
+
+    @pytest.mark.asyncio
+    async def test_accel_redirect(self, client, store):
+        """Test a fronting nginx is told which file to send"""
+        with patch.object(posters_router, "POSTER_ACCEL_REDIRECT", "/internal/posters/"):
+            response = await client.get("/api/posters/1")
+        digest, _ = await store.variant("https://img.test/a.jpg", "grid")
+        assert response.status_code == 200
+        assert response.content == b""
+        assert response.headers["x-accel-redirect"] == f"/internal/posters/variants/{digest[:2]}/{digest}-grid.jpg"
+
+    @pytest.mark.asyncio
+    async def test_missing_posters(self, client):
+        """Test movies without a poster, unknown movies and unknown sizes"""
+        assert (await client.get("/api/posters/2")).status_code == 404
+        assert (await client.get("/api/posters/99")).status_code == 404
+        assert (await client.get("/api/posters/1", params={"size": "huge"})).status_code == 422
@@ -0,0 +1,192 @@
+import pytest
+import os
+import sys
+from unittest.mock import AsyncMock, Mock, patch
+
+# Get the directory one level above the 'tests' directory
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Add this directory to Python's sys.path
+sys.path.append(backend_dir)
+
+from backend import elastic, kafkaConnection, server
+from backend.rabbitMQ import rabbitmq_manager
+
+
+@pytest.fixture
+def state_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv(server.SERVER_STATE_DIR_ENV, str(tmp_path))
+    return tmp_path
+
+
+class FakeProcess:
+    """Stands in for a uvicorn worker process; `ready` workers report they serve."""
+
+    next_pid = 1000
+
+    def __init__(self, ready=True):
+        FakeProcess.next_pid += 1
+        self.pid = FakeProcess.next_pid
+        self.ready = ready
+        self.process = Mock(is_alive=Mock(return_value=ready))
+        self.terminated = False
+
+    def start(self):
+        if self.ready:
+            server.ready_path(self.pid).touch()
+
+    def terminate(self):
+        self.terminated = True
+
+    def join(self):
+        pass
+
+
+def supervisor(workers):
+    config = Mock(workers=workers)
+    # Multiprocess installs its signal handlers on construction
+    with patch("uvicorn.supervisors.multiprocess.signal.signal"):
+        supervisor = server.Supervisor(config, target=Mock(), sockets=[], reload_timeout=1)
+    supervisor.processes = [FakeProcess() for _ in range(workers)]
+    for process in supervisor.processes:
+        process.start()
+    return supervisor
+
+
+# Worker Sizing Tests
+class TestWorkerSizing:
+    def test_cpu_quota_caps_the_core_count(self, tmp_path):
+        """Test a cgroup quota of two CPUs caps the count at two"""
+        cpu_max = tmp_path / "cpu.max"
+        cpu_max.write_text("150000 100000\n")
+        with patch("backend.server.os.sched_getaffinity", return_value=set(range(8))):
+            assert server.cpu_count(cpu_max) == 2
+
+    def test_unlimited_quota_uses_the_affinity(self, tmp_path):
+        """Test without a quota (or a cgroup file) every usable core counts"""
+        cpu_max = tmp_path / "cpu.max"
+        cpu_max.write_text("max 100000\n")
+        with patch("backend.server.os.sched_getaffinity", return_value={0, 1, 2}):
+            assert server.cpu_count(cpu_max) == 3
+            assert server.cpu_count(tmp_path / "missing") == 3
+
+    def test_web_concurrency_overrides_the_core_count(self, monkeypatch):
+        """Test WEB_CONCURRENCY sets the number of workers"""
+        monkeypatch.setenv("WEB_CONCURRENCY", "5")
+        assert server.default_workers() == 5
+        monkeypatch.delenv("WEB_CONCURRENCY")
+        with patch("backend.server.cpu_count", return_value=3):
+            assert server.default_workers() == 3
+
+    def test_config_uses_uvloop_and_httptools(self):
+        """Test the workers run uvloop and httptools and shut down gracefully"""
+        config = server.build_config(workers=4)
+        assert config.app == "main:app"
+        assert config.workers == 4
+        assert config.loop == "uvloop"
+        assert config.http == "httptools"
+        assert config.timeout_graceful_shutdown == server.SERVER_GRACEFUL_TIMEOUT
+        assert config.callback_notify is server.notify_ready
+
+
+# Rolling Reload Tests
+class TestRollingReload:
+    @pytest.mark.asyncio
+    async def test_worker_reports_ready(self, state_dir):
+        """Test a worker marks itself as serving once started"""
+        await server.notify_ready()
+        assert server.ready_path(os.getpid()).exists()
+
+    def test_reload_replaces_every_worker(self, state_dir):
+        """Test each worker is stopped only once its replacement serves"""
+        manager = supervisor(3)
+        old = list(manager.processes)
+        with patch("backend.server.Process", side_effect=lambda *args: FakeProcess()):
+            manager.restart_all()
+        assert all(process.terminated for process in old)
+        assert {process.pid for process in manager.processes}.isdisjoint(p.pid for p in old)
+        assert not any(server.ready_path(process.pid).exists() for process in old)
+
+    def test_failed_replacement_keeps_the_old_worker(self, state_dir):
+        """Test a replacement that never serves is discarded"""
+        manager = supervisor(2)
+        old = list(manager.processes)
+        broken = FakeProcess(ready=False)
+        with patch("backend.server.Process", side_effect=[broken, FakeProcess()]):
+            manager.restart_all()
+        assert broken.terminated
+        assert manager.processes[0] is old[0] and not old[0].terminated
+        assert manager.processes[1] is not old[1] and old[1].terminated
+
+    @pytest.mark.parametrize("workers", [1, 4])
+    def test_workers_always_run_supervised(self, state_dir, workers):
+        """Test even a single worker runs under the supervisor, so SIGHUP reloads it"""
+        config = Mock(workers=workers)
+        with patch.object(server, "build_config", return_value=config), \
+                patch.object(server, "prepare_state_dirs"), \
+                patch.object(server.uvicorn, "Server") as uvicorn_server, \
+                patch.object(server, "Supervisor") as supervisor_class:
+            server.main()
+        supervisor_class.assert_called_once_with(
+            config, target=uvicorn_server.return_value.run, sockets=[config.bind_socket.return_value]
+        )
+        supervisor_class.return_value.run.assert_called_once()
+        uvicorn_server.return_value.run.assert_not_called()
+
+    def test_dead_worker_metrics_are_dropped(self, state_dir):
+        """Test the live gauges of a replaced worker are marked dead"""
+        manager = supervisor(1)
+        old = manager.processes[0]
+        with patch("backend.server.Process", side_effect=lambda *args: FakeProcess()), \
+             patch("backend.metrics.mark_process_dead") as mark_process_dead:
+            manager.restart_all()
+        mark_process_dead.assert_called_once_with(old.pid)
+
+    def test_stale_metric_files_are_cleared(self, state_dir, tmp_path, monkeypatch):
+        """Test files from a previous run are removed from PROMETHEUS_MULTIPROC_DIR"""
+        metrics_dir = tmp_path / "metrics"
+        metrics_dir.mkdir()
+        (metrics_dir / "counter_123.db").write_bytes(b"stale")
+        monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(metrics_dir))
+        monkeypatch.setenv(server.SERVER_STATE_DIR_ENV, "")
+        server.prepare_state_dirs(workers=4)
+        assert list(metrics_dir.iterdir()) == []
+        assert os.path.isdir(os.environ[server.SERVER_STATE_DIR_ENV])
+
+
+# Fork Safety Tests
+class TestForkSafety:
+    @pytest.mark.skipif(not hasattr(os, "fork"), reason="needs os.fork")
+    def test_forked_worker_drops_inherited_clients(self):
+        """Test a forked process does not reuse the parent's connections"""
+        with patch.object(elastic, "es_client", Mock()), \
+             patch.object(kafkaConnection, "kafka_connection", Mock()), \
+             patch.object(rabbitmq_manager, "connection", Mock()), \
+             patch.object(rabbitmq_manager, "channel", Mock()):
+            read_end, write_end = os.pipe()
+            pid = os.fork()
+            if pid == 0:
+                dropped = (
+                    elastic.es_client is None
+                    and not elastic.connected_client
+                    and kafkaConnection.kafka_connection is None
+                    and rabbitmq_manager.connection is None
+                    and rabbitmq_manager.channel is None
+                )
+                os.write(write_end, b"1" if dropped else b"0")
+                os._exit(0)
+            os.close(write_end)
+            result = os.read(read_end, 1)
+            os.close(read_end)
+            os.waitpid(pid, 0)
+            # The parent keeps its own
+            assert elastic.es_client is not None
+        assert result == b"1"
+
+    @pytest.mark.asyncio
+    async def test_connected_client_follows_the_connection(self):
+        """Test modules importing the client see the one connected later"""
+        assert not elastic.connected_client
+        client = Mock(index=AsyncMock(return_value={"result": "created"}))
+        with patch.object(elastic, "es_client", client):
+            assert elastic.connected_client
+            assert await elastic.connected_client.index(index="movies") == {"result": "created"}
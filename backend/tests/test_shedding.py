@@ -0,0 +1,119 @@
+import pytest
+import asyncio
+import os
+import sys
+import threading
+import time
+from unittest.mock import patch
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import create_engine
+
+# Get the directory one level above the 'tests' directory
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Add this directory to Python's sys.path
+sys.path.append(backend_dir)
+
+from backend import db
+from backend.shedding import LoadShedMiddleware, LoopLagMonitor, SmoothedSignal, shed_probability
+
+
+class FixedSignal:
+    def __init__(self, value=0.0):
+        self._value = value
+
+    def value(self, now=None):
+        return self._value
+
+
+def shedding_app(lag=0.0, wait=0.0):
+    app = FastAPI()
+
+    @app.get("/")
+    async def root():
+        return {"ok": True}
+
+    @app.get("/readyz")
+    async def readyz():
+        return {"ok": True}
+
+    app.add_middleware(
+        LoadShedMiddleware, lag=FixedSignal(lag), wait=FixedSignal(wait),
+        loop_lag_threshold=0.1, pool_wait_threshold=0.25, enabled=True,
+    )
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+# Overload Signal Tests
+class TestSignals:
+    def test_signal_decays_without_samples(self):
+        """Test a stale overload fades instead of shedding forever"""
+        signal = SmoothedSignal(weight=1.0, half_life=1.0)
+        with patch("backend.shedding.time.monotonic", return_value=10.0):
+            signal.observe(0.8)
+        assert signal.value(now=10.0) == pytest.approx(0.8)
+        assert signal.value(now=12.0) == pytest.approx(0.2)
+
+    def test_shed_probability_grows_with_the_excess(self):
+        """Test nothing is shed under the threshold and everything at twice it"""
+        assert shed_probability(0.05, 0.1) == 0.0
+        assert shed_probability(0.15, 0.1) == pytest.approx(0.5)
+        assert shed_probability(0.5, 0.1) == 1.0
+
+    @pytest.mark.asyncio
+    async def test_loop_monitor_sees_a_blocked_loop(self):
+        """Test a loop kept busy by blocking calls shows up as lag"""
+        monitor = LoopLagMonitor(interval=0.01)
+        monitor.start()
+        await asyncio.sleep(0.05)
+        for _ in range(5):
+            time.sleep(0.1)  # blocks the loop
+            await asyncio.sleep(0)
+        monitor.stop()
+        assert monitor.lag.value() > 0.05
+
+    def test_pool_checkout_wait_is_recorded(self):
+        """Test a checkout waiting for a busy pool feeds the pool wait signal"""
+        engine = create_engine("sqlite://", poolclass=db.TimedQueuePool, pool_size=1, max_overflow=0)
+        signal = SmoothedSignal(weight=1.0)
+        held = engine.connect()
+        threading.Timer(0.2, held.close).start()
+        with patch.object(db, "pool_wait", signal):
+            with engine.connect():
+                pass
+        assert signal.value() > 0.1
+        engine.dispose()
+
+
+# Load Shedding Middleware Tests
+class TestLoadShedMiddleware:
+    @pytest.mark.asyncio
+    async def test_requests_pass_under_the_thresholds(self):
+        """Test nothing is shed while the worker keeps up"""
+        async with shedding_app(lag=0.05, wait=0.1) as http:
+            assert {(await http.get("/")).status_code for _ in range(20)} == {200}
+
+    @pytest.mark.asyncio
+    async def test_overload_sheds_with_retry_after(self):
+        """Test requests are refused with 503 and Retry-After at twice the threshold"""
+        async with shedding_app(lag=1.4) as http:
+            response = await http.get("/")
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "2"
+
+    @pytest.mark.asyncio
+    async def test_partial_overload_sheds_a_share(self):
+        """Test a moderate pool wait sheds requests with the matching probability"""
+        async with shedding_app(wait=0.375) as http:  # 1.5x the threshold: p = 0.5
+            with patch("backend.shedding.random.random", side_effect=[0.2, 0.7]):
+                shed = await http.get("/")
+                kept = await http.get("/")
+        assert shed.status_code == 503
+        assert kept.status_code == 200
+
+    @pytest.mark.asyncio
+    async def test_probes_are_never_shed(self):
+        """Test readiness keeps answering while the worker sheds load"""
+        async with shedding_app(lag=5.0) as http:
+            assert (await http.get("/readyz")).status_code == 200
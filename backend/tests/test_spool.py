@@ -0,0 +1,177 @@
+import pytest
+import asyncio
+import os
+import sys
+from unittest.mock import AsyncMock, Mock, patch
+
+# Get the directory one level above the 'tests' directory
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Add this directory to Python's sys.path
+sys.path.append(backend_dir)
+
+from backend import kafkaConnection
+from backend.breaker import CircuitBreaker
+from backend.kafkaConnection import KafkaConnection
+from backend.spool import Spool, SpoolDrainer, read_segment
+
+
+class Publisher:
+    """Records published payloads; fails while `down` is set or at the `fail_at`-th call."""
+
+    def __init__(self, fail_at=None):
+        self.published = []
+        self.calls = 0
+        self.fail_at = fail_at
+        self.down = False
+
+    async def __call__(self, payload):
+        self.calls += 1
+        if self.down or self.calls == self.fail_at:
+            raise ConnectionError("broker down")
+        self.published.append(payload)
+
+
+@pytest.fixture
+def spool(tmp_path):
+    return Spool("events", directory=tmp_path, fsync_interval=0)
+
+
+async def append_all(spool, count, start=0):
+    for n in range(start, start + count):
+        await spool.append(b"event-%d" % n)
+
+
+# Segment Format Tests
+class TestSegments:
+    @pytest.mark.asyncio
+    async def test_records_round_trip(self, spool):
+        """Test appended records are read back in order with their end offsets"""
+        await append_all(spool, 3)
+        records, torn = read_segment(spool.segments()[0])
+
+        assert [payload for _, payload in records] == [b"event-0", b"event-1", b"event-2"]
+        assert not torn
+        assert read_segment(spool.segments()[0], records[0][0])[0] == records[1:]
+
+    @pytest.mark.asyncio
+    async def test_torn_and_corrupted_tails_are_detected(self, spool):
+        """Test a half-written or damaged frame ends the segment and keeps what precedes it"""
+        await append_all(spool, 2)
+        segment = spool.segments()[0]
+        data = segment.read_bytes()
+
+        segment.write_bytes(data[:-3])
+        records, torn = read_segment(segment)
+        assert [payload for _, payload in records] == [b"event-0"] and torn
+
+        segment.write_bytes(data[:-1] + b"X")
+        records, torn = read_segment(segment)
+        assert [payload for _, payload in records] == [b"event-0"] and torn
+
+    @pytest.mark.asyncio
+    async def test_concurrent_appends_share_fsyncs(self, tmp_path):
+        """Test appends made together are made durable by one batched fsync"""
+        spool = Spool("events", directory=tmp_path, fsync_interval=0.01)
+        with patch.object(Spool, "_fsync", wraps=Spool._fsync) as fsync:
+            await asyncio.gather(*(spool.append(b"event-%d" % n) for n in range(100)))
+        assert fsync.call_count == 1
+        assert len(read_segment(spool.segments()[0])[0]) == 100
+
+    @pytest.mark.asyncio
+    async def test_segments_roll_over(self, tmp_path):
+        """Test a full segment is sealed and appends continue in the next one"""
+        spool = Spool("events", directory=tmp_path, segment_bytes=40, fsync_interval=0)
+        await append_all(spool, 7)
+        segments = spool.segments()
+        assert [len(read_segment(segment)[0]) for segment in segments] == [3, 3, 1]
+
+    @pytest.mark.asyncio
+    async def test_each_process_claims_its_own_slot(self, tmp_path):
+        """Test concurrent writers get separate directories and a successor takes over a released one"""
+        first = Spool("events", directory=tmp_path, fsync_interval=0)
+        second = Spool("events", directory=tmp_path, fsync_interval=0)
+        await first.append(b"from-first")
+        await second.append(b"from-second")
+        assert first.path != second.path
+
+        await first.close()
+        successor = Spool("events", directory=tmp_path, fsync_interval=0)
+        assert successor.has_pending()
+        assert successor.path == first.path
+        await successor.append(b"from-successor")
+        assert len(successor.segments()) == 2
+
+
+# Spool Drainer Tests
+class TestSpoolDrainer:
+    @pytest.mark.asyncio
+    async def test_drains_every_segment_in_order(self, tmp_path):
+        """Test records are published in append order and drained segments are deleted"""
+        spool = Spool("events", directory=tmp_path, segment_bytes=40, fsync_interval=0)
+        await append_all(spool, 6)
+        publisher = Publisher()
+
+        assert await SpoolDrainer(spool, CircuitBreaker("events"), publisher).drain() is True
+        assert publisher.published == [b"event-%d" % n for n in range(6)]
+        assert spool.segments() == []
+        assert not spool.has_pending()
+
+    @pytest.mark.asyncio
+    async def test_resumes_after_a_failure_without_republishing(self, spool):
+        """Test a failed publish stops the drain and the next one continues from the checkpoint"""
+        await append_all(spool, 5)
+        publisher = Publisher(fail_at=3)
+        drainer = SpoolDrainer(spool, CircuitBreaker("events"), publisher)
+
+        assert await drainer.drain() is False
+        assert await drainer.drain() is True
+        assert publisher.published == [b"event-%d" % n for n in range(5)]
+
+    @pytest.mark.asyncio
+    async def test_open_breaker_pauses_draining(self, spool):
+        """Test the drainer stops probing a broker its breaker has opened"""
+        await append_all(spool, 3)
+        publisher = Publisher()
+        publisher.down = True
+        drainer = SpoolDrainer(spool, CircuitBreaker("events", failure_threshold=1, reset_timeout=60), publisher)
+
+        assert await drainer.drain() is False
+        assert await drainer.drain() is False
+        assert publisher.calls == 1
+        assert spool.has_pending()
+
+    @pytest.mark.asyncio
+    async def test_background_drainer_wakes_on_append(self, spool):
+        """Test a running drainer publishes new records without waiting for its interval"""
+        publisher = Publisher()
+        drainer = SpoolDrainer(spool, CircuitBreaker("events"), publisher, interval=60)
+        drainer.start()
+        try:
+            await append_all(spool, 2)
+            for _ in range(100):
+                if len(publisher.published) == 2:
+                    break
+                await asyncio.sleep(0.01)
+        finally:
+            await drainer.stop()
+        assert publisher.published == [b"event-0", b"event-1"]
+
+
+# Fast-Ack Tests
+class TestFastAck:
+    @pytest.mark.asyncio
+    async def test_fast_ack_returns_once_spooled(self, tmp_path):
+        """Test fast-ack sends are acknowledged by the spool and published by the drainer"""
+        connection = KafkaConnection()
+        connection.spool = connection.drainer.spool = Spool("kafka", directory=tmp_path, fsync_interval=0)
+        connection.producer = Mock(send_and_wait=AsyncMock())
+        connection._producer_started = True
+
+        with patch.object(kafkaConnection, "SPOOL_FAST_ACK", True):
+            assert await connection.send_message("movie-events", {"event": "movie_created"}, "7") is True
+        connection.producer.send_and_wait.assert_not_called()
+
+        assert await connection.drainer.drain() is True
+        connection.producer.send_and_wait.assert_called_once_with(
+            "movie-events", value={"event": "movie_created"}, key="7"
+        )
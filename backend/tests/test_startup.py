@@ -0,0 +1,79 @@
+import pytest
+import os
+import subprocess
+import sys
+from unittest.mock import patch
+
+# Get the directory one level above the 'tests' directory
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Add this directory to Python's sys.path
+sys.path.append(backend_dir)
+
+from backend import warmup
+
+REPO_ROOT = os.path.dirname(backend_dir)
+# Cumulative import time of `main` allowed for a cold API start
+IMPORT_TIME_BUDGET_MS = float(os.getenv("IMPORT_TIME_BUDGET_MS", 2000))
+# Stacks that must only be imported when the recommender or mailer is first used
+LAZY_PACKAGES = {"pandas", "sklearn", "joblib", "scipy", "numpy", "resend"}
+
+
+def profile_imports(module):
+    """Runs `python -X importtime -c 'import <module>'` and parses the report."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_ROOT, capture_output=True, text=True, timeout=120,
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        timings[name.strip()] = (int(self_us), int(cumulative_us))
+    return timings
+
+
+def import_time_summary(timings, limit=15):
+    slowest = sorted(timings.items(), key=lambda item: item[1][1], reverse=True)[:limit]
+    return "\n".join(f"{cumulative / 1000:9.1f} ms  {name}" for name, (_, cumulative) in slowest)
+
+
+@pytest.fixture(scope="module")
+def timings():
+    return profile_imports("main")
+
+
+# Import Time Tests
+class TestImportTime:
+    def test_heavy_stacks_are_not_imported_at_startup(self, timings):
+        """Test importing the app does not load the ML stack or the mailer SDK"""
+        loaded = {name.split(".")[0] for name in timings} & LAZY_PACKAGES
+        assert not loaded, f"Imported at startup: {sorted(loaded)}\n{import_time_summary(timings)}"
+
+    def test_cold_start_within_budget(self, timings):
+        """Test the cumulative import time of the app stays under budget"""
+        total_ms = timings["main"][1] / 1000
+        print(f"\nImport time of main: {total_ms:.1f} ms\n{import_time_summary(timings)}")
+        assert total_ms < IMPORT_TIME_BUDGET_MS, import_time_summary(timings)
+
+
+# Warmup Tests
+class TestWarmup:
+    @pytest.mark.asyncio
+    async def test_warm_up_runs_requested_targets(self):
+        """Test only the requested stacks are warmed"""
+        calls = []
+        with patch.dict(warmup.WARMERS, {"recommender": lambda: calls.append("recommender"),
+                                         "mailer": lambda: calls.append("mailer")}):
+            await warmup.warm_up(["mailer"])
+        assert calls == ["mailer"]
+
+    @pytest.mark.asyncio
+    async def test_warm_up_failure_does_not_raise(self):
+        """Test a missing model only logs, the stack then loads on first use"""
+        def missing_model():
+            raise FileNotFoundError("recommender_model/tfidf_matrix.pkl")
+
+        with patch.dict(warmup.WARMERS, {"recommender": missing_model}):
+            await warmup.warm_up(["recommender", "unknown"])
@@ -0,0 +1,110 @@
+import pytest
+import json
+import logging
+from unittest.mock import Mock, AsyncMock, patch
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+import os
+import sys
+
+# Get the directory one level above the 'tests' directory
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Add this directory to Python's sys.path
+sys.path.append(backend_dir)
+
+from backend import timing
+from backend.timing import ServerTimingMiddleware, StageTimer, stage
+from backend.auth.models import User
+from backend.movies import schema, services
+
+
+@pytest.fixture
+def timed_client():
+    app = FastAPI()
+    app.add_middleware(ServerTimingMiddleware)
+
+    @app.get("/work")
+    async def work():
+        with stage("lookup"):
+            pass
+        with stage("commit"):
+            pass
+        return {"ok": True}
+
+    return TestClient(app)
+
+
+# Stage Timer Tests
+class TestStageTimer:
+    def test_stage_is_a_shared_no_op_when_disabled(self):
+        """Test untimed requests allocate nothing per stage"""
+        assert stage("commit") is stage("es_index")
+        with stage("commit"):
+            pass
+
+    def test_header_lists_stages_in_order(self):
+        """Test the Server-Timing value has one metric per stage plus the total"""
+        timer = StageTimer()
+        with timer.stage("lookup"):
+            pass
+        with timer.stage("commit"):
+            pass
+
+        names = [metric.split(";")[0] for metric in timer.header_value().split(", ")]
+        assert names == ["lookup", "commit", "total"]
+        assert all(";dur=" in metric for metric in timer.header_value().split(", "))
+
+    def test_failed_stage_is_still_recorded(self):
+        """Test a stage raising an exception keeps its duration"""
+        timer = StageTimer()
+        with pytest.raises(ValueError):
+            with timer.stage("kafka_ack"):
+                raise ValueError()
+        assert [name for name, _ in timer.stages] == ["kafka_ack"]
+
+
+# Server-Timing Middleware Tests
+class TestServerTimingMiddleware:
+    def test_header_only_when_requested(self, timed_client):
+        """Test timing is toggled per request by the X-Server-Timing header"""
+        assert "server-timing" not in timed_client.get("/work").headers
+        assert "server-timing" not in timed_client.get("/work", headers={"X-Server-Timing": "0"}).headers
+
+        response = timed_client.get("/work", headers={"X-Server-Timing": "1"})
+        assert response.headers["server-timing"].startswith("lookup;dur=")
+        assert "commit;dur=" in response.headers["server-timing"]
+
+    def test_structured_log_line(self, timed_client, caplog):
+        """Test each timed request logs its stages as one JSON line"""
+        with caplog.at_level(logging.INFO, logger="backend.timing"):
+            timed_client.get("/work", headers={"X-Server-Timing": "1"})
+
+        entry = json.loads(caplog.records[-1].getMessage())
+        assert entry["event"] == "server_timing"
+        assert entry["path"] == "/work"
+        assert entry["status"] == 200
+        assert [s["name"] for s in entry["stages"]] == ["lookup", "commit"]
+
+    @pytest.mark.asyncio
+    async def test_create_movie_stages(self):
+        """Test the movie creation path reports each of its stages"""
+        database = Mock(spec=Session)
+        database.query.return_value.filter.return_value.first.return_value = None
+        request = schema.MovieBase(title="Heat", year="1995", imdbID="tt0113277", type="movie",
+                                   poster="https://example.com/heat.jpg")
+        user = User(id=1, username="u", email="u@example.com", role="user", password="x")
+        timer = StageTimer()
+        token = timing._current_timer.set(timer)
+        try:
+            with patch('backend.movies.services.send_kafka_message', new_callable=AsyncMock), \
+                 patch('backend.movies.services.rabbitmq_manager.publish_message', new_callable=AsyncMock), \
+                 patch('backend.movies.services.es_client') as es_client:
+                es_client.options.return_value = AsyncMock()
+                await services.create_new_movie(request, database, user)
+        finally:
+            timing._current_timer.reset(token)
+
+        assert [name for name, _ in timer.stages] == [
+            "duplicate_check", "commit", "es_index", "kafka_ack", "rabbitmq_publish"
+        ]
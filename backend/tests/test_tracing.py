@@ -0,0 +1,140 @@
+import pytest
+import io
+from unittest.mock import Mock, AsyncMock, patch
+from fastapi.testclient import TestClient
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from opentelemetry.trace import SpanKind
+import os
+import sys
+
+# Get the directory one level above the 'tests' directory
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Add this directory to Python's sys.path
+sys.path.append(backend_dir)
+
+from main import app
+from backend import db, tracing
+from backend.kafkaConnection import KafkaConnection
+from backend.kafka_consumer import KafkaEventConsumer
+from backend.rabbitMQ import RabbitMQManager
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def spans():
+    """Records spans in memory for the duration of a test."""
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    with patch.object(tracing, "tracer", provider.get_tracer("test")):
+        yield exporter
+
+
+# Request Span Tests
+class TestRequestSpans:
+    def test_server_span_named_after_route(self, spans):
+        """Test each request gets a server span named after its route template"""
+        with patch("backend.health.health_checker.check", AsyncMock(return_value={})):
+            client.get("/healthz")
+
+        (span,) = [s for s in spans.get_finished_spans() if s.kind == SpanKind.SERVER]
+        assert span.name == "GET /healthz"
+        assert span.attributes["http.route"] == "/healthz"
+        assert span.attributes["http.response.status_code"] == 200
+
+    def test_incoming_traceparent_is_continued(self, spans):
+        """Test a caller's trace context becomes the parent of the server span"""
+        trace_id = "4bf92f3577b34da6a3ce929d0e0e4736"
+        with patch("backend.health.health_checker.check", AsyncMock(return_value={})):
+            client.get("/healthz", headers={"traceparent": f"00-{trace_id}-00f067aa0ba902b7-01"})
+
+        (span,) = spans.get_finished_spans()
+        assert format(span.context.trace_id, "032x") == trace_id
+        assert format(span.parent.span_id, "016x") == "00f067aa0ba902b7"
+
+    def test_sql_span(self, spans):
+        """Test the engine hooks wrap each statement in a client span"""
+        conn = Mock(info={})
+        db._start_query_timer(conn, None, "SELECT 1", {}, None, False)
+        db._record_query_duration(conn, None, "SELECT 1", {}, None, False)
+
+        (span,) = spans.get_finished_spans()
+        assert span.name == "SELECT"
+        assert span.kind == SpanKind.CLIENT
+        assert span.attributes["db.statement"] == "SELECT 1"
+
+
+# Broker Propagation Tests
+class TestBrokerPropagation:
+    @pytest.mark.asyncio
+    async def test_kafka_consumer_span_continues_producer_trace(self, spans):
+        """Test trace context travels in Kafka headers to the consumer span"""
+        kafka_conn = KafkaConnection()
+        kafka_conn.producer = Mock(send_and_wait=AsyncMock())
+        kafka_conn._producer_started = True
+        with tracing.start_span("POST /api/movies/", SpanKind.SERVER):
+            await kafka_conn.send_message("movie-events", {"event": "movie_created"})
+        headers = kafka_conn.producer.send_and_wait.call_args.kwargs["headers"]
+        assert headers[0][0] == "traceparent"
+
+        message = Mock(value={"event": "movie_created"}, headers=headers, topic="movie-events",
+                       partition=0, offset=0)
+
+        async def records():
+            yield message
+        consumer = Mock(__aiter__=lambda self: records())
+        await KafkaEventConsumer()._consume_messages(consumer, AsyncMock(), "movie-events")
+
+        by_name = {span.name: span for span in spans.get_finished_spans()}
+        producer_span = by_name["movie-events publish"]
+        consumer_span = by_name["movie-events process"]
+        assert consumer_span.kind == SpanKind.CONSUMER
+        assert consumer_span.context.trace_id == by_name["POST /api/movies/"].context.trace_id
+        assert consumer_span.parent.span_id == producer_span.context.span_id
+
+    @pytest.mark.asyncio
+    async def test_no_headers_without_tracing(self):
+        """Test messages are sent unchanged when tracing is disabled"""
+        kafka_conn = KafkaConnection()
+        kafka_conn.producer = Mock(send_and_wait=AsyncMock())
+        kafka_conn._producer_started = True
+
+        await kafka_conn.send_message("movie-events", {"a": 1}, "1")
+
+        kafka_conn.producer.send_and_wait.assert_called_once_with("movie-events", value={"a": 1}, key="1")
+
+    @pytest.mark.asyncio
+    async def test_rabbitmq_headers_carry_trace_context(self, spans):
+        """Test AMQP messages carry the publishing span's trace context"""
+        manager = RabbitMQManager()
+        manager.channel = Mock()
+        manager.channel.default_exchange.publish = AsyncMock()
+
+        await manager.publish_message("hello", routing_key="movies_queue")
+
+        message = manager.channel.default_exchange.publish.call_args.args[0]
+        (span,) = spans.get_finished_spans()
+        assert span.kind == SpanKind.PRODUCER
+        assert format(span.context.span_id, "016x") in message.headers["traceparent"]
+
+
+# Export Tests
+class TestFileExport:
+    def test_file_exporter_and_summary(self, spans, tmp_path):
+        """Test spans exported as JSON lines can be summarized as a trace tree"""
+        with tracing.start_span("GET /api/movies/", SpanKind.SERVER):
+            with tracing.start_span("SELECT", SpanKind.CLIENT):
+                pass
+        path = tmp_path / "traces.jsonl"
+        tracing.FileSpanExporter(str(path)).export(spans.get_finished_spans())
+
+        assert len(path.read_text().splitlines()) == 2
+        out = io.StringIO()
+        tracing.summarize(str(path), out)
+        lines = out.getvalue().splitlines()
+        assert lines[0].startswith("trace ")
+        assert lines[1].strip().startswith("GET /api/movies/")
+        assert lines[2].startswith("    SELECT")
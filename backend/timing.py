@@ -0,0 +1,102 @@
+"""
+Per-request stage timing, reported in a `Server-Timing` header and a log line.
+
+Code marks its stages with `stage()`:
+
+    with stage("commit"):
+        database.commit()
+
+Timing is off unless the request sends `X-Server-Timing: 1` (or
+SERVER_TIMING=always): without an active timer `stage()` returns a shared
+no-op context manager, so instrumented code pays one context variable lookup.
+"""
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+
+logger = logging.getLogger(__name__)
+
+TIMING_HEADER = os.getenv("SERVER_TIMING_HEADER", "X-Server-Timing").lower().encode()
+ALWAYS_ON = os.getenv("SERVER_TIMING", "").lower() == "always"
+
+_current_timer = ContextVar("stage_timer", default=None)
+_disabled = nullcontext()
+
+
+class StageTimer:
+    """Durations of the named stages of one request, in order."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = []
+
+    @contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages.append((name, (time.perf_counter() - started) * 1000))
+
+    def total_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def header_value(self):
+        metrics = [f"{name};dur={duration:.2f}" for name, duration in self.stages]
+        metrics.append(f"total;dur={self.total_ms():.2f}")
+        return ", ".join(metrics)
+
+
+def stage(name):
+    """Times the enclosed block as `name` when the request is being timed."""
+    timer = _current_timer.get()
+    if timer is None:
+        return _disabled
+    return timer.stage(name)
+
+
+class ServerTimingMiddleware:
+    """ASGI middleware enabling the stage timer for requests that ask for it."""
+
+    def __init__(self, app):
+        self.app = app
+
+    def _enabled(self, scope):
+        return ALWAYS_ON or any(
+            name == TIMING_HEADER and value not in (b"0", b"false")
+            for name, value in scope["headers"]
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._enabled(scope):
+            await self.app(scope, receive, send)
+            return
+
+        timer = StageTimer()
+        token = _current_timer.set(timer)
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", timer.header_value().encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_timer.reset(token)
+            logger.info(json.dumps({
+                "event": "server_timing",
+                "method": scope["method"],
+                "path": scope["path"],
+                "status": status_code,
+                "total_ms": round(timer.total_ms(), 2),
+                "stages": [{"name": name, "ms": round(ms, 2)} for name, ms in timer.stages],
+            }))
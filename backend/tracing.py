@@ -0,0 +1,237 @@
+"""
+OpenTelemetry tracing for requests, SQL, Elasticsearch and the message brokers.
+
+Tracing is off unless TRACING_EXPORTER is set:
+
+    file     one JSON span per line in TRACING_FILE (default traces.jsonl)
+    otlp     OTLP/HTTP to OTEL_EXPORTER_OTLP_ENDPOINT
+             (needs the opentelemetry-exporter-otlp-proto-http package)
+    console  pretty-printed spans on stdout
+
+Without an exporter the OpenTelemetry API hands out non-recording spans, so
+the instrumentation costs next to nothing. The W3C trace context of the
+current span is injected into Kafka and AMQP message headers, so consumer
+spans join the trace of the request that produced the message.
+
+Summarize a trace file:
+
+    python -m backend.tracing traces.jsonl
+"""
+import json
+import logging
+import os
+import sys
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+
+from opentelemetry import propagate, trace
+from opentelemetry.trace import Link, SpanKind, Status, StatusCode
+
+logger = logging.getLogger(__name__)
+
+TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "").lower()
+TRACING_FILE = os.getenv("TRACING_FILE", "traces.jsonl")
+TRACING_SAMPLE_RATIO = float(os.getenv("TRACING_SAMPLE_RATIO", 1.0))
+SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "fast-react-movies")
+# Longer SQL statements are truncated in span attributes
+MAX_STATEMENT_LENGTH = 2000
+
+tracer = trace.get_tracer("backend")
+_provider = None
+
+
+def setup_tracing(exporter=TRACING_EXPORTER, path=TRACING_FILE):
+    """Installs the SDK tracer provider for `exporter`; returns it, or None if disabled."""
+    global _provider
+    if not exporter or exporter == "none" or _provider is not None:
+        return _provider
+
+    # The SDK is only imported when tracing is enabled
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+    from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+
+    if exporter == "file":
+        span_exporter = FileSpanExporter(path)
+    elif exporter == "otlp":
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        span_exporter = OTLPSpanExporter()
+    elif exporter == "console":
+        span_exporter = ConsoleSpanExporter()
+    else:
+        raise ValueError(f"Unknown TRACING_EXPORTER: {exporter}")
+
+    _provider = TracerProvider(
+        resource=Resource.create({"service.name": SERVICE_NAME}),
+        sampler=ParentBased(TraceIdRatioBased(TRACING_SAMPLE_RATIO)),
+    )
+    # Spans are exported from a background thread, off the request path
+    _provider.add_span_processor(BatchSpanProcessor(span_exporter))
+    trace.set_tracer_provider(_provider)
+    logger.info(f"Tracing enabled, exporting spans to {exporter}")
+    return _provider
+
+
+def shutdown_tracing():
+    """Flushes the spans still queued for export."""
+    if _provider is not None:
+        _provider.shutdown()
+
+
+class FileSpanExporter:
+    """Appends finished spans to a file as JSON lines (one write per batch)."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def export(self, spans):
+        from opentelemetry.sdk.trace.export import SpanExportResult
+        lines = "".join(span.to_json(indent=None) + "\n" for span in spans)
+        try:
+            # O_APPEND keeps the batches of several workers from interleaving
+            with open(self.path, "a") as f:
+                f.write(lines)
+        except OSError as e:
+            logger.error(f"Failed to export spans to {self.path}: {e}")
+            return SpanExportResult.FAILURE
+        return SpanExportResult.SUCCESS
+
+    def force_flush(self, timeout_millis=30000):
+        return True
+
+    def shutdown(self):
+        pass
+
+
+@contextmanager
+def start_span(name, kind=SpanKind.INTERNAL, attributes=None, parent=None, links=None):
+    """Starts a span as the current span; exceptions are recorded and re-raised."""
+    with tracer.start_as_current_span(
+        name, context=parent, kind=kind, attributes=attributes, links=links,
+    ) as span:
+        yield span
+
+
+def inject_headers():
+    """The current trace context as a {name: value} carrier (empty when not tracing)."""
+    carrier = {}
+    propagate.inject(carrier)
+    return carrier
+
+
+def kafka_headers():
+    """Trace context as Kafka record headers, or None when there is nothing to send."""
+    carrier = inject_headers()
+    return [(key, value.encode()) for key, value in carrier.items()] or None
+
+
+def extract_kafka_context(headers):
+    """The trace context carried in a consumed Kafka record's headers."""
+    try:
+        carrier = {key: value.decode() for key, value in headers or ()}
+    except (TypeError, ValueError, AttributeError):
+        carrier = {}
+    return propagate.extract(carrier)
+
+
+def link_from(ctx):
+    span_context = trace.get_current_span(ctx).get_span_context()
+    return Link(span_context) if span_context.is_valid else None
+
+
+class TracingMiddleware:
+    """
+    ASGI middleware starting a server span per request.
+
+    The span joins an incoming `traceparent` and is renamed to the matched
+    route template once routing has run.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        carrier = {name.decode("latin-1"): value.decode("latin-1") for name, value in scope["headers"]}
+        method = scope["method"]
+        with start_span(
+            f"{method} {scope['path']}", SpanKind.SERVER, parent=propagate.extract(carrier),
+            attributes={"http.request.method": method, "url.path": scope["path"]},
+        ) as span:
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    span.set_attribute("http.response.status_code", message["status"])
+                    if message["status"] >= 500:
+                        span.set_status(Status(StatusCode.ERROR))
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                route = scope.get("route")
+                if route is not None:
+                    span.set_attribute("http.route", route.path)
+                    span.update_name(f"{method} {route.path}")
+
+
+# SQLAlchemy engine hooks, registered in backend/db.py
+
+def start_sql_span(conn, operation, statement):
+    span = tracer.start_span(
+        operation,
+        kind=SpanKind.CLIENT,
+        attributes={"db.system": "postgresql", "db.statement": statement[:MAX_STATEMENT_LENGTH]},
+    )
+    conn.info.setdefault("query_spans", []).append(span)
+
+
+def end_sql_span(conn, error=None):
+    spans = conn.info.get("query_spans")
+    if not spans:
+        return
+    span = spans.pop()
+    if error is not None:
+        span.record_exception(error)
+        span.set_status(Status(StatusCode.ERROR, str(error)))
+    span.end()
+
+
+def summarize(path, out=sys.stdout):
+    """Prints each trace in a span file as an indented tree with durations."""
+    traces = defaultdict(list)
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                span = json.loads(line)
+                traces[span["context"]["trace_id"]].append(span)
+
+    def duration_ms(span):
+        elapsed = datetime.fromisoformat(span["end_time"]) - datetime.fromisoformat(span["start_time"])
+        return elapsed.total_seconds() * 1000
+
+    for trace_id, spans in traces.items():
+        children = defaultdict(list)
+        ids = {span["context"]["span_id"] for span in spans}
+        for span in sorted(spans, key=lambda s: s["start_time"]):
+            parent = span.get("parent_id")
+            children[parent if parent in ids else None].append(span)
+
+        print(f"trace {trace_id}", file=out)
+
+        def show(span, depth):
+            print(f"{'  ' * (depth + 1)}{span['name']:<40} {span['kind'].split('.')[-1]:<9} "
+                  f"{duration_ms(span):9.2f} ms", file=out)
+            for child in children[span["context"]["span_id"]]:
+                show(child, depth + 1)
+
+        for root in children[None]:
+            show(root, 0)
+
+
+if __name__ == "__main__":
+    summarize(sys.argv[1] if len(sys.argv) > 1 else TRACING_FILE)
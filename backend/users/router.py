@@ -2,9 +2,9 @@ from typing import List
 from fastapi import APIRouter, Depends, status, Response
 from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
-import json
 
 from backend import db
+from backend.serialization import trusted_response
 
 from . import schema
 from . import services
@@ -20,15 +20,11 @@ async def user_list(
     result = await services.get_user_listing(database)
     if not result:
         return Response(status_code=status.HTTP_204_NO_CONTENT)
-    return Response(
-        content=json.dumps({
-            "data": [user.to_dict() for user in result],
-            "message": "User list retrieved successfully",
-            "status": "success",
-        }),
-        media_type="application/json",
-        status_code=status.HTTP_200_OK,
-    )
+    return trusted_response({
+        "data": result,
+        "message": "User list retrieved successfully",
+        "status": "success",
+    })
 
 @router.get(
     "/{user_id}", status_code=status.HTTP_200_OK, response_model=schema.UserDetail
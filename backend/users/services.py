@@ -2,16 +2,28 @@ from fastapi import HTTPException, status
 from typing import List
 from . schema import UserList, UserDetail
 from backend.auth.models import User
+from backend.movies.models import Movie
+from collections import defaultdict
 from datetime import datetime
 
 
-async def get_user_listing(database) -> List[UserDetail]:
+async def get_user_listing(database) -> List[dict]:
+    """Every user as a `User.to_dict()` dict, in two queries instead of one per user."""
     try:
         users = (
-            database.query(User)
+            database.query(User.id, User.username, User.email, User.role)
             .all()
         )
-        return users
+        movies_by_owner = defaultdict(list)
+        for movie in database.query(
+            Movie.id, Movie.year, Movie.title, Movie.imdbID, Movie.type, Movie.poster, Movie.owner_id
+        ):
+            movie = movie._asdict()
+            movies_by_owner[movie.pop("owner_id")].append(movie)
+        return [
+            {**user._asdict(), "movies": movies_by_owner[user.id]}
+            for user in users
+        ]
     except Exception as e:
         if isinstance(e, HTTPException) and e.status_code == status.HTTP_400_BAD_REQUEST:
             raise e
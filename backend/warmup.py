@@ -0,0 +1,52 @@
+import asyncio
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Comma separated list of the lazily loaded stacks to load right after startup,
+# e.g. APP_WARMUP=recommender,mailer. Empty by default: everything loads on first use.
+WARMUP_TARGETS = [
+    target.strip() for target in os.getenv("APP_WARMUP", "").split(",") if target.strip()
+]
+
+
+def _warm_recommender():
+    from backend.ml.recommender import get_recommender
+    get_recommender()
+
+
+def _warm_mailer():
+    from backend.auth.email import get_resend
+    get_resend()
+
+
+WARMERS = {
+    "recommender": _warm_recommender,
+    "mailer": _warm_mailer,
+}
+
+
+async def warm_up(targets=None):
+    """
+    Imports/loads the given stacks in worker threads.
+
+    Meant to run as a background task, so the API accepts requests while
+    warming up; a failure is logged and the stack loads on first use instead.
+    """
+    targets = WARMUP_TARGETS if targets is None else targets
+
+    async def warm(target):
+        warmer = WARMERS.get(target)
+        if warmer is None:
+            logger.warning(f"Unknown warmup target: {target}")
+            return
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        try:
+            await asyncio.to_thread(warmer)
+            logger.info(f"Warmed up {target} in {loop.time() - started:.2f}s")
+        except Exception as e:
+            logger.warning(f"Warmup of {target} failed: {e}")
+
+    await asyncio.gather(*(warm(target) for target in targets))
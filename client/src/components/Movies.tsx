@@ -2,6 +2,7 @@ import React from "react";
 import { motion, AnimatePresence } from "framer-motion";
 import type { Movie } from "../types/Movie";
 import { FaTrash, FaPlusCircle, FaFilm } from "react-icons/fa";
+import { posterUrl } from "../config";
 
 interface MovieListProps {
   movies: Movie[];
@@ -58,7 +59,8 @@ const MovieList: React.FC<MovieListProps> = ({
                   <div className="relative aspect-[2/3] w-full bg-slate-950 overflow-hidden">
                     {hasPoster ? (
                       <img
-                        src={movie.poster}
+                        src={posterUrl(movie.id, "grid")}
+                        srcSet={`${posterUrl(movie.id, "grid")} 1x, ${posterUrl(movie.id, "detail")} 2x`}
                         alt={movie.title}
                         className="w-full h-full object-cover group-hover:scale-105 transition-transform duration-500"
                         loading="lazy"
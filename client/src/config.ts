@@ -1,4 +1,10 @@
 const API_URL = "http://localhost:8000/api";
-const MOVIE_API_URL = "http://www.omdbapi.com/";
+// OMDb lookups go through the backend, which keeps the API key and caches answers
+const MOVIE_API_URL = `${API_URL}/omdb`;
 
-export { API_URL, MOVIE_API_URL };
\ No newline at end of file
+// Resized posters of saved movies, fetched once and cached by the backend
+type PosterSize = "thumbnail" | "grid" | "detail";
+const posterUrl = (movieId: number | string, size: PosterSize = "grid") =>
+  `${API_URL}/posters/${movieId}?size=${size}`;
+
+export { API_URL, MOVIE_API_URL, posterUrl };
\ No newline at end of file
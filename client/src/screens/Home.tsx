@@ -10,7 +10,6 @@ import { toast } from "react-toastify";
 import { MOVIE_API_URL, API_URL } from "../config";
 
 const Home: React.FC = () => {
-  const mapApiKey = import.meta.env.VITE_MAP_API_KEY;
   const [searchQuery, setSearchQuery] = useState<string>("man");
   const [debouncedQuery, setDebouncedQuery] = useState<string>(searchQuery);
   const [loading, setLoading] = useState<boolean>(false);
@@ -61,9 +60,9 @@ const Home: React.FC = () => {
       setLoading(true);
       setError(null);
 
-      const response = await axios.get<Movies>(
-        `${MOVIE_API_URL}?s=${debouncedQuery}&apikey=${mapApiKey}`
-      );
+      const response = await axios.get<Movies>(`${MOVIE_API_URL}/search`, {
+        params: { s: debouncedQuery },
+      });
       if (response.status === 200) {
         if (response.data.Response === "False") {
           setError(response.data.Error || "No movies found.");
@@ -77,7 +76,7 @@ const Home: React.FC = () => {
     } finally {
       setLoading(false);
     }
-  }, [debouncedQuery, mapApiKey]);
+  }, [debouncedQuery]);
 
   const goToMovieDetails = (imdbID: string) => {
     navigate(`/movie/${imdbID}`);
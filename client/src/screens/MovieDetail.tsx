@@ -6,7 +6,6 @@ import Loader from "../components/Loader";
 import { MOVIE_API_URL } from "../config";
 
 const MovieDetail: React.FC = () => {
-  const mapApiKey = import.meta.env.VITE_MAP_API_KEY;
   const [movie, setMovie] = useState<Movie | null>(null);
   const [loading, setLoading] = useState<boolean>(false);
   const [error, setError] = useState<string | null>(null);
@@ -20,7 +19,7 @@ const MovieDetail: React.FC = () => {
       setError(null);
 
       const response = await axios.get<Movie>(
-        `${MOVIE_API_URL}?i=${imdbID}&apikey=${mapApiKey}`
+        `${MOVIE_API_URL}/title/${imdbID}`
       );
       if (response.status === 200) {
         setMovie(response.data);
@@ -5,6 +5,7 @@ import usePlaylistStore from "../stores/playlist";
 import Loader from "../components/Loader";
 import { motion, AnimatePresence } from "framer-motion";
 import { FaArrowLeft, FaTrash, FaFilm, FaCalendarAlt } from "react-icons/fa";
+import { posterUrl } from "../config";
 
 interface Playlist {
   playlist: {
@@ -171,7 +172,8 @@ const PlaylistDetail: React.FC = () => {
                     <div className="relative aspect-[2/3] w-full bg-slate-950 overflow-hidden">
                       {hasPoster ? (
                         <img
-                          src={movie.poster}
+                          src={posterUrl(movie.id, "grid")}
+                          srcSet={`${posterUrl(movie.id, "grid")} 1x, ${posterUrl(movie.id, "detail")} 2x`}
                           alt={movie.title}
                           className="w-full h-full object-cover group-hover:scale-105 transition-transform duration-500"
                           loading="lazy"
@@ -6,6 +6,11 @@ echo "Running Alembic migrations..."
 python -m alembic upgrade head
 echo "Alembic migrations finished."
 
-echo "Starting Uvicorn server..."
-exec uvicorn main:app --reload --workers 1 --host 0.0.0.0 --port 8000
+if [ "$#" -gt 0 ]; then
+    echo "Starting $*..."
+    exec "$@"
+fi
+
+echo "Starting Uvicorn workers..."
+exec python -m backend.server
 echo "This line should not be printed if Uvicorn starts correctly."
\ No newline at end of file
@@ -1,16 +1,29 @@
 from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
 from fastapi.exceptions import RequestValidationError
 from fastapi.encoders import jsonable_encoder
 from contextlib import asynccontextmanager
-from backend.elastic import connect_elasticsearch, close_elasticsearch
-from backend.rabbitMQ import RabbitMQManager
-from backend.kafkaConnection import get_kafka_connection, kafka_connection
-import uvicorn
+from backend.compression import CompressionMiddleware
+from backend.deadline import DeadlineMiddleware
+from backend.health import dependency_manager, router as health_router
+from backend.metrics import PrometheusMiddleware, router as metrics_router
+from backend.ratelimit import RateLimitMiddleware
+from backend.shedding import LoadShedMiddleware, loop_monitor
+from backend.timing import ServerTimingMiddleware
+from backend.tracing import TracingMiddleware, setup_tracing, shutdown_tracing
+from backend.ml.updates import ModelUpdateConsumer
+from backend.ml.recommender import model_holder
+from backend.warmup import WARMUP_TARGETS, warm_up
+import asyncio
+import os
 
 from backend.auth import router as auth_router
 from backend.movies import router as movies_router
+from backend.omdb import router as omdb_router
+from backend.omdb.services import omdb_client
+from backend.posters import router as posters_router
+from backend.posters.services import poster_store
 from backend.users import router as users_router
 
 
@@ -18,25 +31,32 @@ from backend.users import router as users_router
 async def lifespan(app: FastAPI):
     """Lifespan context manager for startup and shutdown events."""
     print("🚀 Starting up the FastAPI application...")
-    await connect_elasticsearch()
-    rabbitmq_manager = RabbitMQManager()
-    await rabbitmq_manager.connect()
-    
-    # Initialize Kafka connection
-    print("🔌 Connecting to Kafka...")
-    await get_kafka_connection()
-    print("✅ Kafka connection established")
+    setup_tracing()
+    loop_monitor.start()
+    await dependency_manager.start()
+
+    # Append newly created movies to the recommender as their events arrive
+    model_updates_task = None
+    if os.getenv("RECOMMENDER_LIVE_UPDATES", "true").lower() == "true":
+        model_updates_task = asyncio.create_task(ModelUpdateConsumer().run())
+    # Hot-swap new model versions published to the registry
+    model_watch_task = asyncio.create_task(model_holder.watch())
+    # Heavy stacks are imported on first use unless APP_WARMUP asks for them now
+    warmup_task = asyncio.create_task(warm_up()) if WARMUP_TARGETS else None
     
     yield
 
-    await close_elasticsearch()
-    await rabbitmq_manager.disconnect()
-    
-    # Close Kafka connections
-    if kafka_connection:
-        print("🔌 Closing Kafka connections...")
-        await kafka_connection.close_connections()
-        print("✅ Kafka connections closed")
+    model_watch_task.cancel()
+    if warmup_task:
+        warmup_task.cancel()
+    if model_updates_task:
+        model_updates_task.cancel()
+
+    await omdb_client.close()
+    await poster_store.close()
+    await dependency_manager.stop()
+    loop_monitor.stop()
+    shutdown_tracing()
 
 # --- FASTAPI APP INITIALIZATION ---
 
@@ -45,12 +65,21 @@ app = FastAPI(
     docs_url="/movies-docs",
     version="0.0.1",
     lifespan=lifespan,
+    # orjson renders every response; see backend/serialization.py
+    default_response_class=ORJSONResponse,
 )
 
 origins = [
     "http://localhost:3000",
 ]
 
+# A deadline per request (504), also capping SQL, ES and broker timeouts
+app.add_middleware(DeadlineMiddleware)
+# Per-client token buckets (429), inside CORS so browsers can read the refusal
+app.add_middleware(RateLimitMiddleware)
+# 503 for a share of requests while event-loop lag or DB pool wait is too high
+app.add_middleware(LoadShedMiddleware)
+
 # CORS Middleware (kept external to lifespan for simplicity)
 app.add_middleware(
     CORSMiddleware,
@@ -60,6 +89,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# zstd/brotli/gzip for responses over COMPRESSION_MIN_SIZE bytes
+app.add_middleware(CompressionMiddleware)
+# Stage timings in a Server-Timing header for requests sending X-Server-Timing: 1
+app.add_middleware(ServerTimingMiddleware)
+# Request latency and in-flight metrics, exposed with the others on /metrics
+app.add_middleware(PrometheusMiddleware)
+# A server span per request (no-op unless TRACING_EXPORTER is set)
+app.add_middleware(TracingMiddleware)
+
 
 # --- EXCEPTION HANDLER ---
 @app.exception_handler(RequestValidationError)
@@ -77,6 +115,10 @@ app.include_router(auth_router.router)
 app.include_router(movies_router.router)
 app.include_router(movies_router.playlist_router)
 app.include_router(users_router.router)
+app.include_router(omdb_router.router)
+app.include_router(posters_router.router)
+app.include_router(health_router)
+app.include_router(metrics_router)
 
 
 @app.get("/")
@@ -85,4 +127,7 @@ async def root():
 
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # Workers per core, uvloop and httptools; see backend/server.py
+    from backend.server import main as serve
+
+    serve()